@@ -0,0 +1,71 @@
+import hashlib
+import os
+
+# Los tests nunca tocan la base real: usan la base en memoria compartida.
+os.environ["SMARTFIT_DB_PATH"] = ":memory:"
+
+import pytest
+
+from db.connection import DEFAULT_DB_PATH, MEMORY, configure_database, get_connection
+from db.init_db import init_db
+from services.attendance_analytics import clear_analytics_cache
+from utils.policy import clear_policy_cache
+from utils.rate_limit import get_login_limiter
+from utils.ref_cache import get_reference_cache
+
+
+def _fingerprint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@pytest.fixture(autouse=True, scope="session")
+def real_db_untouched():
+    """Falla si algo abrió la base real (db/smartFit.db): hasta leerla le cambia el encabezado (WAL)."""
+    before = _fingerprint(DEFAULT_DB_PATH)
+    yield
+    assert _fingerprint(DEFAULT_DB_PATH) == before, "los tests abrieron o modificaron db/smartFit.db"
+
+
+@pytest.fixture(autouse=True)
+def memory_db():
+    """Base en memoria nueva y con el esquema aplicado para cada test."""
+    configure_database(MEMORY)
+    init_db()
+    clear_policy_cache()  # los ids se reutilizan entre bases nuevas
+    get_login_limiter().clear()
+    get_reference_cache().clear()
+    clear_analytics_cache()
+    yield
+    configure_database(MEMORY)
+
+
+# ---------- DATOS BASE ----------
+# Lo que casi todos los tests necesitan; cada archivo agrega solo las filas propias de lo que prueba.
+
+@pytest.fixture
+def gym(memory_db):
+    """Gimnasio 'Centro' (id 1)."""
+    with get_connection() as conn:
+        return conn.execute("INSERT INTO gym (name) VALUES ('Centro')").lastrowid
+
+
+@pytest.fixture
+def users(gym):
+    """Profe (id 1, entrenador), Ana (2) y Beto (3), socios del gimnasio 1; dni = id."""
+    with get_connection() as conn:
+        conn.executemany("INSERT INTO user (gym_id, full_name, dni) VALUES (?, ?, ?)",
+                         [(gym, "Profe", "1"), (gym, "Ana", "2"), (gym, "Beto", "3")])
+    return {"Profe": 1, "Ana": 2, "Beto": 3}
+
+
+@pytest.fixture
+def funcional(users):
+    """Clase 'Funcional' (id 1) del Profe: lunes 2099-01-05 de 10:00 a 11:00, cupo 10, sin reservas."""
+    with get_connection() as conn:
+        return conn.execute("""
+            INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity)
+            VALUES (1, ?, 'Funcional', '2099-01-05 10:00', '2099-01-05 11:00', 10)
+        """, (users["Profe"],)).lastrowid
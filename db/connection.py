@@ -1,9 +1,408 @@
+import json
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.request import pathname2url
 
-DB_PATH = r"C:\\Users\\Juani\\Documents\\POO_Ifts\\smartFit\\smartFit\\db\\smartFit.db"
+from db.records import record_factory
 
-def get_connection():
-    """Devuelve una conexión SQLite lista para usar con timeout para evitar bloqueos transitorios."""
-    conn = sqlite3.connect(DB_PATH, timeout=10)
-    conn.row_factory = sqlite3.Row  # permite acceder a columnas por nombre
+_DB_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.path.join(_DB_DIR, "smartFit.db")
+# Archivo JSON opcional con la configuración local, por ejemplo:
+#   {"db_path": "D:/gym/smartFit.db", "pool_size": 8}
+CONFIG_PATH = os.environ.get("SMARTFIT_CONFIG", os.path.join(os.path.dirname(_DB_DIR), "smartfit.json"))
+# Valor especial de DB_PATH: base en memoria compartida por todo el proceso (tests y benchmarks).
+MEMORY = ":memory:"
+_MEMORY_URI = "file:smartfit_memdb?mode=memory&cache=shared"
+
+
+def _load_config() -> dict:
+    """Lee CONFIG_PATH si existe; si no, devuelve un dict vacío."""
+    if not os.path.exists(CONFIG_PATH):
+        return {}
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+_config = _load_config()
+
+
+def resolve_db_path() -> str:
+    """Ruta de la base: variable SMARTFIT_DB_PATH > 'db_path' del archivo de config > db/smartFit.db."""
+    return os.environ.get("SMARTFIT_DB_PATH") or _config.get("db_path") or DEFAULT_DB_PATH
+
+
+DB_PATH = resolve_db_path()
+# Conexiones de solo lectura (mode=ro): las usan los procesos que generan reportes en paralelo.
+READ_ONLY = False
+
+# Tamaño máximo del pool (conexiones abiertas a la vez) y espera máxima al pedir una.
+POOL_SIZE = int(os.environ.get("SMARTFIT_DB_POOL_SIZE", _config.get("pool_size", 5)))
+POOL_TIMEOUT = float(os.environ.get("SMARTFIT_DB_POOL_TIMEOUT", _config.get("pool_timeout", 10)))
+# Segundos de inactividad a partir de los cuales se valida la conexión antes de reusarla.
+HEALTH_CHECK_AFTER = 30.0
+
+# PRAGMAs que se aplican una sola vez al abrir cada conexión física.
+# WAL permite que los lectores no bloqueen a los escritores (y viceversa);
+# con WAL, synchronous=NORMAL es seguro ante cortes de la app y mucho más rápido que FULL.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": int(_config.get("cache_size_kb", 20000)) * -1,  # negativo = KiB
+    "mmap_size": int(_config.get("mmap_size_mb", 256)) * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+
+def is_memory() -> bool:
+    """True si la app está usando la base en memoria."""
+    return DB_PATH == MEMORY
+
+
+def _connect():
+    """Abre una conexión SQLite nueva y le aplica los PRAGMAs (la usa el pool, no llamar directo)."""
+    if is_memory():
+        conn = sqlite3.connect(_MEMORY_URI, uri=True, timeout=10, check_same_thread=False)
+    elif READ_ONLY:
+        uri = f"file:{pathname2url(os.path.abspath(DB_PATH))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=10, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
+    conn.row_factory = record_factory  # filas livianas con acceso por nombre (db/records.py)
+    for name, value in PRAGMAS.items():
+        if is_memory() and name in ("journal_mode", "mmap_size"):
+            continue  # no aplican a una base en memoria
+        if READ_ONLY and name == "journal_mode":
+            continue  # lo fija quien escribe; una conexión de solo lectura no puede cambiarlo
+        conn.execute(f"PRAGMA {name} = {value}")
+    if READ_ONLY:
+        conn.execute("PRAGMA query_only = 1")
     return conn
+
+
+class _Checkout:
+    """Conexión prestada a un hilo + cantidad de usos anidados en ese hilo."""
+    __slots__ = ("conn", "depth")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.depth = 1
+
+
+class PooledConnection:
+    """
+    Envoltorio liviano sobre una sqlite3.Connection del pool.
+    - Delega todo (cursor, execute, commit, ...) en la conexión real.
+    - close() la devuelve al pool en lugar de cerrarla.
+    - Como context manager: commit si no hubo error, rollback si lo hubo, y devuelve la conexión.
+      Si el bloque está anidado dentro de otro del mismo hilo, el commit/rollback lo decide el externo.
+    """
+    __slots__ = ("_pool", "_checkout", "_closed")
+
+    def __init__(self, pool, checkout):
+        self._pool = pool
+        self._checkout = checkout
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._checkout.conn, name)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._pool._release(self._checkout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._checkout.depth == 1:
+                if exc_type is None:
+                    self._checkout.conn.commit()
+                else:
+                    self._checkout.conn.rollback()
+        finally:
+            self.close()
+        return False
+
+    def __del__(self):
+        # Red de seguridad: si un camino de error no llamó a close(), la conexión vuelve igual al pool.
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite thread-safe.
+    - Cada hilo toma una conexión (checkout) y la reusa en llamadas anidadas hasta soltarla.
+    - Si no hay conexiones libres y se llegó a `size`, espera hasta `timeout` segundos.
+    - Antes de reusar una conexión inactiva hace un health check (SELECT 1) y la descarta si falla.
+    - Lleva contadores de checkouts, esperas, reusos, creaciones y descartes (ver `stats()`).
+    """
+
+    def __init__(self, factory=_connect, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT,
+                 health_check_after: float = HEALTH_CHECK_AFTER):
+        if size <= 0:
+            raise ValueError("⚠️ El tamaño del pool debe ser mayor a 0.")
+        self._factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._idle = []  # [(conn, último_uso)]
+        self._open = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._shutdown = False
+        self._counters = {
+            "checkouts": 0,
+            "reentrant": 0,
+            "reuses": 0,
+            "waits": 0,
+            "created": 0,
+            "discarded": 0,
+            "health_checks": 0,
+        }
+
+    # ---------- CHECKOUT ----------
+    def acquire(self):
+        """Devuelve una PooledConnection para el hilo actual."""
+        checkout = getattr(self._local, "checkout", None)
+        if checkout is not None and checkout.depth > 0:
+            checkout.depth += 1
+            with self._cond:
+                self._counters["checkouts"] += 1
+                self._counters["reentrant"] += 1
+            return PooledConnection(self, checkout)
+
+        checkout = _Checkout(self._take())
+        self._local.checkout = checkout
+        return PooledConnection(self, checkout)
+
+    def _take(self):
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._cond:
+            self._counters["checkouts"] += 1
+        while True:
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    if not waited:
+                        self._counters["waits"] += 1
+                        waited = True
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"⚠️ No hay conexiones libres en el pool (size={self.size}).")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    self._open += 1
+                    conn, last_used = None, None
+
+            if conn is None:
+                try:
+                    conn = self._factory()
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._counters["created"] += 1
+                return conn
+
+            if self._is_healthy(conn, last_used):
+                with self._cond:
+                    self._counters["reuses"] += 1
+                return conn
+            self._discard(conn)
+
+    def _is_healthy(self, conn, last_used):
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        with self._cond:
+            self._counters["health_checks"] += 1
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._counters["discarded"] += 1
+            self._cond.notify()
+
+    # ---------- RELEASE ----------
+    def _release(self, checkout):
+        checkout.depth -= 1
+        if checkout.depth > 0:
+            return
+        if getattr(self._local, "checkout", None) is checkout:
+            self._local.checkout = None
+
+        conn = checkout.conn
+        try:
+            # No dejar transacciones colgadas para el próximo que la use.
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = record_factory
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            if not self._shutdown:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    # ---------- MANTENIMIENTO ----------
+    def close_all(self):
+        """Cierra todas las conexiones libres (las prestadas se cierran al devolverse)."""
+        with self._cond:
+            self._shutdown = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> dict:
+        """Contadores del pool + estado actual (abiertas, libres, en uso)."""
+        with self._cond:
+            data = dict(self._counters)
+            data.update(size=self.size, open=self._open, idle=len(self._idle),
+                        in_use=self._open - len(self._idle))
+        return data
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Devuelve el pool global (se crea en el primer uso)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(size=_default_pool_size())
+    return _pool
+
+
+def _default_pool_size() -> int:
+    # En memoria todas las conexiones comparten caché y se bloquean por tabla,
+    # así que se usa una sola conexión y el pool serializa el acceso entre hilos.
+    return 1 if is_memory() else POOL_SIZE
+
+
+def configure_pool(size: int | None = None, timeout: float | None = None,
+                   health_check_after: float | None = None):
+    """Reemplaza el pool global con nuevos parámetros (cierra las conexiones libres del anterior)."""
+    global _pool
+    with _pool_lock:
+        old = _pool
+        _pool = ConnectionPool(
+            size=size if size is not None else (old.size if old else _default_pool_size()),
+            timeout=timeout if timeout is not None else (old.timeout if old else POOL_TIMEOUT),
+            health_check_after=(health_check_after if health_check_after is not None
+                                else (old.health_check_after if old else HEALTH_CHECK_AFTER)),
+        )
+    if old is not None:
+        old.close_all()
+    return _pool
+
+
+def configure_database(db_path: str | None = None, read_only: bool = False):
+    """
+    Cambia la base en uso y recrea el pool. Sin argumentos vuelve a resolver la ruta
+    (variable de entorno / archivo de config). Con MEMORY (":memory:") arranca una base
+    en memoria vacía; hay que inicializarla con db.init_db.init_db().
+    Con read_only=True las conexiones se abren en modo solo lectura.
+    """
+    global DB_PATH, READ_ONLY, _pool
+    with _pool_lock:
+        old, _pool = _pool, None
+        DB_PATH = db_path or resolve_db_path()
+        READ_ONLY = read_only
+    if old is not None:
+        old.close_all()
+    return configure_pool(size=_default_pool_size())
+
+
+def pool_stats() -> dict:
+    """Atajo a get_pool().stats()."""
+    return get_pool().stats()
+
+
+def get_connection():
+    """
+    Devuelve una conexión del pool lista para usar.
+    Se puede usar como antes (conn.close() la devuelve al pool) o como context manager:
+
+        with get_connection() as conn:
+            conn.execute(...)   # commit automático al salir, rollback si hay excepción
+    """
+    return get_pool().acquire()
+
+
+@contextmanager
+def transaction(immediate: bool = True):
+    """
+    Transacción explícita sobre una conexión del pool.
+    Con immediate=True arranca con BEGIN IMMEDIATE: toma el lock de escritura al inicio, así
+    lo que se lee adentro no puede cambiar antes del INSERT/UPDATE (evita carreras del tipo
+    leer-cupo-y-después-insertar). Si el hilo ya está dentro de una transacción, se suma a ella.
+
+        with transaction() as conn:
+            conn.execute(...)
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        try:
+            yield conn
+        finally:
+            conn.close()
+        return
+
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def update_in_batches(sql: str, params=(), batch_size: int = 1000, pause: float = 0.0) -> int:
+    """
+    Ejecuta un UPDATE/DELETE por lotes: `sql` termina en "LIMIT ?" (p. ej. WHERE id IN (SELECT ... LIMIT ?))
+    y recibe `params` más el tamaño del lote. Cada lote es su propia transacción corta, así un
+    vencimiento masivo no bloquea a los demás escritores. La sentencia tiene que sacar las filas
+    que toca de su propio filtro (si no, no termina). Devuelve el total de filas afectadas.
+    """
+    touched = 0
+    while True:
+        with transaction() as conn:
+            count = conn.execute(sql, (*params, batch_size)).rowcount
+        touched += count
+        if count < batch_size:
+            return touched
+        if pause:
+            time.sleep(pause)  # deja pasar a otros escritores entre lotes
@@ -1,15 +1,23 @@
-import sqlite3
 import os
+import sys
 
-DB_PATH = r"C:\\Users\\Juani\\Documents\\POO_Ifts\\smartFit\\smartFit\\db\\smartFit.db"
-SCHEMA_PATH = "db/schema.sql"
+if __package__ in (None, ""):
+    # Permite ejecutarlo como script (python db/init_db.py) además de python -m db.init_db
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import connection
+from db.connection import get_connection
+from db.migrate import migrate
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
 
 def init_db():
-    # Asegura que la carpeta exista
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    # Asegura que la carpeta exista (no aplica a la base en memoria)
+    if not connection.is_memory():
+        os.makedirs(os.path.dirname(os.path.abspath(connection.DB_PATH)), exist_ok=True)
 
     # Conexión a la base
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     # Ejecuta el esquema
@@ -18,8 +26,11 @@ def init_db():
 
     conn.commit()
     conn.close()
+
+    # Aplica las migraciones posteriores al esquema base
+    migrate()
     print("Base de datos creada correctamente en:")
-    print(DB_PATH)
+    print(connection.DB_PATH)
 
 if __name__ == "__main__":
     init_db()
@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import importlib.util
+import os
+import re
+import sqlite3
+import sys
+import time
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import get_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+DEFAULT_BATCH_SIZE = 5000
+
+_FILENAME = re.compile(r"^(\d{4})_([a-z0-9_]+)\.(sql|py)$")
+
+
+class Migration:
+    """Un archivo de migración: NNNN_nombre.sql o NNNN_nombre.py."""
+
+    def __init__(self, path: str):
+        match = _FILENAME.match(os.path.basename(path))
+        if not match:
+            raise ValueError(f"⚠️ Nombre de migración inválido: {os.path.basename(path)}")
+        self.path = path
+        self.version = int(match.group(1))
+        self.name = match.group(2)
+        self.kind = match.group(3)
+        with open(path, "rb") as f:
+            # Normaliza fin de línea para que el checksum no cambie entre Windows y Linux
+            self.checksum = hashlib.sha256(f.read().replace(b"\r\n", b"\n")).hexdigest()
+
+    def __repr__(self):
+        return f"Migration({self.version:04d}_{self.name}.{self.kind})"
+
+
+class MigrationContext:
+    """
+    Lo que recibe upgrade(ctx) en una migración .py.
+    - execute(): corre SQL dentro de la transacción actual.
+    - backfill(): actualiza una tabla en lotes por rowid, con commit cada `batch_size` filas,
+      para no tomar el lock de escritura durante minutos en tablas grandes.
+    En dry-run no se escribe nada: backfill() solo cuenta cuántas filas tocaría.
+    """
+
+    def __init__(self, conn, dry_run: bool = False, batch_size: int = DEFAULT_BATCH_SIZE,
+                 pause: float = 0.0, log=print):
+        self.conn = conn
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.pause = pause
+        self.log = log
+
+    def execute(self, sql: str, params=()):
+        if self.dry_run:
+            self.log(f"   [dry-run] {' '.join(sql.split())}")
+            return None
+        return self.conn.execute(sql, params)
+
+    def backfill(self, table: str, set_sql: str, where_sql: str = "1 = 1",
+                 params=(), batch_size: int | None = None) -> int:
+        """
+        UPDATE {table} SET {set_sql} WHERE {where_sql}, recorriendo la tabla por rowid en lotes.
+        Cada lote se commitea por separado; la operación es reanudable si where_sql
+        excluye las filas ya actualizadas. Devuelve la cantidad de filas actualizadas.
+        """
+        batch_size = batch_size or self.batch_size
+        if self.dry_run:
+            try:
+                row = self.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where_sql}", params).fetchone()
+            except sqlite3.OperationalError:
+                # El filtro usa columnas que la misma migración todavía no creó: estimar con el total.
+                row = self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+            self.log(f"   [dry-run] backfill {table}: hasta {row[0]} filas en lotes de {batch_size}")
+            return 0
+
+        if self.conn.in_transaction:
+            self.conn.commit()  # los cambios de esquema previos quedan aplicados antes del backfill
+        last_rowid, touched = 0, 0
+        while True:
+            row = self.conn.execute(f"""
+                SELECT MAX(rowid) FROM (
+                    SELECT rowid FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?
+                )
+            """, (last_rowid, batch_size)).fetchone()
+            upper = row[0]
+            if upper is None:
+                break
+            cur = self.conn.execute(f"""
+                UPDATE {table} SET {set_sql}
+                WHERE rowid > ? AND rowid <= ? AND ({where_sql})
+            """, (last_rowid, upper, *params))
+            self.conn.commit()
+            touched += cur.rowcount
+            last_rowid = upper
+            if self.pause:
+                time.sleep(self.pause)  # deja pasar a otros escritores entre lotes
+        self.log(f"   backfill {table}: {touched} filas actualizadas")
+        return touched
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> list[Migration]:
+    """Migraciones del directorio, ordenadas por versión (sin huecos ni repetidas)."""
+    if not os.path.isdir(directory):
+        return []
+    migrations = sorted(
+        (Migration(os.path.join(directory, f)) for f in os.listdir(directory) if _FILENAME.match(f)),
+        key=lambda m: m.version,
+    )
+    for expected, mig in enumerate(migrations, start=1):
+        if mig.version != expected:
+            raise ValueError(f"⚠️ Migraciones fuera de orden: se esperaba {expected:04d} y se encontró {mig!r}.")
+    return migrations
+
+
+def _ensure_version_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INTEGER
+        )
+    """)
+    conn.commit()
+
+
+def applied_versions(conn) -> dict[int, sqlite3.Row]:
+    _ensure_version_table(conn)
+    rows = conn.execute("SELECT version, name, checksum, applied_at FROM schema_version ORDER BY version").fetchall()
+    return {row["version"]: row for row in rows}
+
+
+def _split_sql(script: str) -> list[str]:
+    """Separa un script en sentencias completas (respeta ';' dentro de triggers y strings)."""
+    statements, buffer = [], ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                statements.append(buffer.strip())
+            buffer = ""
+    leftover = [l for l in buffer.splitlines() if l.strip() and not l.strip().startswith("--")]
+    if leftover:
+        raise ValueError("⚠️ La migración termina con una sentencia incompleta.")
+    return statements
+
+
+def _run(conn, mig: Migration, ctx: MigrationContext):
+    if mig.kind == "sql":
+        with open(mig.path, "r", encoding="utf-8") as f:
+            statements = _split_sql(f.read())
+        if ctx.dry_run:
+            for stmt in statements:
+                ctx.execute(stmt)
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        for stmt in statements:
+            conn.execute(stmt)
+        return
+
+    spec = importlib.util.spec_from_file_location(f"smartfit_migration_{mig.version:04d}", mig.path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not ctx.dry_run:
+        conn.execute("BEGIN IMMEDIATE")
+    module.upgrade(ctx)
+
+
+def migrate(dry_run: bool = False, target: int | None = None, batch_size: int = DEFAULT_BATCH_SIZE,
+            pause: float = 0.0, directory: str = MIGRATIONS_DIR, log=print) -> list[Migration]:
+    """
+    Aplica en orden las migraciones pendientes (hasta `target` si se indica).
+    - Verifica que las ya aplicadas no hayan cambiado (checksum).
+    - Las .sql corren completas en una transacción; las .py pueden hacer backfills por lotes.
+    - dry_run=True solo muestra lo que haría.
+    Devuelve la lista de migraciones aplicadas (o que se aplicarían).
+    """
+    migrations = discover(directory)
+    conn = get_connection()
+    try:
+        applied = applied_versions(conn)
+        for mig in migrations:
+            row = applied.get(mig.version)
+            if row is not None and row["checksum"] != mig.checksum:
+                raise ValueError(f"⚠️ La migración {mig!r} cambió después de aplicarse (checksum distinto).")
+
+        pending = [m for m in migrations if m.version not in applied and (target is None or m.version <= target)]
+        for mig in pending:
+            log(f"{'🔎 [dry-run]' if dry_run else '⏩'} {mig.version:04d}_{mig.name}")
+            ctx = MigrationContext(conn, dry_run=dry_run, batch_size=batch_size, pause=pause, log=log)
+            started = time.perf_counter()
+            try:
+                _run(conn, mig, ctx)
+                if not dry_run:
+                    if not conn.in_transaction:
+                        conn.execute("BEGIN IMMEDIATE")
+                    conn.execute("""
+                        INSERT INTO schema_version (version, name, checksum, duration_ms)
+                        VALUES (?, ?, ?, ?)
+                    """, (mig.version, mig.name, mig.checksum, int((time.perf_counter() - started) * 1000)))
+                    conn.commit()
+            except Exception:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+        return pending
+    finally:
+        conn.close()
+
+
+def current_version() -> int:
+    """Última versión aplicada (0 si no hay ninguna)."""
+    conn = get_connection()
+    try:
+        return max(applied_versions(conn), default=0)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplica las migraciones pendientes de SmartFit.")
+    parser.add_argument("--dry-run", action="store_true", help="Muestra lo que haría sin escribir nada.")
+    parser.add_argument("--target", type=int, help="Versión máxima a aplicar.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Filas por lote en backfills.")
+    parser.add_argument("--pause", type=float, default=0.0, help="Segundos de pausa entre lotes de backfill.")
+    args = parser.parse_args()
+    done = migrate(dry_run=args.dry_run, target=args.target, batch_size=args.batch_size, pause=args.pause)
+    print(f"✅ {len(done)} migración(es) {'pendiente(s)' if args.dry_run else 'aplicada(s)'}. "
+          f"Versión actual: {current_version()}")
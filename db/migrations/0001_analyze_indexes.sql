@@ -0,0 +1,4 @@
+-- Estadísticas para el planificador sobre los índices del esquema v2.
+-- analysis_limit acota el muestreo por índice para que sea rápido aun en tablas grandes.
+PRAGMA analysis_limit = 1000;
+ANALYZE;
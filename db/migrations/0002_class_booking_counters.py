@@ -0,0 +1,53 @@
+"""
+Contadores desnormalizados en class: booked_count y waitlist_count.
+Los mantienen triggers sobre booking, así cualquier camino que inserte, cambie de estado
+o borre reservas (modelos, servicios, scripts) los deja consistentes en la misma transacción.
+"""
+
+
+def upgrade(ctx):
+    ctx.execute("ALTER TABLE class ADD COLUMN booked_count INTEGER NOT NULL DEFAULT 0")
+    ctx.execute("ALTER TABLE class ADD COLUMN waitlist_count INTEGER NOT NULL DEFAULT 0")
+
+    ctx.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_booking_counters_insert
+        AFTER INSERT ON booking
+        BEGIN
+            UPDATE class
+            SET booked_count = booked_count + (NEW.status = 'BOOKED'),
+                waitlist_count = waitlist_count + (NEW.status = 'WAITLIST')
+            WHERE id = NEW.class_id;
+        END
+    """)
+    ctx.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_booking_counters_update
+        AFTER UPDATE OF status, class_id ON booking
+        WHEN OLD.status IS NOT NEW.status OR OLD.class_id IS NOT NEW.class_id
+        BEGIN
+            UPDATE class
+            SET booked_count = booked_count - (OLD.status = 'BOOKED'),
+                waitlist_count = waitlist_count - (OLD.status = 'WAITLIST')
+            WHERE id = OLD.class_id;
+            UPDATE class
+            SET booked_count = booked_count + (NEW.status = 'BOOKED'),
+                waitlist_count = waitlist_count + (NEW.status = 'WAITLIST')
+            WHERE id = NEW.class_id;
+        END
+    """)
+    ctx.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_booking_counters_delete
+        AFTER DELETE ON booking
+        BEGIN
+            UPDATE class
+            SET booked_count = booked_count - (OLD.status = 'BOOKED'),
+                waitlist_count = waitlist_count - (OLD.status = 'WAITLIST')
+            WHERE id = OLD.class_id;
+        END
+    """)
+
+    # Los triggers ya están activos: cada lote recalcula desde booking y queda consistente
+    # aunque entren reservas nuevas mientras corre el backfill.
+    ctx.backfill("class", """
+        booked_count = (SELECT COUNT(*) FROM booking b WHERE b.class_id = class.id AND b.status = 'BOOKED'),
+        waitlist_count = (SELECT COUNT(*) FROM booking b WHERE b.class_id = class.id AND b.status = 'WAITLIST')
+    """)
@@ -0,0 +1,139 @@
+-- Tablas de resumen (rollups) para los reportes.
+-- db/rollups.py las completa de forma incremental: cada rollup guarda en rollup_watermark
+-- el último id de origen ya procesado y en cada refresco solo agrega las filas nuevas.
+-- Los cambios sobre filas ya procesadas (estado de un pago, cierre de un plan, presente/ausente,
+-- borrados) los aplican como delta los triggers de abajo, solo si la fila está bajo la marca.
+
+CREATE TABLE IF NOT EXISTS rollup_watermark (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL DEFAULT 0,
+    refreshed_at DATETIME
+);
+
+INSERT OR IGNORE INTO rollup_watermark (name) VALUES
+    ('revenue_daily'), ('attendance_daily'), ('trainer_plans');
+
+-- Recaudación diaria por gimnasio / membresía / método / motivo / estado
+CREATE TABLE IF NOT EXISTS rollup_revenue_daily (
+    gym_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    membership_id INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    purpose TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payments INTEGER NOT NULL DEFAULT 0,
+    amount DECIMAL(12,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (gym_id, day, membership_id, method, purpose, status)
+);
+
+-- Asistencia diaria por clase
+CREATE TABLE IF NOT EXISTS rollup_attendance_daily (
+    class_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    gym_id INTEGER NOT NULL,
+    present INTEGER NOT NULL DEFAULT 0,
+    absent INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (class_id, day)
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_attendance_gym_day
+    ON rollup_attendance_daily(gym_id, day);
+
+-- Planes por entrenador
+CREATE TABLE IF NOT EXISTS rollup_trainer_plans (
+    trainer_id INTEGER PRIMARY KEY,
+    total_plans INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+
+-------------------------------------------------------
+-- payment -> rollup_revenue_daily
+-------------------------------------------------------
+CREATE TRIGGER IF NOT EXISTS trg_rollup_revenue_update
+AFTER UPDATE OF member_membership_id, paid_at, amount, method, purpose, status ON payment
+WHEN OLD.id <= (SELECT last_id FROM rollup_watermark WHERE name = 'revenue_daily')
+BEGIN
+    UPDATE rollup_revenue_daily
+    SET payments = payments - 1, amount = amount - OLD.amount
+    WHERE gym_id = (SELECT u.gym_id FROM member_membership mm JOIN user u ON u.id = mm.user_id
+                    WHERE mm.id = OLD.member_membership_id)
+      AND day = date(OLD.paid_at)
+      AND membership_id = (SELECT membership_id FROM member_membership WHERE id = OLD.member_membership_id)
+      AND method = OLD.method AND purpose = OLD.purpose AND status = OLD.status;
+    INSERT INTO rollup_revenue_daily (gym_id, day, membership_id, method, purpose, status, payments, amount)
+    SELECT u.gym_id, date(NEW.paid_at), mm.membership_id, NEW.method, NEW.purpose, NEW.status, 1, NEW.amount
+    FROM member_membership mm JOIN user u ON u.id = mm.user_id
+    WHERE mm.id = NEW.member_membership_id
+    ON CONFLICT (gym_id, day, membership_id, method, purpose, status) DO UPDATE
+    SET payments = payments + 1, amount = amount + excluded.amount;
+    DELETE FROM rollup_revenue_daily WHERE payments <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_revenue_delete
+AFTER DELETE ON payment
+WHEN OLD.id <= (SELECT last_id FROM rollup_watermark WHERE name = 'revenue_daily')
+BEGIN
+    UPDATE rollup_revenue_daily
+    SET payments = payments - 1, amount = amount - OLD.amount
+    WHERE gym_id = (SELECT u.gym_id FROM member_membership mm JOIN user u ON u.id = mm.user_id
+                    WHERE mm.id = OLD.member_membership_id)
+      AND day = date(OLD.paid_at)
+      AND membership_id = (SELECT membership_id FROM member_membership WHERE id = OLD.member_membership_id)
+      AND method = OLD.method AND purpose = OLD.purpose AND status = OLD.status;
+    DELETE FROM rollup_revenue_daily WHERE payments <= 0;
+END;
+
+-------------------------------------------------------
+-- attendance -> rollup_attendance_daily
+-------------------------------------------------------
+CREATE TRIGGER IF NOT EXISTS trg_rollup_attendance_update
+AFTER UPDATE OF booking_id, present, checked_at ON attendance
+WHEN OLD.id <= (SELECT last_id FROM rollup_watermark WHERE name = 'attendance_daily')
+BEGIN
+    UPDATE rollup_attendance_daily
+    SET present = present - (OLD.present != 0), absent = absent - (OLD.present = 0)
+    WHERE class_id = (SELECT class_id FROM booking WHERE id = OLD.booking_id)
+      AND day = date(OLD.checked_at);
+    INSERT INTO rollup_attendance_daily (class_id, day, gym_id, present, absent)
+    SELECT c.id, date(NEW.checked_at), c.gym_id, (NEW.present != 0), (NEW.present = 0)
+    FROM booking b JOIN class c ON c.id = b.class_id
+    WHERE b.id = NEW.booking_id
+    ON CONFLICT (class_id, day) DO UPDATE
+    SET present = present + excluded.present, absent = absent + excluded.absent;
+    DELETE FROM rollup_attendance_daily WHERE present <= 0 AND absent <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_attendance_delete
+AFTER DELETE ON attendance
+WHEN OLD.id <= (SELECT last_id FROM rollup_watermark WHERE name = 'attendance_daily')
+BEGIN
+    UPDATE rollup_attendance_daily
+    SET present = present - (OLD.present != 0), absent = absent - (OLD.present = 0)
+    WHERE class_id = (SELECT class_id FROM booking WHERE id = OLD.booking_id)
+      AND day = date(OLD.checked_at);
+    DELETE FROM rollup_attendance_daily WHERE present <= 0 AND absent <= 0;
+END;
+
+-------------------------------------------------------
+-- training_plan -> rollup_trainer_plans
+-------------------------------------------------------
+CREATE TRIGGER IF NOT EXISTS trg_rollup_trainer_plans_update
+AFTER UPDATE OF trainer_id, status ON training_plan
+WHEN OLD.id <= (SELECT last_id FROM rollup_watermark WHERE name = 'trainer_plans')
+BEGIN
+    UPDATE rollup_trainer_plans
+    SET total_plans = total_plans - 1, completed = completed - (OLD.status = 'CLOSED')
+    WHERE trainer_id = OLD.trainer_id;
+    INSERT INTO rollup_trainer_plans (trainer_id, total_plans, completed)
+    VALUES (NEW.trainer_id, 1, (NEW.status = 'CLOSED'))
+    ON CONFLICT (trainer_id) DO UPDATE
+    SET total_plans = total_plans + 1, completed = completed + excluded.completed;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rollup_trainer_plans_delete
+AFTER DELETE ON training_plan
+WHEN OLD.id <= (SELECT last_id FROM rollup_watermark WHERE name = 'trainer_plans')
+BEGIN
+    UPDATE rollup_trainer_plans
+    SET total_plans = total_plans - 1, completed = completed - (OLD.status = 'CLOSED')
+    WHERE trainer_id = OLD.trainer_id;
+END;
@@ -0,0 +1,9 @@
+-- Bloqueos de login persistidos (opcional, SMARTFIT_LOGIN_PERSIST=1).
+-- utils/rate_limit.py los mantiene en memoria; esta tabla solo guarda los bloqueos vigentes
+-- para que un reinicio del proceso no los borre. key = 'dni:<dni>' o 'src:<origen>'.
+
+CREATE TABLE IF NOT EXISTS login_throttle (
+    key TEXT PRIMARY KEY,
+    failures INTEGER NOT NULL DEFAULT 0,
+    locked_until REAL NOT NULL
+);
@@ -0,0 +1,11 @@
+-- Índices para la paginación por cursor (db/pagination.py).
+-- El id (rowid) va implícito al final de cada índice, así que (start_at, id) y (start_date, id)
+-- salen ya ordenados: cada página es un recorrido corto del índice, sin ordenar toda la tabla.
+
+-- ClassSession.list_all_classes (ADMIN / MEMBER): ORDER BY start_at, id
+CREATE INDEX IF NOT EXISTS idx_class_start
+    ON class(start_at);
+
+-- TrainerAssignment.list_all_assignments (ADMIN): ORDER BY start_date DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_trainer_assignment_start
+    ON trainer_assignment(start_date);
@@ -0,0 +1,5 @@
+-- Detección de choques de horario (ClassSession.find_conflicts).
+-- Los choques de entrenador usan idx_class_trainer_start; para la sala hace falta (gym_id, room, start_at):
+-- cada alta revisa solo el rango [inicio - MAX_CLASS_HOURS, fin) de esa sala, sin recorrer toda la tabla.
+CREATE INDEX IF NOT EXISTS idx_class_gym_room_start
+    ON class(gym_id, room, start_at);
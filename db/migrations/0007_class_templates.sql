@@ -0,0 +1,27 @@
+-- Clases recurrentes: una plantilla ("Spinning, lun/mié/vie 07:00, sala 2, cupo 20") se materializa
+-- en filas de class para las próximas N semanas (ClassTemplate.generate).
+CREATE TABLE IF NOT EXISTS class_template (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    gym_id INTEGER NOT NULL,
+    trainer_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    weekdays TEXT NOT NULL,                -- "0,2,4" (lunes = 0 ... domingo = 6)
+    start_time TEXT NOT NULL,              -- "HH:MM"
+    duration_minutes INTEGER NOT NULL CHECK(duration_minutes > 0),
+    capacity INTEGER NOT NULL CHECK(capacity > 0),
+    room TEXT,
+    active INTEGER NOT NULL DEFAULT 1,
+    generated_until DATE,                  -- último día ya materializado: la próxima corrida sigue desde acá
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (gym_id) REFERENCES gym(id) ON DELETE CASCADE,
+    FOREIGN KEY (trainer_id) REFERENCES user(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_class_template_active
+    ON class_template(active, gym_id);
+
+ALTER TABLE class ADD COLUMN template_id INTEGER REFERENCES class_template(id) ON DELETE SET NULL;
+
+-- Una sola clase por plantilla y horario: regenerar el mismo rango no duplica (INSERT OR IGNORE).
+CREATE UNIQUE INDEX IF NOT EXISTS idx_class_template_start
+    ON class(template_id, start_at) WHERE template_id IS NOT NULL;
@@ -0,0 +1,10 @@
+-- Una sola asistencia por reserva: Attendance.mark_many e ingest_checkins hacen upsert
+-- (INSERT ... ON CONFLICT(booking_id)). Antes se borran los duplicados viejos, quedando
+-- el registro más reciente de cada reserva (los triggers de rollups descuentan los borrados).
+DELETE FROM attendance
+WHERE id NOT IN (SELECT MAX(id) FROM attendance GROUP BY booking_id);
+
+-- Mismo nombre que el índice anterior: schema.sql ("IF NOT EXISTS") y query_plan siguen valiendo.
+DROP INDEX IF EXISTS idx_attendance_booking;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_booking
+    ON attendance(booking_id);
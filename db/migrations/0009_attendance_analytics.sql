@@ -0,0 +1,59 @@
+-- Registro de cambios para la analítica de asistencia (services/attendance_analytics.py).
+-- Cada alta, cambio de estado o borrado de una reserva o asistencia anota (socio, clase).
+-- La cache por gimnasio recuerda el último id que leyó y en cada refresco recalcula
+-- solo esos socios y clases, en lugar de toda la historia del gimnasio.
+
+CREATE TABLE IF NOT EXISTS analytics_change (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    member_id INTEGER NOT NULL,
+    class_id INTEGER NOT NULL,
+    changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-------------------------------------------------------
+-- booking
+-------------------------------------------------------
+CREATE TRIGGER IF NOT EXISTS trg_analytics_booking_insert
+AFTER INSERT ON booking
+BEGIN
+    INSERT INTO analytics_change (member_id, class_id) VALUES (NEW.member_id, NEW.class_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_analytics_booking_update
+AFTER UPDATE OF status, member_id, class_id ON booking
+WHEN OLD.status IS NOT NEW.status OR OLD.member_id IS NOT NEW.member_id OR OLD.class_id IS NOT NEW.class_id
+BEGIN
+    INSERT INTO analytics_change (member_id, class_id)
+    SELECT OLD.member_id, OLD.class_id UNION SELECT NEW.member_id, NEW.class_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_analytics_booking_delete
+AFTER DELETE ON booking
+BEGIN
+    INSERT INTO analytics_change (member_id, class_id) VALUES (OLD.member_id, OLD.class_id);
+END;
+
+-------------------------------------------------------
+-- attendance
+-------------------------------------------------------
+CREATE TRIGGER IF NOT EXISTS trg_analytics_attendance_insert
+AFTER INSERT ON attendance
+BEGIN
+    INSERT INTO analytics_change (member_id, class_id)
+    SELECT member_id, class_id FROM booking WHERE id = NEW.booking_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_analytics_attendance_update
+AFTER UPDATE OF present, booking_id ON attendance
+WHEN OLD.present IS NOT NEW.present OR OLD.booking_id IS NOT NEW.booking_id
+BEGIN
+    INSERT INTO analytics_change (member_id, class_id)
+    SELECT member_id, class_id FROM booking WHERE id IN (OLD.booking_id, NEW.booking_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_analytics_attendance_delete
+AFTER DELETE ON attendance
+BEGIN
+    INSERT INTO analytics_change (member_id, class_id)
+    SELECT member_id, class_id FROM booking WHERE id = OLD.booking_id;
+END;
@@ -0,0 +1,24 @@
+-- Faltazos (reserva BOOKED sin asistencia en una clase ya terminada) y bloqueos de reserva.
+-- models/no_show.py los registra en lote después de cada clase; Booking.create consulta
+-- booking_ban por su clave primaria (member_id) antes de reservar.
+
+CREATE TABLE IF NOT EXISTS no_show (
+    booking_id INTEGER PRIMARY KEY,        -- un faltazo por reserva: reevaluar no duplica
+    member_id INTEGER NOT NULL,
+    class_id INTEGER NOT NULL,
+    class_end DATETIME NOT NULL,
+    recorded_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (booking_id) REFERENCES booking(id) ON DELETE CASCADE
+);
+
+-- Faltazos recientes de un socio (conteo para el bloqueo)
+CREATE INDEX IF NOT EXISTS idx_no_show_member_end
+    ON no_show(member_id, class_end);
+
+CREATE TABLE IF NOT EXISTS booking_ban (
+    member_id INTEGER PRIMARY KEY,
+    banned_until DATETIME NOT NULL,
+    reason TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (member_id) REFERENCES user(id) ON DELETE CASCADE
+);
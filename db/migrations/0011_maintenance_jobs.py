@@ -0,0 +1,42 @@
+"""
+Tareas programadas (services/scheduler.py): vencimiento de membresías, cierre de clases,
+limpieza de listas de espera y refresco de rollups. Cada tarea actualiza en lotes chicos
+(LIMIT por lote, una transacción por lote) y los índices parciales de abajo hacen que
+encontrar "lo que falta procesar" sea un recorrido corto aunque las tablas crezcan.
+"""
+from utils.clock import now_str
+
+
+def upgrade(ctx):
+    # Ciclo de vida de la clase: SCHEDULED hasta que termina, después COMPLETED (job complete_classes).
+    ctx.execute("""
+        ALTER TABLE class ADD COLUMN status TEXT NOT NULL DEFAULT 'SCHEDULED'
+            CHECK(status IN ('SCHEDULED','COMPLETED'))
+    """)
+    # Clases terminadas y todavía sin cerrar: solo indexa las pendientes
+    ctx.execute("CREATE INDEX IF NOT EXISTS idx_class_scheduled_end ON class(end_at) WHERE status = 'SCHEDULED'")
+    # Membresías activas con fecha de fin (job expire_memberships)
+    ctx.execute("""
+        CREATE INDEX IF NOT EXISTS idx_member_membership_active_end
+            ON member_membership(end_date) WHERE status = 'ACTIVE'
+    """)
+    # Listas de espera vigentes (job cleanup_waitlists): pocas filas, índice chico
+    ctx.execute("CREATE INDEX IF NOT EXISTS idx_booking_waitlist ON booking(class_id) WHERE status = 'WAITLIST'")
+
+    # Última corrida y acumulados de cada tarea: una fila por tarea, se pisa en cada corrida.
+    ctx.execute("""
+        CREATE TABLE IF NOT EXISTS job_stats (
+            name TEXT PRIMARY KEY,
+            runs INTEGER NOT NULL DEFAULT 0,
+            failures INTEGER NOT NULL DEFAULT 0,
+            rows_total INTEGER NOT NULL DEFAULT 0,
+            duration_ms_total INTEGER NOT NULL DEFAULT 0,
+            last_rows INTEGER,
+            last_duration_ms INTEGER,
+            last_run_at DATETIME,
+            last_error TEXT
+        )
+    """)
+
+    # Las clases que ya pasaron se cierran ahora (hora local, igual que end_at: utils.clock)
+    ctx.backfill("class", "status = 'COMPLETED'", "status = 'SCHEDULED' AND end_at <= ?", (now_str(),))
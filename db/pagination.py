@@ -0,0 +1,73 @@
+# db/pagination.py
+"""
+Paginación por cursor (keyset) para los listados.
+En lugar de OFFSET (que relee y descarta todas las filas anteriores), cada página pide
+"lo que viene después de la última fila vista" según el orden del listado:
+
+    WHERE (p.paid_at, p.id) < (?, ?)  ORDER BY p.paid_at DESC, p.id DESC  LIMIT n + 1
+
+La fila extra solo sirve para saber si hay otra página. El cursor de la página siguiente
+(`next_cursor`) es el id de la última fila, o la tupla (clave_de_orden, id) si el orden es compuesto.
+"""
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+
+class Page(list):
+    """Lista de filas de una página + `next_cursor` (None si es la última). Se usa como una lista común."""
+    __slots__ = ("next_cursor",)
+
+    def __init__(self, rows=(), next_cursor=None):
+        super().__init__(rows)
+        self.next_cursor = next_cursor
+
+
+def page_size(limit) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    if limit <= 0:
+        raise ValueError("⚠️ El tamaño de página debe ser mayor a 0.")
+    return min(int(limit), MAX_PAGE_SIZE)
+
+
+def keyset(columns, after, descending: bool = False):
+    """
+    Condición SQL para empezar después de `after`.
+    columns: "tabla.id" o ("tabla.orden", "tabla.id"). Devuelve (sql, params); sql vacío si after es None.
+    """
+    if after is None:
+        return "", ()
+    op = "<" if descending else ">"
+    if isinstance(columns, str):
+        return f"{columns} {op} ?", (after,)
+    sort_value, row_id = after
+    return f"({', '.join(columns)}) {op} (?, ?)", (sort_value, row_id)
+
+
+def order_by(columns, descending: bool = False) -> str:
+    direction = " DESC" if descending else " ASC"
+    cols = (columns,) if isinstance(columns, str) else columns
+    return "ORDER BY " + ", ".join(c + direction for c in cols)
+
+
+def fetch_page(cur, limit: int, key) -> Page:
+    """
+    Lee hasta limit + 1 filas de un cursor ya ejecutado con LIMIT limit + 1.
+    key(fila) -> cursor de esa fila (su id o (clave_de_orden, id)).
+    """
+    rows = cur.fetchmany(limit + 1)
+    if len(rows) > limit:
+        return Page(rows[:limit], key(rows[limit - 1]))
+    return Page(rows)
+
+
+def iter_pages(list_fn, *args, **kwargs):
+    """Recorre todas las páginas de un listado paginado: for page in iter_pages(User.list_all_users): ..."""
+    after = kwargs.pop("after", None)
+    while True:
+        page = list_fn(*args, after=after, **kwargs)
+        yield page
+        if page.next_cursor is None:
+            return
+        after = page.next_cursor
@@ -0,0 +1,167 @@
+import os
+import sys
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import get_connection
+
+# Consultas calientes de la app -> (SQL, parámetros de ejemplo, índices que el plan debe usar).
+HOT_QUERIES = {
+    "auth.login_by_dni": (
+        """SELECT u.id, u.full_name, u.gym_id, a.password
+           FROM user u
+           JOIN user_auth a ON a.user_id = u.id
+           WHERE u.dni = ?""",
+        ("1",),
+        ["sqlite_autoindex_user_1", "sqlite_autoindex_user_auth_1"],
+    ),
+    "auth.roles_by_user": (
+        """SELECT r.code FROM user_role ur JOIN role r ON r.id = ur.role_id
+           WHERE ur.user_id = ?""",
+        (1,),
+        ["idx_user_role_user"],
+    ),
+    "booking.booked_count": (
+        "SELECT COUNT(*) FROM booking WHERE class_id = ? AND status = 'BOOKED'",
+        (1,),
+        ["idx_booking_class_status_booked"],
+    ),
+    "booking.has_active_booking": (
+        """SELECT 1 FROM booking
+           WHERE class_id = ? AND member_id = ? AND status IN ('BOOKED','WAITLIST')
+           LIMIT 1""",
+        (1, 1),
+        ["idx_booking_member_status"],
+    ),
+    "booking.next_waitlist": (
+        """SELECT id FROM booking
+           WHERE class_id = ? AND status = 'WAITLIST'
+           ORDER BY booked_at ASC, id ASC
+           LIMIT 1""",
+        (1,),
+        ["idx_booking_class_status_booked"],
+    ),
+    "booking.active_ban": (
+        "SELECT banned_until, reason FROM booking_ban WHERE member_id = ? AND banned_until > ?",
+        (1, "2025-01-01 00:00"),
+        ["INTEGER PRIMARY KEY"],
+    ),
+    "no_show.ended_classes": (
+        """SELECT b.id FROM class c
+           CROSS JOIN booking b ON b.class_id = c.id AND b.status = 'BOOKED'
+           WHERE c.start_at >= ? AND c.end_at <= ?""",
+        ("2025-01-01 00:00", "2025-01-02 00:00"),
+        ["idx_class_start", "idx_booking_class_status_booked"],
+    ),
+    "booking.list_by_user": (
+        """SELECT b.id, b.class_id, c.name, c.start_at, b.status
+           FROM booking b
+           JOIN class c ON c.id = b.class_id
+           WHERE b.member_id = ?""",
+        (1,),
+        ["idx_booking_member_status"],
+    ),
+    "member_membership.active_by_user": (
+        """SELECT id FROM member_membership
+           WHERE user_id = ? AND status = 'ACTIVE'""",
+        (1,),
+        ["idx_member_membership_user_status_end"],
+    ),
+    "payment.list_by_user": (
+        """SELECT p.*
+           FROM payment p
+           JOIN member_membership mm ON mm.id = p.member_membership_id
+           WHERE mm.user_id = ?
+           ORDER BY p.paid_at DESC, p.id DESC""",
+        (1,),
+        ["idx_member_membership_user_status_end", "idx_payment_mm_status_paid"],
+    ),
+    "class.list_by_gym": (
+        """SELECT id, name, start_at, end_at, capacity
+           FROM class
+           WHERE gym_id = ?
+           ORDER BY start_at ASC""",
+        (1,),
+        ["idx_class_gym_start"],
+    ),
+    "class.trainer_conflicts": (
+        """SELECT id FROM class
+           WHERE trainer_id = ? AND start_at >= ? AND start_at < ? AND end_at > ? AND id IS NOT ?""",
+        (1, "2025-01-01 00:00", "2025-01-01 11:00", "2025-01-01 10:00", None),
+        ["idx_class_trainer_start"],
+    ),
+    "class.room_conflicts": (
+        """SELECT id FROM class
+           WHERE gym_id = ? AND room = ? AND start_at >= ? AND start_at < ? AND end_at > ? AND id IS NOT ?""",
+        (1, "Sala 1", "2025-01-01 00:00", "2025-01-01 11:00", "2025-01-01 10:00", None),
+        ["idx_class_gym_room_start"],
+    ),
+    "scheduler.ended_classes": (
+        "SELECT id FROM class WHERE status = 'SCHEDULED' AND end_at <= ? LIMIT ?",
+        ("2025-01-01 00:00", 500),
+        ["idx_class_scheduled_end"],
+    ),
+    "scheduler.stale_waitlists": (
+        """SELECT b.id FROM booking b
+           CROSS JOIN class c ON c.id = b.class_id
+           WHERE b.status = 'WAITLIST' AND c.start_at <= ?
+           LIMIT ?""",
+        ("2025-01-01 00:00", 500),
+        ["idx_booking_waitlist"],
+    ),
+    "scheduler.expired_memberships": (
+        """SELECT id FROM member_membership
+           WHERE status = 'ACTIVE' AND end_date IS NOT NULL AND end_date < CURRENT_TIMESTAMP
+           LIMIT ?""",
+        (500,),
+        ["idx_member_membership_active_end"],
+    ),
+    "analytics.prune_changes": (
+        "DELETE FROM analytics_change WHERE id < ?",
+        (1,),
+        ["INTEGER PRIMARY KEY"],
+    ),
+    "attendance.by_booking": (
+        "SELECT id FROM attendance WHERE booking_id = ?",
+        (1,),
+        ["idx_attendance_booking"],
+    ),
+}
+
+
+def explain(sql: str, params=(), conn=None) -> list[str]:
+    """Devuelve las líneas 'detail' de EXPLAIN QUERY PLAN para una consulta."""
+    own = conn is None
+    conn = conn or get_connection()
+    try:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+    finally:
+        if own:
+            conn.close()
+
+
+def check_hot_queries(conn=None) -> list[dict]:
+    """
+    Corre EXPLAIN QUERY PLAN sobre HOT_QUERIES.
+    Devuelve una lista de {"name", "plan", "missing", "ok"}; ok=False si falta algún índice esperado.
+    """
+    results = []
+    for name, (sql, params, indexes) in HOT_QUERIES.items():
+        plan = explain(sql, params, conn)
+        text = "\n".join(plan)
+        missing = [idx for idx in indexes if idx not in text]
+        results.append({"name": name, "plan": plan, "missing": missing, "ok": not missing})
+    return results
+
+
+if __name__ == "__main__":
+    failed = 0
+    for r in check_hot_queries():
+        print(f"{'✅' if r['ok'] else '❌'} {r['name']}")
+        for line in r["plan"]:
+            print(f"     {line}")
+        if not r["ok"]:
+            failed += 1
+            print(f"     falta usar: {', '.join(r['missing'])}")
+    sys.exit(1 if failed else 0)
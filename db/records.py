@@ -0,0 +1,99 @@
+# db/records.py
+from operator import itemgetter
+
+# Cuántas clases de registro (una por conjunto de columnas) se guardan antes de empezar de nuevo.
+MAX_RECORD_CLASSES = 256
+
+
+class Record(tuple):
+    """
+    Fila liviana: una tupla (sin __dict__) con acceso por nombre.
+    Se usa como row_factory de todas las conexiones en lugar de sqlite3.Row:
+      row["full_name"], row.full_name, row[0], dict(row), row.keys() y desempaquetado funcionan igual.
+    Cada conjunto de columnas tiene su propia subclase (ver record_class), creada una sola vez.
+    """
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            try:
+                key = self._index[key]
+            except KeyError:
+                raise IndexError(f"No item with that key: {key!r}") from None
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return list(self._fields)
+
+    def get(self, key, default=None):
+        index = self._index.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def _asdict(self) -> dict:
+        return dict(zip(self._fields, self))
+
+    def __repr__(self):
+        values = ", ".join(f"{k}={v!r}" for k, v in zip(self._fields, self))
+        return f"{type(self).__name__}({values})"
+
+    def __reduce__(self):
+        # Las subclases son dinámicas: se serializan como (columnas, valores) para viajar entre procesos.
+        return _rebuild, (self._fields, tuple(self))
+
+
+_classes = {}       # columnas -> subclase de Record
+_by_description = {}  # id(cursor.description) -> (description, subclase)
+
+
+def record_class(fields: tuple, name: str = "Record"):
+    """Subclase de Record para estas columnas (cacheada). Como sqlite3.Row, los nombres no distinguen mayúsculas."""
+    fields = tuple(fields)
+    cls = _classes.get((name, fields))
+    if cls is not None:
+        return cls
+
+    index = {}
+    for i, field in enumerate(fields):
+        index.setdefault(field, i)          # columnas repetidas en un JOIN: gana la primera
+        index.setdefault(field.lower(), i)
+        index.setdefault(field.upper(), i)
+    namespace = {"__slots__": (), "_fields": fields, "_index": index}
+    for i, field in enumerate(fields):
+        if field.isidentifier() and not field.startswith("_") and field not in namespace \
+                and not hasattr(Record, field):
+            namespace[field] = property(itemgetter(i))
+    cls = type(name, (Record,), namespace)
+
+    if len(_classes) >= MAX_RECORD_CLASSES:
+        _classes.clear()
+    _classes[(name, fields)] = cls
+    return cls
+
+
+def _rebuild(fields, values):
+    return record_class(fields)(values)
+
+
+def record_factory(cursor, row):
+    """row_factory de las conexiones del pool: arma un Record con las columnas de la consulta."""
+    description = cursor.description
+    entry = _by_description.get(id(description))
+    if entry is None or entry[0] is not description:
+        # description es el mismo objeto para todas las filas de una consulta: se resuelve una vez
+        entry = (description, record_class(tuple(col[0] for col in description)))
+        if len(_by_description) >= MAX_RECORD_CLASSES:
+            _by_description.clear()
+        _by_description[id(description)] = entry
+    return entry[1](row)
+
+
+def tuple_cursor(conn):
+    """
+    Cursor en "modo tupla" para caminos masivos (exportaciones, agregados): las filas son tuplas
+    planas, sin nombres. El orden de las columnas es el del SELECT.
+    """
+    cur = conn.cursor()
+    cur.row_factory = None
+    return cur
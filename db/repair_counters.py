@@ -0,0 +1,36 @@
+import os
+import sys
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import get_connection
+
+_BOOKED = "(SELECT COUNT(*) FROM booking b WHERE b.class_id = class.id AND b.status = 'BOOKED')"
+_WAITLIST = "(SELECT COUNT(*) FROM booking b WHERE b.class_id = class.id AND b.status = 'WAITLIST')"
+
+
+def repair_class_counters(class_id: int | None = None) -> int:
+    """
+    Recalcula class.booked_count / waitlist_count desde booking.
+    Solo toca las clases desincronizadas (todas, o solo `class_id`). Devuelve cuántas corrigió.
+    """
+    where = f"(booked_count != {_BOOKED} OR waitlist_count != {_WAITLIST})"
+    params = ()
+    if class_id is not None:
+        where += " AND id = ?"
+        params = (class_id,)
+
+    with get_connection() as conn:
+        cur = conn.execute(f"""
+            UPDATE class
+            SET booked_count = {_BOOKED},
+                waitlist_count = {_WAITLIST}
+            WHERE {where}
+        """, params)
+        return cur.rowcount
+
+
+if __name__ == "__main__":
+    fixed = repair_class_counters(int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    print(f"🔧 Contadores de reservas corregidos en {fixed} clase(s).")
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import transaction
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Rollup -> (tabla de origen, tabla destino, INSERT ... SELECT que agrega las filas con id en (?, ?]).
+# Los triggers de la migración 0003 corrigen las filas ya procesadas que cambian o se borran.
+ROLLUPS = {
+    "revenue_daily": ("payment", "rollup_revenue_daily", """
+        INSERT INTO rollup_revenue_daily (gym_id, day, membership_id, method, purpose, status, payments, amount)
+        SELECT u.gym_id, date(p.paid_at), mm.membership_id, p.method, p.purpose, p.status,
+               COUNT(*), SUM(p.amount)
+        FROM payment p
+        JOIN member_membership mm ON mm.id = p.member_membership_id
+        JOIN user u ON u.id = mm.user_id
+        WHERE p.id > ? AND p.id <= ?
+        GROUP BY u.gym_id, date(p.paid_at), mm.membership_id, p.method, p.purpose, p.status
+        ON CONFLICT (gym_id, day, membership_id, method, purpose, status) DO UPDATE
+        SET payments = payments + excluded.payments, amount = amount + excluded.amount
+    """),
+    "attendance_daily": ("attendance", "rollup_attendance_daily", """
+        INSERT INTO rollup_attendance_daily (class_id, day, gym_id, present, absent)
+        SELECT c.id, date(a.checked_at), c.gym_id,
+               SUM(a.present != 0), SUM(a.present = 0)
+        FROM attendance a
+        JOIN booking b ON b.id = a.booking_id
+        JOIN class c ON c.id = b.class_id
+        WHERE a.id > ? AND a.id <= ?
+        GROUP BY c.id, date(a.checked_at)
+        ON CONFLICT (class_id, day) DO UPDATE
+        SET present = present + excluded.present, absent = absent + excluded.absent
+    """),
+    "trainer_plans": ("training_plan", "rollup_trainer_plans", """
+        INSERT INTO rollup_trainer_plans (trainer_id, total_plans, completed)
+        SELECT tp.trainer_id, COUNT(*), SUM(tp.status = 'CLOSED')
+        FROM training_plan tp
+        WHERE tp.id > ? AND tp.id <= ?
+        GROUP BY tp.trainer_id
+        ON CONFLICT (trainer_id) DO UPDATE
+        SET total_plans = total_plans + excluded.total_plans, completed = completed + excluded.completed
+    """),
+}
+
+
+def _refresh_one(name: str, batch_size: int) -> int:
+    source, _, sql = ROLLUPS[name]
+    processed = 0
+    while True:
+        # Cada lote es su propia transacción: la marca avanza junto con los totales,
+        # así un refresco cortado a la mitad se retoma sin contar dos veces.
+        with transaction() as conn:
+            last_id = conn.execute("SELECT last_id FROM rollup_watermark WHERE name = ?", (name,)).fetchone()[0]
+            row = conn.execute(f"""
+                SELECT MAX(id), COUNT(*) FROM (
+                    SELECT id FROM {source} WHERE id > ? ORDER BY id LIMIT ?
+                )
+            """, (last_id, batch_size)).fetchone()
+            upper, count = row[0], row[1]
+            if upper is None:
+                conn.execute("UPDATE rollup_watermark SET refreshed_at = CURRENT_TIMESTAMP WHERE name = ?", (name,))
+                return processed
+            conn.execute(sql, (last_id, upper))
+            conn.execute("""
+                UPDATE rollup_watermark SET last_id = ?, refreshed_at = CURRENT_TIMESTAMP WHERE name = ?
+            """, (upper, name))
+        processed += count
+        if count < batch_size:
+            return processed
+
+
+def refresh_rollups(names=None, batch_size: int = DEFAULT_BATCH_SIZE) -> dict[str, int]:
+    """
+    Agrega a los rollups las filas nuevas desde la última marca (todos, o solo `names`).
+    Devuelve {rollup: filas de origen procesadas}; 0 si no había nada nuevo.
+    """
+    names = list(names or ROLLUPS)
+    unknown = [n for n in names if n not in ROLLUPS]
+    if unknown:
+        raise ValueError(f"⚠️ Rollup inválido: {', '.join(unknown)}. Opciones: {', '.join(ROLLUPS)}")
+    return {name: _refresh_one(name, batch_size) for name in names}
+
+
+def rebuild_rollups(names=None, batch_size: int = DEFAULT_BATCH_SIZE) -> dict[str, int]:
+    """Vacía los rollups, vuelve la marca a 0 y los recalcula completos (reparación)."""
+    names = list(names or ROLLUPS)
+    for name in names:
+        _, table, _ = ROLLUPS[name]
+        with transaction() as conn:
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute("UPDATE rollup_watermark SET last_id = 0 WHERE name = ?", (name,))
+    return refresh_rollups(names, batch_size)
+
+
+if __name__ == "__main__":
+    rebuild = "--rebuild" in sys.argv
+    started = time.perf_counter()
+    done = (rebuild_rollups if rebuild else refresh_rollups)()
+    for name, rows in done.items():
+        print(f"📈 {name}: {rows} fila(s) nuevas procesadas")
+    print(f"✅ Rollups {'recalculados' if rebuild else 'actualizados'} en {time.perf_counter() - started:.2f}s")
@@ -1,5 +1,8 @@
 -- ============================
 -- SMARTFIT DB SCHEMA (MVP)
+-- Versión del esquema: 2
+--   1: tablas base
+--   2: índices para las consultas calientes (reservas, pagos, membresías, clases)
 -- ============================
 
 PRAGMA foreign_keys = ON;
@@ -212,5 +215,45 @@ CREATE TABLE IF NOT EXISTS trainer_assignment (
     FOREIGN KEY (member_id) REFERENCES user(id) ON DELETE CASCADE
 );
 
-
-
+-------------------------------------------------------
+-- 15. ÍNDICES
+-- Pensados para las consultas que más se ejecutan; db/query_plan.py
+-- verifica con EXPLAIN QUERY PLAN que SQLite efectivamente los use.
+-------------------------------------------------------
+-- Cupos ocupados por clase, lista de espera FIFO y listado de reservas de una clase
+CREATE INDEX IF NOT EXISTS idx_booking_class_status_booked
+    ON booking(class_id, status, booked_at);
+-- Reservas de un socio y chequeo de reserva duplicada (member_id, status, class_id)
+CREATE INDEX IF NOT EXISTS idx_booking_member_status
+    ON booking(member_id, status, class_id);
+-- Membresía activa de un usuario / vencimientos
+CREATE INDEX IF NOT EXISTS idx_member_membership_user_status_end
+    ON member_membership(user_id, status, end_date);
+-- Pagos por membresía contratada (join desde member_membership) y filtros por estado/fecha
+CREATE INDEX IF NOT EXISTS idx_payment_mm_status_paid
+    ON payment(member_membership_id, status, paid_at);
+CREATE INDEX IF NOT EXISTS idx_payment_paid_at
+    ON payment(paid_at);
+-- Agenda de clases por gimnasio y por entrenador
+CREATE INDEX IF NOT EXISTS idx_class_gym_start
+    ON class(gym_id, start_at);
+CREATE INDEX IF NOT EXISTS idx_class_trainer_start
+    ON class(trainer_id, start_at);
+-- Asistencia de una reserva
+CREATE INDEX IF NOT EXISTS idx_attendance_booking
+    ON attendance(booking_id);
+-- Roles de un usuario (login y permisos)
+CREATE INDEX IF NOT EXISTS idx_user_role_user
+    ON user_role(user_id, role_id);
+-- Planes y asignaciones por entrenador / socio
+CREATE INDEX IF NOT EXISTS idx_training_plan_trainer
+    ON training_plan(trainer_id, status);
+CREATE INDEX IF NOT EXISTS idx_training_plan_member
+    ON training_plan(member_id, status);
+CREATE INDEX IF NOT EXISTS idx_trainer_assignment_member_status
+    ON trainer_assignment(member_id, status);
+CREATE INDEX IF NOT EXISTS idx_trainer_assignment_trainer_status
+    ON trainer_assignment(trainer_id, status);
+-- Reportes generados por gimnasio
+CREATE INDEX IF NOT EXISTS idx_report_gym_generated
+    ON report(gym_id, generated_at);
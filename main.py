@@ -1,7 +1,10 @@
 from services.Auth_service import AuthService
 from ui.menus import show_public_menu, show_menu_for_roles
 from ui.controllers import Controllers
+from services.checkin_queue import get_checkin_queue
+from services.scheduler import get_scheduler
 from utils.inputs import ask_text, ask_password, ask_int
+import os
 import time
 
 def main():
@@ -19,9 +22,9 @@ def main():
                 dni = ask_text("DNI")
                 pwd = ask_password("Contraseña")
                 try:
-                    session = AuthService.login(dni, pwd)
+                    session = AuthService.start_session(dni, pwd)
                     ctrl = Controllers(session)
-                    print(f"\n👋 Bienvenido {session['full_name']} ({', '.join(session['roles'])})")
+                    print(f"\n👋 Bienvenido {session['full_name']} ({', '.join(sorted(session['roles']))})")
                 except Exception as e:
                     print(f"\n❌ {e}")
                 input("\nPresioná Enter para continuar...")
@@ -55,11 +58,21 @@ def main():
             continue
 
         # 🧍 --- Usuario logueado ---
+        # Revalida el token en cada vuelta: toma cambios de roles o bajas hechos durante la sesión
+        try:
+            user = AuthService.resolve_session(session["token"])
+        except PermissionError as e:
+            print(f"\n❌ {e}")
+            session, ctrl = {}, None
+            continue
+        session.update(gym_id=user.gym_id, full_name=user.full_name, roles=user.roles)
+
         role, opt = show_menu_for_roles(session)
 
         # Despacho según rol
         if role == "MEMBER":
             if opt == "9":
+                AuthService.end_session(session["token"])
                 print("👋 Sesión cerrada.")
                 session, ctrl = {}, None
                 time.sleep(1)
@@ -75,6 +88,7 @@ def main():
 
         elif role == "TRAINER":
             if opt == "9":
+                AuthService.end_session(session["token"])
                 print("👋 Sesión cerrada.")
                 session, ctrl = {}, None
                 continue
@@ -89,6 +103,7 @@ def main():
 
         elif role == "ADMIN":
             if opt == "9":
+                AuthService.end_session(session["token"])
                 print("👋 Sesión cerrada.")
                 session, ctrl = {}, None
                 continue
@@ -102,4 +117,12 @@ def main():
             input("\nPresioná Enter para continuar...")
 
 if __name__ == "__main__":
-    main()
+    # Tareas de mantenimiento en segundo plano (SMARTFIT_SCHEDULER=0 si corre el worker aparte)
+    if os.environ.get("SMARTFIT_SCHEDULER", "1") != "0":
+        get_scheduler().start()
+    try:
+        main()
+    finally:
+        get_scheduler().stop()
+        # Las fichadas que quedaron en la cola se escriben antes de salir
+        get_checkin_queue().shutdown()
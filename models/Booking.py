@@ -1,4 +1,7 @@
-from db.connection import get_connection
+from db.connection import get_connection, transaction
+from models.no_show import NoShow
+from utils.clock import now_str
+from utils.policy import authorize, requires
 
 class Booking:
     """
@@ -9,7 +12,9 @@ class Booking:
     Reglas:
       * Sin reservas duplicadas (BOOKED/WAITLIST) para la misma clase y miembro.
       * Si la clase está llena -> WAITLIST.
-      * Al cancelar una reserva BOOKED: se promueve el primer WAITLIST (FIFO).
+      * Al cancelar una reserva BOOKED (o al subir el cupo): se promueven WAITLIST en orden FIFO.
+      * Un socio con bloqueo vigente por faltazos (booking_ban, ver models/no_show.py) no puede reservar.
+    Los cupos ocupados se leen de class.booked_count / waitlist_count (ver db/repair_counters.py).
     """
 
     _STATUSES = {"BOOKED", "CANCELLED", "WAITLIST"}
@@ -17,76 +22,110 @@ class Booking:
     # ---------- HELPERS PRIVADOS ----------
     @staticmethod
     def _class_info(class_id: int):
-        """Devuelve info de la clase + booked_count."""
+        """Devuelve info de la clase (incluye booked_count / waitlist_count, mantenidos por triggers)."""
         conn = get_connection()
         cur = conn.cursor()
-        cur.execute("""
-            SELECT c.*, 
-                   (SELECT COUNT(*) FROM booking b WHERE b.class_id = c.id AND b.status = 'BOOKED') AS booked_count
-            FROM class c
-            WHERE c.id = ?
-        """, (class_id,))
+        cur.execute("SELECT c.* FROM class c WHERE c.id = ?", (class_id,))
         row = cur.fetchone()
         conn.close()
         return row
 
     @staticmethod
-    def _has_active_booking(class_id: int, member_id: int):
-        """True si ya existe BOOKED o WAITLIST para ese member en esa clase."""
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT 1
-            FROM booking
-            WHERE class_id = ? AND member_id = ? AND status IN ('BOOKED','WAITLIST')
-            LIMIT 1
-        """, (class_id, member_id))
-        exists = cur.fetchone() is not None
-        conn.close()
-        return exists
+    def _promote_waitlist(class_id: int):
+        """
+        Pasa a BOOKED tantos WAITLIST como lugares libres tenga la clase, en orden FIFO (booked_at, id),
+        con un único UPDATE. Si se llama dentro de otra transacción (p. ej. la de cancel), se suma a ella.
+        Devuelve la cantidad de reservas promovidas.
+        """
+        with transaction() as conn:
+            cur = conn.execute("""
+                UPDATE booking
+                SET status = 'BOOKED'
+                WHERE id IN (
+                    SELECT id FROM booking
+                    WHERE class_id = ? AND status = 'WAITLIST'
+                    ORDER BY booked_at ASC, id ASC
+                    LIMIT MAX((SELECT capacity - booked_count FROM class WHERE id = ?), 0)
+                )
+            """, (class_id, class_id))
+            return cur.rowcount
 
     @staticmethod
-    def _is_trainer_of_class(class_id: int, trainer_id: int):
-        """True si el trainer_id es el entrenador de la clase class_id."""
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT 1 FROM class WHERE id = ? AND trainer_id = ?", (class_id, trainer_id))
-        ok = cur.fetchone() is not None
-        conn.close()
-        return ok
+    def promote_waitlists_for_gym(gym_id: int):
+        """
+        Promoción en lote: llena los lugares libres de todas las clases futuras de un gimnasio
+        (FIFO por clase) con un único UPDATE. Útil después de cambios masivos de cupo.
+        Devuelve la cantidad de reservas promovidas.
+        """
+        with transaction() as conn:
+            cur = conn.execute("""
+                UPDATE booking
+                SET status = 'BOOKED'
+                WHERE id IN (
+                    SELECT id FROM (
+                        SELECT b.id,
+                               ROW_NUMBER() OVER (PARTITION BY b.class_id ORDER BY b.booked_at, b.id) AS position,
+                               c.capacity - c.booked_count AS free_seats
+                        FROM class c
+                        JOIN booking b ON b.class_id = c.id AND b.status = 'WAITLIST'
+                        WHERE c.gym_id = ?
+                          AND c.start_at > ?
+                          AND c.booked_count < c.capacity
+                    )
+                    WHERE position <= free_seats
+                )
+            """, (gym_id, now_str()))
+            promoted = cur.rowcount
+        print(f"⏫ {promoted} reserva(s) promovida(s) desde la lista de espera.")
+        return promoted
+
+    # INSERT condicional compartido por la reserva simple y la masiva.
+    # Parámetros: (member_id, class_id, ahora, member_id); "ahora" en hora local (utils.clock.now_str),
+    # igual que start_at: CURRENT_TIMESTAMP es UTC y correría el corte según la zona horaria.
+    _CONDITIONAL_INSERT = """
+        INSERT INTO booking (class_id, member_id, status)
+        SELECT c.id, ?, CASE WHEN c.booked_count < c.capacity THEN 'BOOKED' ELSE 'WAITLIST' END
+        FROM class c
+        WHERE c.id = ?
+          AND c.start_at > ?
+          AND NOT EXISTS (
+              SELECT 1 FROM booking b
+              WHERE b.member_id = ? AND b.class_id = c.id AND b.status IN ('BOOKED','WAITLIST')
+          )
+    """
 
     @staticmethod
-    def _promote_waitlist(class_id: int):
-        """Promueve el WAITLIST más antiguo a BOOKED (si hay lugar)."""
-        info = Booking._class_info(class_id)
-        if not info:
-            return
-        if info["booked_count"] >= info["capacity"]:
-            return  # aún no hay lugar
-
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id FROM booking
-            WHERE class_id = ? AND status = 'WAITLIST'
-            ORDER BY booked_at ASC, id ASC
-            LIMIT 1
-        """, (class_id,))
-        row = cur.fetchone()
-        if not row:
-            conn.close()
-            return
+    def _book(class_id: int, member_id: int):
+        """
+        Reserva atómica: un único INSERT condicional dentro de BEGIN IMMEDIATE
+        (antes, el bloqueo por faltazos se busca por clave primaria en booking_ban).
+        Valida que la clase exista, que no haya empezado y que no haya reserva duplicada, y decide
+        BOOKED / WAITLIST con class.booked_count en la misma sentencia, así dos socios pidiendo
+        el último lugar a la vez nunca quedan los dos BOOKED. Devuelve el estado asignado.
+        """
+        now = now_str()
+        with transaction() as conn:
+            NoShow.check_can_book(member_id, conn)
+            inserted = conn.execute(Booking._CONDITIONAL_INSERT + " RETURNING status",
+                                    (member_id, class_id, now, member_id)).fetchall()
+            if inserted:
+                return inserted[0]["status"]
+
+            # No se insertó: averiguar el motivo para devolver el error correcto
+            info = conn.execute("""
+                SELECT CASE WHEN start_at <= ? THEN 1 ELSE 0 END AS started
+                FROM class WHERE id = ?
+            """, (now, class_id)).fetchone()
 
-        cur.execute("""
-            UPDATE booking
-            SET status = 'BOOKED'
-            WHERE id = ?
-        """, (row["id"],))
-        conn.commit()
-        conn.close()
+        if not info:
+            raise ValueError("⚠️ La clase no existe.")
+        if info["started"] == 1:
+            raise ValueError("⚠️ No se puede reservar una clase que ya empezó.")
+        raise ValueError("⚠️ Ya tenés una reserva o estás en lista de espera para esta clase.")
 
     # ---------- CREATE ----------
     @staticmethod
+    @requires("booking", "create", subject="member_id")
     def create(class_id: int, member_id: int,
                current_user_id=None, current_user_roles=None):
         """
@@ -100,49 +139,66 @@ class Booking:
           - Si cupo lleno -> WAITLIST, si hay lugar -> BOOKED.
           - No permite reservar clases ya iniciadas.
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_member = "MEMBER" in roles
-        is_self = current_user_id == member_id
-
-        if not (is_admin or (is_member and is_self)):
-            raise PermissionError("🚫 No tenés permiso para reservar para otro usuario.")
-
-        # Info de la clase
-        info = Booking._class_info(class_id)
-        if not info:
-            raise ValueError("⚠️ La clase no existe.")
-
-        # Validar que no haya empezado (SQLite: comparar texto funciona si formato es YYYY-MM-DD HH:MM:SS)
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT CASE WHEN ? <= CURRENT_TIMESTAMP THEN 1 ELSE 0 END AS started", (info["start_at"],))
-        started = cur.fetchone()["started"] == 1
-        conn.close()
-        if started:
-            raise ValueError("⚠️ No se puede reservar una clase que ya empezó.")
-
-        # Evitar duplicados
-        if Booking._has_active_booking(class_id, member_id):
-            raise ValueError("⚠️ Ya tenés una reserva o estás en lista de espera para esta clase.")
-
-        # Decidir estado según cupo
-        status = "BOOKED" if info["booked_count"] < info["capacity"] else "WAITLIST"
-
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO booking (class_id, member_id, status)
-            VALUES (?, ?, ?)
-        """, (class_id, member_id, status))
-        conn.commit()
-        conn.close()
+        status = Booking._book(class_id, member_id)
 
         if status == "BOOKED":
             print("✅ Reserva confirmada (BOOKED).")
         else:
             print("🕒 Clase llena. Fuiste agregado a la lista de espera (WAITLIST).")
 
+    @staticmethod
+    @requires("booking", "create", subject="member_id")
+    def create_many(member_id: int, class_ids, current_user_id=None, current_user_roles=None):
+        """
+        Reserva varias clases para un socio en una sola transacción (p. ej. la misma clase todas las semanas).
+        - Permisos iguales a create() (ADMIN o el propio MEMBER), validados una sola vez.
+        - Valida todas las clases con una única consulta (existe / ya empezó / reserva duplicada).
+        - Inserta las válidas con executemany del mismo INSERT condicional que create().
+        Devuelve una lista (en el orden recibido) de {"class_id", "result"}, donde result es
+        BOOKED, WAITLIST, NOT_FOUND, STARTED o DUPLICATE.
+        """
+        class_ids = list(dict.fromkeys(int(cid) for cid in class_ids))  # sin repetidos, mismo orden
+        if not class_ids:
+            return []
+
+        placeholders = ", ".join("?" for _ in class_ids)
+        now = now_str()
+        with transaction() as conn:
+            NoShow.check_can_book(member_id, conn)
+            checks = conn.execute(f"""
+                SELECT c.id,
+                       CASE WHEN c.start_at <= ? THEN 1 ELSE 0 END AS started,
+                       EXISTS (
+                           SELECT 1 FROM booking b
+                           WHERE b.member_id = ? AND b.class_id = c.id AND b.status IN ('BOOKED','WAITLIST')
+                       ) AS duplicate
+                FROM class c
+                WHERE c.id IN ({placeholders})
+            """, (now, member_id, *class_ids)).fetchall()
+
+            outcome = {cid: "NOT_FOUND" for cid in class_ids}
+            valid = []
+            for row in checks:
+                if row["started"]:
+                    outcome[row["id"]] = "STARTED"
+                elif row["duplicate"]:
+                    outcome[row["id"]] = "DUPLICATE"
+                else:
+                    valid.append(row["id"])
+
+            if valid:
+                conn.executemany(Booking._CONDITIONAL_INSERT,
+                                 [(member_id, cid, now, member_id) for cid in valid])
+                booked = conn.execute(f"""
+                    SELECT class_id, status FROM booking
+                    WHERE member_id = ? AND status IN ('BOOKED','WAITLIST')
+                      AND class_id IN ({", ".join("?" for _ in valid)})
+                """, (member_id, *valid)).fetchall()
+                for row in booked:
+                    outcome[row["class_id"]] = row["status"]
+
+        return [{"class_id": cid, "result": outcome[cid]} for cid in class_ids]
+
     # ---------- CANCEL ----------
     @staticmethod
     def cancel(booking_id: int, current_user_id=None, current_user_roles=None):
@@ -152,56 +208,37 @@ class Booking:
           - ADMIN: puede cancelar cualquiera.
           - MEMBER: solo cancela reservas propias.
           - TRAINER: puede cancelar reservas de sus clases.
-        Al cancelar una BOOKED, promueve el primer WAITLIST (si existe).
+        Al cancelar una BOOKED, promueve los WAITLIST que entren (FIFO) en la misma transacción.
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_member = "MEMBER" in roles
-        is_trainer = "TRAINER" in roles
-
-        # Traer la reserva con info de clase/miembro
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT b.*, c.trainer_id
-            FROM booking b
-            JOIN class c ON c.id = b.class_id
-            WHERE b.id = ?
-        """, (booking_id,))
-        bk = cur.fetchone()
-        if not bk:
-            conn.close()
-            raise ValueError("⚠️ Reserva no encontrada.")
-
-        # Permisos
-        if is_admin:
-            pass
-        elif is_member and bk["member_id"] == current_user_id:
-            pass
-        elif is_trainer and bk["trainer_id"] == current_user_id:
-            pass
-        else:
-            conn.close()
-            raise PermissionError("🚫 No tenés permiso para cancelar esta reserva.")
-
-        # Si ya está cancelada, salir
-        if bk["status"] == "CANCELLED":
-            conn.close()
-            print("ℹ️ La reserva ya estaba cancelada.")
-            return
-
-        # Cancelar
-        cur.execute("""
-            UPDATE booking
-            SET status = 'CANCELLED'
-            WHERE id = ?
-        """, (booking_id,))
-        conn.commit()
-        conn.close()
-
-        # Promover waitlist si la que se canceló estaba BOOKED
-        if bk["status"] == "BOOKED":
-            Booking._promote_waitlist(bk["class_id"])
+        with transaction() as conn:
+            # Traer la reserva con info de clase/miembro
+            bk = conn.execute("""
+                SELECT b.*, c.trainer_id
+                FROM booking b
+                JOIN class c ON c.id = b.class_id
+                WHERE b.id = ?
+            """, (booking_id,)).fetchone()
+            if not bk:
+                raise ValueError("⚠️ Reserva no encontrada.")
+
+            authorize("booking", "cancel", current_user_roles, current_user_id,
+                      subject_id=bk["member_id"], target_id=bk["class_id"])
+
+            # Si ya está cancelada, salir
+            if bk["status"] == "CANCELLED":
+                print("ℹ️ La reserva ya estaba cancelada.")
+                return
+
+            # Cancelar
+            conn.execute("""
+                UPDATE booking
+                SET status = 'CANCELLED'
+                WHERE id = ?
+            """, (booking_id,))
+
+            # Promover waitlist en la misma transacción si la que se canceló estaba BOOKED
+            if bk["status"] == "BOOKED":
+                Booking._promote_waitlist(bk["class_id"])
 
         print("🟡 Reserva cancelada correctamente.")
 
@@ -214,24 +251,13 @@ class Booking:
         - TRAINER: solo si es su clase
         - MEMBER: permitido (para ver disponibilidad), pero no incluye datos sensibles del resto.
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles or "ENTRENADOR" in roles
-        is_member = "MEMBER" in roles
-
-
-        # Validar trainer propietario si aplica
-        if is_trainer:
-            is_owner = Booking._is_trainer_of_class(class_id, current_user_id)
-            if not is_owner:
-                raise PermissionError("🚫 No podés ver reservas de clases que no dictás.")
-        
-
+        # Un TRAINER solo pasa si dicta la clase (pertenencia cacheada, sin SELECT por llamada)
+        granted = authorize("booking", "list_by_class", current_user_roles, current_user_id, target_id=class_id)
 
         conn = get_connection()
         cur = conn.cursor()
 
-        if is_admin or is_trainer:
+        if granted != {"MEMBER"}:  # ADMIN o el entrenador de la clase: detalle completo
             cur.execute("""
                 SELECT 
                     b.id, 
@@ -253,21 +279,9 @@ class Booking:
             """, (class_id,))
             rows = cur.fetchall()
             conn.close()
-            if not rows:
-                return []  # Retorna lista vacía si no hay reservas
-                
-            # Convertir los resultados a una lista de diccionarios con nombres de columnas consistentes
-            result = []
-            for row in rows:
-                result.append({
-                    'id': row['id'],
-                    'member_id': row['member_id'],
-                    'member_name': row['member_name'],
-                    'status': row['status'],
-                    'booked_at': row['booked_at']
-                })
-            return result
-        elif is_member:
+            # Records (db/records.py): se leen como dict (b['status']) sin copiar cada fila
+            return rows
+        else:
             # Para members: lista anónima (cuántos BOOKED/WAITLIST) + su propio estado
             cur.execute("""
                 SELECT status, COUNT(*) as cnt
@@ -291,11 +305,9 @@ class Booking:
                 "summary": {row["status"]: row["cnt"] for row in summary} if summary else {},
                 "my_status": mine["status"] if mine else None
             }
-        else:
-            conn.close()
-            raise PermissionError("🚫 Rol no autorizado.")
 
     @staticmethod
+    @requires("booking", "list_by_user", subject="member_id")
     def list_by_user(member_id: int, current_user_id=None, current_user_roles=None):
         """
         Lista reservas de un usuario.
@@ -303,13 +315,6 @@ class Booking:
         - MEMBER: solo las propias
         - TRAINER: no aplica (a menos que agregues reglas extra)
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_member = "MEMBER" in roles
-
-        if not (is_admin or (is_member and member_id == current_user_id)):
-            raise PermissionError("🚫 No podés ver reservas de otro usuario.")
-
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("""
@@ -1,4 +1,47 @@
-from db.connection import get_connection
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from db.connection import get_connection, transaction
+from db.pagination import fetch_page, keyset, page_size
+from models.Booking import Booking
+from utils.clock import DATETIME_FORMAT, now_str
+from utils.policy import authorize, invalidate_ownership, requires
+
+# Duración máxima de una clase. Acota la búsqueda de solapamientos: una clase que pisa [inicio, fin)
+# empezó como mucho MAX_CLASS_HOURS antes de inicio, así que alcanza con un rango del índice por start_at.
+MAX_CLASS_HOURS = 12
+
+# Clases del mismo entrenador (en cualquier gimnasio) o de la misma sala del gimnasio que se pisan
+# con [start_at, end_at). Cada parte es un rango de idx_class_trainer_start / idx_class_gym_room_start.
+CONFLICTS_SQL = """
+    SELECT 'TRAINER' AS conflict, id, name, room, start_at, end_at
+    FROM class
+    WHERE trainer_id = ? AND start_at >= ? AND start_at < ? AND end_at > ? AND id IS NOT ?
+    UNION ALL
+    SELECT 'ROOM', id, name, room, start_at, end_at
+    FROM class
+    WHERE gym_id = ? AND room = ? AND start_at >= ? AND start_at < ? AND end_at > ? AND id IS NOT ?
+"""
+
+
+def _check_times(start_at: str, end_at: str) -> str:
+    """Valida el horario y devuelve el límite inferior de la búsqueda de solapamientos."""
+    try:
+        start, end = datetime.fromisoformat(start_at), datetime.fromisoformat(end_at)
+    except (TypeError, ValueError):
+        raise ValueError("⚠️ Fecha inválida. Usá el formato YYYY-MM-DD HH:MM.") from None
+    if start >= end:
+        raise ValueError("⚠️ La hora de inicio debe ser anterior a la de fin.")
+    if end - start > timedelta(hours=MAX_CLASS_HOURS):
+        raise ValueError(f"⚠️ Una clase no puede durar más de {MAX_CLASS_HOURS} horas.")
+    return (start - timedelta(hours=MAX_CLASS_HOURS)).strftime(DATETIME_FORMAT)
+
+
+def _conflict_message(row) -> str:
+    if row["conflict"] == "TRAINER":
+        return f"🚫 El entrenador ya tiene la clase '{row['name']}' ({row['start_at']} - {row['end_at']}) en ese horario."
+    return f"🚫 La sala '{row['room']}' está ocupada por '{row['name']}' ({row['start_at']} - {row['end_at']})."
+
 
 class ClassSession:
     """
@@ -20,110 +63,178 @@ class ClassSession:
         Crea una nueva clase.
         - Solo TRAINER (propia) o ADMIN pueden crear clases.
         - Fechas deben ser válidas (start_at < end_at).
+        - El entrenador y la sala no pueden estar ocupados en ese horario.
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-
-        if start_at >= end_at:
-            raise ValueError("⚠️ La hora de inicio debe ser anterior a la de fin.")
+        _check_times(start_at, end_at)
         if capacity <= 0:
             raise ValueError("⚠️ La capacidad debe ser mayor a 0.")
 
-        conn = get_connection()
-        cur = conn.cursor()
-
         # Si es trainer, validar que se esté creando con su propio ID
-        if is_trainer and current_user_id != trainer_id:
-            conn.close()
-            raise PermissionError("🚫 Un entrenador solo puede crear clases asignadas a su propio ID.")
+        authorize("class", "create", current_user_roles, current_user_id, subject_id=trainer_id)
 
-        cur.execute("""
-            INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity, room)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (gym_id, trainer_id, name.strip(), start_at, end_at, capacity, room))
-        conn.commit()
-        conn.close()
+        room = room.strip() if room else None
+        # Chequeo + INSERT con el lock de escritura tomado: dos altas simultáneas no pueden pisarse
+        with transaction() as conn:
+            ClassSession._raise_on_conflict(conn, gym_id, trainer_id, room, start_at, end_at)
+            conn.execute("""
+                INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity, room)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (gym_id, trainer_id, name.strip(), start_at, end_at, capacity, room))
+        invalidate_ownership("class", trainer_id)
 
         print(f"✅ Clase '{name}' creada para el gimnasio ID {gym_id} (Trainer ID {trainer_id}).")
 
     # ---------- READ ----------
     @staticmethod
-    def list_all_classes(current_user_id=None, current_user_roles=None, include_past=False):
+    def list_all_classes(current_user_id=None, current_user_roles=None, include_past=False,
+                         after: tuple | None = None, limit: int | None = None):
         """
-        Lista las clases según el rol.
+        Lista las clases según el rol, de a una página ordenada por (start_at, id).
         - ADMIN ve todas.
         - TRAINER ve las suyas.
         - MEMBER ve las activas/futuras.
+        after = next_cursor de la página anterior.
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-        is_member = "MEMBER" in roles
-
-        conn = get_connection()
-        cur = conn.cursor()
+        roles = authorize("class", "list", current_user_roles)
+        limit = page_size(limit)
 
-        if is_admin:
-            query = """
-                SELECT c.*, t.full_name AS trainer_name
-                FROM class c
-                JOIN user t ON t.id = c.trainer_id
-                ORDER BY c.start_at ASC
-            """
-            cur.execute(query)
-        elif is_trainer:
-            query = """
-                SELECT c.*, t.full_name AS trainer_name
-                FROM class c
-                JOIN user t ON t.id = c.trainer_id
-                WHERE c.trainer_id = ?
-                ORDER BY c.start_at ASC
-            """
-            cur.execute(query, (current_user_id,))
-        elif is_member:
-            query = """
-                SELECT c.*, t.full_name AS trainer_name
-                FROM class c
-                JOIN user t ON t.id = c.trainer_id
-                WHERE c.start_at >= CURRENT_TIMESTAMP
-                ORDER BY c.start_at ASC
-            """
-            cur.execute(query)
+        clauses, values = [], []
+        if "ADMIN" in roles:
+            pass
+        elif "TRAINER" in roles:
+            clauses.append("c.trainer_id = ?")
+            values.append(current_user_id)
         else:
-            conn.close()
-            raise PermissionError("🚫 Rol no autorizado para ver clases.")
+            clauses.append("c.start_at >= ?")
+            values.append(now_str())
+        after_sql, after_values = keyset(("c.start_at", "c.id"), after)
+        if after_sql:
+            clauses.append(after_sql)
+            values.extend(after_values)
 
-        rows = cur.fetchall()
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT c.*, t.full_name AS trainer_name
+            FROM class c
+            JOIN user t ON t.id = c.trainer_id
+            {"WHERE " + " AND ".join(clauses) if clauses else ""}
+            ORDER BY c.start_at ASC, c.id ASC
+            LIMIT ?
+        """, (*values, limit + 1))
+        rows = fetch_page(cur, limit, lambda row: (row["start_at"], row["id"]))
         conn.close()
         return rows
 
-    # ---------- UPDATE ----------
+    # ---------- AGENDA ----------
     @staticmethod
-    def update(class_id: int, name=None, start_at=None, end_at=None, capacity=None, room=None,
-               current_user_id=None, current_user_roles=None):
-        """Actualiza los datos de una clase (solo ADMIN o TRAINER dueño)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
+    def find_conflicts(gym_id: int, trainer_id: int, start_at: str, end_at: str,
+                       room: str | None = None, exclude_id: int | None = None, conn=None):
+        """
+        Clases que chocan con [start_at, end_at): del mismo entrenador o de la misma sala del gimnasio.
+        Devuelve filas (conflict = 'TRAINER' | 'ROOM', id, name, room, start_at, end_at); lista vacía si está libre.
+        """
+        lower = _check_times(start_at, end_at)
+        own = conn is None
+        conn = conn or get_connection()
+        try:
+            return conn.execute(CONFLICTS_SQL, (
+                trainer_id, lower, end_at, start_at, exclude_id,
+                gym_id, room, lower, end_at, start_at, exclude_id,
+            )).fetchall()
+        finally:
+            if own:
+                conn.close()
+
+    @staticmethod
+    def _raise_on_conflict(conn, gym_id, trainer_id, room, start_at, end_at, exclude_id=None):
+        conflicts = ClassSession.find_conflicts(gym_id, trainer_id, start_at, end_at, room, exclude_id, conn)
+        if conflicts:
+            raise ValueError(_conflict_message(conflicts[0]))
 
-        if not (is_admin or is_trainer):
-            raise PermissionError("🚫 Solo entrenadores o administradores pueden modificar clases.")
+    @staticmethod
+    def validate_timetable(gym_id: int, classes) -> list[dict]:
+        """
+        Valida una grilla completa antes de importarla (p. ej. la semana entera).
+        classes: lista de dicts con trainer_id, start_at, end_at y opcionalmente room y name.
+        Revisa cada clase contra las demás de la grilla y contra las ya cargadas (una sola consulta).
+        Devuelve un problema por choque: {"index", "conflict": 'INVALID' | 'TRAINER' | 'ROOM',
+        "with_index", "with_class_id", "message"}. Lista vacía = la grilla se puede cargar.
+        """
+        problems, entries = [], []
+        for i, c in enumerate(classes):
+            try:
+                lower = _check_times(c["start_at"], c["end_at"])
+            except ValueError as e:
+                problems.append({"index": i, "conflict": "INVALID", "with_index": None,
+                                 "with_class_id": None, "message": str(e)})
+                continue
+            room = c.get("room").strip() if c.get("room") else None
+            entries.append((i, c["trainer_id"], room, c["start_at"], c["end_at"], lower))
+        if not entries:
+            return problems
 
+        # 1) Dentro de la grilla: por entrenador y por sala, ordenado por inicio; choca con la que
+        #    termina más tarde entre las anteriores.
+        for kind, key_of, what in (("TRAINER", lambda e: e[1], "el mismo entrenador"),
+                                   ("ROOM", lambda e: e[2], "la misma sala")):
+            groups = {}
+            for e in entries:
+                if key_of(e) is not None:
+                    groups.setdefault(key_of(e), []).append(e)
+            for group in groups.values():
+                group.sort(key=lambda e: e[3])
+                latest = group[0]
+                for e in group[1:]:
+                    if e[3] < latest[4]:
+                        problems.append({"index": e[0], "conflict": kind, "with_index": latest[0],
+                                         "with_class_id": None,
+                                         "message": f"🚫 Choca con la clase #{latest[0]} de la grilla ({what})."})
+                    if e[4] > latest[4]:
+                        latest = e
+
+        # 2) Contra lo ya cargado: una consulta por la ventana de la grilla y búsqueda binaria por clave.
+        trainer_ids = sorted({e[1] for e in entries})
         conn = get_connection()
-        cur = conn.cursor()
+        try:
+            rows = conn.execute(f"""
+                SELECT id, name, gym_id, trainer_id, room, start_at, end_at
+                FROM class
+                WHERE start_at >= ? AND start_at < ?
+                  AND (gym_id = ? OR trainer_id IN ({", ".join("?" * len(trainer_ids))}))
+                ORDER BY start_at
+            """, (min(e[5] for e in entries), max(e[4] for e in entries), gym_id, *trainer_ids)).fetchall()
+        finally:
+            conn.close()
+        index = {}   # ("TRAINER", id) | ("ROOM", sala) -> ([start_at ordenados], [filas])
+        for row in rows:
+            keys = [("TRAINER", row["trainer_id"])]
+            if row["gym_id"] == gym_id and row["room"] is not None:
+                keys.append(("ROOM", row["room"]))
+            for key in keys:
+                starts, found = index.setdefault(key, ([], []))
+                starts.append(row["start_at"])
+                found.append(row)
 
-        # Validar propiedad si es entrenador
-        if is_trainer:
-            cur.execute("SELECT trainer_id FROM class WHERE id = ?", (class_id,))
-            row = cur.fetchone()
-            if not row:
-                conn.close()
-                raise ValueError("⚠️ Clase no encontrada.")
-            if row["trainer_id"] != current_user_id:
-                conn.close()
-                raise PermissionError("🚫 No podés modificar clases que no te pertenecen.")
+        for i, trainer_id, room, start_at, end_at, lower in entries:
+            for kind, key in (("TRAINER", trainer_id), ("ROOM", room)):
+                starts, found = index.get((kind, key), ((), ()))
+                for row in found[bisect_left(starts, lower):bisect_left(starts, end_at)]:
+                    if row["end_at"] > start_at:
+                        problems.append({"index": i, "conflict": kind, "with_index": None,
+                                         "with_class_id": row["id"],
+                                         "message": _conflict_message({**row._asdict(), "conflict": kind})})
+                        break
+
+        problems.sort(key=lambda p: p["index"])
+        return problems
 
+    # ---------- UPDATE ----------
+    @staticmethod
+    @requires("class", "update", target="class_id")
+    def update(class_id: int, name=None, start_at=None, end_at=None, capacity=None, room=None,
+               current_user_id=None, current_user_roles=None):
+        """Actualiza los datos de una clase (solo ADMIN o TRAINER dueño). Si cambia el horario o la sala, se revalidan los choques."""
         # Construcción dinámica del UPDATE
         fields, values = [], []
         if name:
@@ -150,37 +261,33 @@ class ClassSession:
 
         values.append(class_id)
         sql = f"UPDATE class SET {', '.join(fields)} WHERE id = ?"
-        cur.execute(sql, values)
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            if start_at or end_at or room:
+                current = conn.execute(
+                    "SELECT gym_id, trainer_id, room, start_at, end_at FROM class WHERE id = ?", (class_id,)
+                ).fetchone()
+                if current:
+                    new_start, new_end = start_at or current["start_at"], end_at or current["end_at"]
+                    _check_times(new_start, new_end)
+                    ClassSession._raise_on_conflict(conn, current["gym_id"], current["trainer_id"],
+                                                    room.strip() if room else current["room"],
+                                                    new_start, new_end, exclude_id=class_id)
+            conn.execute(sql, values)
+            if capacity is not None:
+                # Si subió el cupo, los lugares nuevos se llenan desde la lista de espera (misma transacción)
+                Booking._promote_waitlist(class_id)
 
         print(f"✅ Clase ID {class_id} actualizada correctamente.")
 
     # ---------- DELETE ----------
     @staticmethod
+    @requires("class", "delete", target="class_id")
     def delete(class_id: int, current_user_id=None, current_user_roles=None):
         """Elimina una clase (solo ADMIN o TRAINER dueño)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-
-        if not (is_admin or is_trainer):
-            raise PermissionError("🚫 Solo entrenadores o administradores pueden eliminar clases.")
-
         conn = get_connection()
         cur = conn.cursor()
-
-        if is_trainer:
-            cur.execute("SELECT trainer_id FROM class WHERE id = ?", (class_id,))
-            row = cur.fetchone()
-            if not row:
-                conn.close()
-                raise ValueError("⚠️ Clase no encontrada.")
-            if row["trainer_id"] != current_user_id:
-                conn.close()
-                raise PermissionError("🚫 No podés eliminar clases que no son tuyas.")
-
         cur.execute("DELETE FROM class WHERE id = ?", (class_id,))
         conn.commit()
         conn.close()
+        invalidate_ownership("class")
         print(f"🗑️ Clase ID {class_id} eliminada correctamente.")
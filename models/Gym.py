@@ -1,5 +1,7 @@
 # models/gym.py
 from db.connection import get_connection
+from utils.policy import requires
+from utils.ref_cache import cached, invalidates
 
 class Gym:
     """
@@ -12,13 +14,11 @@ class Gym:
 
     # ---------- CREATE ----------
     @staticmethod
+    @invalidates("gym")
+    @requires("gym", "create")
     def create(name: str, address: str | None = None,
                current_user_roles=None):
         """Crea un nuevo gimnasio (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo el administrador puede crear gimnasios.")
-
         if not name.strip():
             raise ValueError("⚠️ El nombre del gimnasio no puede estar vacío.")
 
@@ -35,6 +35,7 @@ class Gym:
 
     # ---------- READ ----------
     @staticmethod
+    @cached("gym", ignore=("current_user_roles",))
     def all(current_user_roles=None):
         """Devuelve todos los gimnasios (visible a todos los roles)."""
         conn = get_connection()
@@ -49,6 +50,7 @@ class Gym:
         return rows
 
     @staticmethod
+    @cached("gym")
     def find_by_id(gym_id: int):
         """Busca un gimnasio por ID."""
         conn = get_connection()
@@ -64,14 +66,12 @@ class Gym:
 
     # ---------- UPDATE ----------
     @staticmethod
+    @invalidates("gym")
+    @requires("gym", "update")
     def update(gym_id: int, name: str | None = None,
                address: str | None = None,
                current_user_roles=None):
         """Modifica datos de un gimnasio (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo el administrador puede modificar gimnasios.")
-
         if not name and not address:
             print("⚠️ No se especificaron campos para actualizar.")
             return
@@ -97,12 +97,10 @@ class Gym:
 
     # ---------- DELETE ----------
     @staticmethod
+    @invalidates("gym")
+    @requires("gym", "delete")
     def delete(gym_id: int, current_user_roles=None):
         """Elimina un gimnasio (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo el administrador puede eliminar gimnasios.")
-
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("DELETE FROM gym WHERE id = ?", (gym_id,))
@@ -1,5 +1,6 @@
 from db.connection import get_connection
 import json
+from utils.policy import authorize, requires
 
 class Report:
     """
@@ -20,6 +21,7 @@ class Report:
 
     # ---------- CREATE ----------
     @staticmethod
+    @requires("report", "create")
     def create(gym_id: int, requested_by: int, kind: str,
                params: dict | None = None,
                file_path: str | None = None,
@@ -28,10 +30,6 @@ class Report:
         Crea un nuevo registro de reporte (solo ADMIN).
         Guarda metadatos y parámetros en JSON (por ejemplo, filtros de fechas).
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo los administradores pueden generar reportes.")
-
         if kind.upper() not in Report._KINDS:
             raise ValueError(f"⚠️ Tipo de reporte inválido. Use uno de: {', '.join(Report._KINDS)}")
 
@@ -54,7 +52,7 @@ class Report:
         - TRAINER: solo los propios (performance)
         - MEMBER: ninguno
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = authorize("report", "list", current_user_roles)
         conn = get_connection()
         cur = conn.cursor()
 
@@ -65,16 +63,13 @@ class Report:
                 JOIN user u ON u.id = r.requested_by
                 ORDER BY r.generated_at DESC
             """)
-        elif "TRAINER" in roles:
+        else:
             cur.execute("""
                 SELECT r.id, r.kind, r.generated_at, r.file_path
                 FROM report r
                 WHERE r.kind = 'PERFORMANCE' AND r.requested_by = ?
                 ORDER BY r.generated_at DESC
             """, (current_user_id,))
-        else:
-            conn.close()
-            raise PermissionError("🚫 No tenés permiso para ver reportes.")
 
         rows = cur.fetchall()
         conn.close()
@@ -83,10 +78,6 @@ class Report:
     @staticmethod
     def find_by_id(report_id: int, current_user_id=None, current_user_roles=None):
         """Obtiene los detalles de un reporte (según permisos)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("""
@@ -101,21 +92,14 @@ class Report:
         if not row:
             raise ValueError("⚠️ Reporte no encontrado.")
 
-        if is_admin:
-            return row
-        elif is_trainer and row["requested_by"] == current_user_id:
-            return row
-        else:
-            raise PermissionError("🚫 No podés ver este reporte.")
+        authorize("report", "view", current_user_roles, current_user_id, subject_id=row["requested_by"])
+        return row
 
     # ---------- UPDATE ----------
     @staticmethod
+    @requires("report", "update")
     def update_file(report_id: int, file_path: str, current_user_roles=None):
         """Actualiza la ruta del archivo generado (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo los administradores pueden modificar reportes.")
-
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("""
@@ -129,12 +113,9 @@ class Report:
 
     # ---------- DELETE ----------
     @staticmethod
+    @requires("report", "delete")
     def delete(report_id: int, current_user_roles=None):
         """Elimina un reporte (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo los administradores pueden eliminar reportes.")
-
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("DELETE FROM report WHERE id = ?", (report_id,))
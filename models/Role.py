@@ -1,4 +1,6 @@
 from db.connection import get_connection
+from utils.ref_cache import cached, invalidates
+from utils.session_store import invalidate_user
 
 class Role:
     """
@@ -8,6 +10,7 @@ class Role:
 
     # ---------- CREATE ----------
     @staticmethod
+    @invalidates("role")
     def create(code: str, name: str):
         """Crear un nuevo rol permitido (solo TRAINER o MEMBER), ya que NO se deberia poder crear ADMIN u OWNER desde la app, sino es Hackeable y peligroso."""
         valid_roles = {"TRAINER", "MEMBER"}
@@ -36,6 +39,7 @@ class Role:
 
     # ---------- READ ----------
     @staticmethod
+    @cached("role")
     def list_all_roles():
         """ Listar todos los roles """
         conn = get_connection()
@@ -46,6 +50,7 @@ class Role:
         return rows
 
     @staticmethod
+    @cached("role")
     def find_by_code(code: str):
         """ Buscar un rol por su código """
         conn = get_connection()
@@ -67,6 +72,7 @@ class Role:
 
     # ---------- UPDATE ----------
     @staticmethod
+    @invalidates("role")
     def update_name(code: str, new_name: str):
         """Actualizar el nombre descriptivo de un rol permitido (TRAINER o MEMBER). Asegurarse de no permitir cambios a ADMIN u OWNER siendo MEMBER or TRAINER."""
         allowed = {"TRAINER", "MEMBER"}
@@ -97,6 +103,7 @@ class Role:
 
     # ---------- UTILS ----------
     @staticmethod
+    @invalidates("role")
     def seed_defaults():
         """
         Inserta roles base si no existen.
@@ -136,6 +143,7 @@ class Role:
         )
         conn.commit()
         conn.close()
+        invalidate_user(user_id)
 
     @staticmethod
     def list_users_by_role(role_code: str):
@@ -1,4 +1,6 @@
 from db.connection import get_connection
+from db.pagination import fetch_page, keyset, page_size
+from utils.policy import authorize, requires
 
 class TrainerAssignment:
     """
@@ -23,8 +25,6 @@ class TrainerAssignment:
         - Solo ADMIN puede crear asignaciones.
         - Un miembro solo puede tener 1 asignación activa.
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-
         if status.upper() not in ("ACTIVE", "ENDED"):
             raise ValueError("⚠️ Estado inválido. Use 'ACTIVE' o 'ENDED'.")
 
@@ -61,50 +61,55 @@ class TrainerAssignment:
 
     # ---------- READ ----------
     @staticmethod
-    def list_all_assignments(current_user_id=None, current_user_roles=None):
+    def list_all_assignments(current_user_id=None, current_user_roles=None,
+                             after: tuple | None = None, limit: int | None = None):
         """
-        Lista todas las asignaciones visibles según rol:
+        Lista las asignaciones visibles según rol, de a una página ordenada por (start_date, id) descendente:
         - ADMIN: todas.
         - TRAINER: solo sus miembros.
         - MEMBER: solo su propio entrenador.
+        after = next_cursor de la página anterior.
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        conn = get_connection()
-        cur = conn.cursor()
+        roles = authorize("assignment", "list", current_user_roles)
+        limit = page_size(limit)
 
         if "ADMIN" in roles:
-            cur.execute("""
+            select = """
                 SELECT ta.id, t.full_name AS trainer, m.full_name AS member,
                        ta.start_date, ta.end_date, ta.status
                 FROM trainer_assignment ta
                 JOIN user t ON t.id = ta.trainer_id
                 JOIN user m ON m.id = ta.member_id
-                ORDER BY ta.start_date DESC
-            """)
+            """
+            clauses, values = [], []
         elif "TRAINER" in roles:
-            cur.execute("""
+            select = """
                 SELECT ta.id, m.full_name AS member, ta.start_date, ta.status
                 FROM trainer_assignment ta
                 JOIN user m ON m.id = ta.member_id
-                WHERE ta.trainer_id = ?
-                ORDER BY ta.start_date DESC
-            """, (current_user_id,))
-        elif "MEMBER" in roles:
-            cur.execute("""
+            """
+            clauses, values = ["ta.trainer_id = ?"], [current_user_id]
+        else:
+            select = """
                 SELECT ta.id, t.full_name AS trainer, ta.start_date, ta.status
                 FROM trainer_assignment ta
                 JOIN user t ON t.id = ta.trainer_id
-                WHERE ta.member_id = ?
-                ORDER BY ta.start_date DESC
-            """, (current_user_id,))
-        else:
-            conn.close()
-            raise PermissionError("🚫 Rol no autorizado.")
+            """
+            clauses, values = ["ta.member_id = ?"], [current_user_id]
 
-        rows = cur.fetchall()
+        after_sql, after_values = keyset(("ta.start_date", "ta.id"), after, descending=True)
+        if after_sql:
+            clauses.append(after_sql)
+            values.extend(after_values)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(f"{select} {where} ORDER BY ta.start_date DESC, ta.id DESC LIMIT ?", (*values, limit + 1))
+        rows = fetch_page(cur, limit, lambda row: (row["start_date"], row["id"]))
         conn.close()
         return rows
-    
+
     def list_active_assignments_for_trainer(trainer_id: int):
         """Lista las asignaciones activas de un entrenador específico."""
         conn = get_connection()
@@ -122,14 +127,11 @@ class TrainerAssignment:
 
     # ---------- UPDATE ----------
     @staticmethod
+    @requires("assignment", "update")
     def update_status(assignment_id: int, status: str,
                       end_date: str | None = None,
                       current_user_roles=None):
         """Actualiza el estado (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo el administrador puede modificar asignaciones.")
-
         if status.upper() not in ("ACTIVE", "ENDED"):
             raise ValueError("⚠️ Estado inválido. Use 'ACTIVE' o 'ENDED'.")
 
@@ -146,12 +148,9 @@ class TrainerAssignment:
 
     # ---------- DELETE ----------
     @staticmethod
+    @requires("assignment", "delete")
     def delete(assignment_id: int, current_user_roles=None):
         """Elimina una asignación (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo el administrador puede eliminar asignaciones.")
-
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("DELETE FROM trainer_assignment WHERE id = ?", (assignment_id,))
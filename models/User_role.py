@@ -1,4 +1,5 @@
 from db.connection import get_connection
+from utils.session_store import invalidate_user
 
 class UserRole:
     """
@@ -37,6 +38,7 @@ class UserRole:
         cur.execute("INSERT INTO user_role (user_id, role_id) VALUES (?, ?)", (user_id, role_id))
         conn.commit()
         conn.close()
+        invalidate_user(user_id)
         print(f"✅ Rol '{role_code}' asignado al usuario ID {user_id}.")
 
     # ---------- READ ----------
@@ -1,4 +1,17 @@
-from db.connection import get_connection
+from datetime import datetime
+
+from db.connection import get_connection, transaction
+from utils.policy import authorize, requires
+
+# Una fichada de molinete/QR cuenta para la clase si llega entre CHECKIN_EARLY_MINUTES antes del inicio y el fin.
+CHECKIN_EARLY_MINUTES = 30
+# Fichadas por consulta al resolver reservas (3 parámetros cada una, lejos del límite de SQLite).
+CHECKIN_CHUNK = 500
+
+UPSERT_SQL = """
+    INSERT INTO attendance (booking_id, present) VALUES (?, ?)
+    ON CONFLICT(booking_id) DO UPDATE SET present = excluded.present, checked_at = CURRENT_TIMESTAMP
+"""
 
 class Attendance:
     """
@@ -18,21 +31,13 @@ class Attendance:
         - No se puede registrar asistencia de reservas CANCELLED o WAITLIST.
         - Si ya existe, se actualiza (re-marcación).
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-
-        if not (is_admin or is_trainer):
-            raise PermissionError("🚫 Solo entrenadores o administradores pueden registrar asistencia.")
-
         conn = get_connection()
         cur = conn.cursor()
 
         # Verificar reserva y su clase
         cur.execute("""
-            SELECT b.id, b.member_id, b.status, c.trainer_id
+            SELECT b.id, b.member_id, b.status, b.class_id
             FROM booking b
-            JOIN class c ON c.id = b.class_id
             WHERE b.id = ?
         """, (booking_id,))
         booking = cur.fetchone()
@@ -40,13 +45,15 @@ class Attendance:
             conn.close()
             raise ValueError("⚠️ La reserva no existe.")
 
-        if booking["status"] != "BOOKED":
+        try:
+            authorize("attendance", "mark", current_user_roles, current_user_id, target_id=booking["class_id"])
+        except PermissionError:
             conn.close()
-            raise ValueError("⚠️ Solo se puede marcar asistencia de reservas BOOKED.")
+            raise
 
-        if is_trainer and booking["trainer_id"] != current_user_id:
+        if booking["status"] != "BOOKED":
             conn.close()
-            raise PermissionError("🚫 No podés marcar asistencia en clases ajenas.")
+            raise ValueError("⚠️ Solo se puede marcar asistencia de reservas BOOKED.")
 
         # Verificar si ya existe registro
         cur.execute("SELECT id FROM attendance WHERE booking_id = ?", (booking_id,))
@@ -69,8 +76,97 @@ class Attendance:
         conn.commit()
         conn.close()
 
+    @staticmethod
+    def mark_many(class_id: int, marks: dict, current_user_id=None, current_user_roles=None) -> dict:
+        """
+        Marca la asistencia de toda una clase en una sola transacción.
+        marks = {booking_id: presente}. El permiso sobre la clase se valida una sola vez.
+        Devuelve {booking_id: resultado} con resultado:
+          'MARKED' (nuevo), 'UPDATED' (re-marcado), 'NOT_IN_CLASS' (la reserva no es de esta clase)
+          o 'NOT_BOOKED' (CANCELLED / WAITLIST).
+        """
+        authorize("attendance", "mark", current_user_roles, current_user_id, target_id=class_id)
+
+        outcomes, rows = {}, []
+        with transaction() as conn:
+            bookings = {
+                row["id"]: row for row in conn.execute("""
+                    SELECT b.id, b.status, a.id IS NOT NULL AS marked
+                    FROM booking b
+                    LEFT JOIN attendance a ON a.booking_id = b.id
+                    WHERE b.class_id = ?
+                """, (class_id,))
+            }
+            for booking_id, present in marks.items():
+                b = bookings.get(booking_id)
+                if b is None:
+                    outcomes[booking_id] = "NOT_IN_CLASS"
+                elif b["status"] != "BOOKED":
+                    outcomes[booking_id] = "NOT_BOOKED"
+                else:
+                    outcomes[booking_id] = "UPDATED" if b["marked"] else "MARKED"
+                    rows.append((booking_id, int(present)))
+            conn.executemany(UPSERT_SQL, rows)
+
+        print(f"✅ Asistencia registrada: {len(rows)} de {len(marks)} reservas.")
+        return outcomes
+
+    @staticmethod
+    @requires("attendance", "ingest")
+    def ingest_checkins(events, current_user_id=None, current_user_roles=None) -> dict:
+        """
+        Carga un lote de fichadas de molinete o QR: events = [(member_id, fichado_en), ...].
+        Cada fichada se asocia a la reserva BOOKED del socio cuya clase está en curso (o empieza
+        dentro de CHECKIN_EARLY_MINUTES) y se marca presente; las fichadas repetidas no pisan la primera.
+        Todo el lote va en una transacción: las reservas se resuelven de a CHECKIN_CHUNK fichadas por consulta.
+        Devuelve {"received", "matched", "recorded", "unmatched": [índices de fichadas sin reserva]}.
+        """
+        result = Attendance._ingest_checkins(events)
+        print(f"✅ Fichadas: {result['received']} recibidas, {result['matched']} con reserva, "
+              f"{result['recorded']} asistencias nuevas.")
+        return result
+
+    @staticmethod
+    def _ingest_checkins(events) -> dict:
+        """Núcleo de ingest_checkins, sin permisos ni prints (lo usa también la cola de fichadas)."""
+        events = list(events)
+        parsed = []
+        for i, (member_id, scanned_at) in enumerate(events):
+            if isinstance(scanned_at, str):
+                scanned_at = datetime.fromisoformat(scanned_at)
+            parsed.append((i, member_id, scanned_at.strftime("%Y-%m-%d %H:%M:%S")))
+
+        matched, first_scan = set(), {}
+        with transaction() as conn:
+            for start in range(0, len(parsed), CHECKIN_CHUNK):
+                chunk = parsed[start:start + CHECKIN_CHUNK]
+                values = ", ".join("(?, ?, ?)" for _ in chunk)
+                for row in conn.execute(f"""
+                    WITH ev(idx, member_id, scanned_at) AS (VALUES {values})
+                    SELECT ev.idx, ev.scanned_at, b.id AS booking_id
+                    FROM ev
+                    JOIN booking b ON b.member_id = ev.member_id AND b.status = 'BOOKED'
+                    JOIN class c ON c.id = b.class_id
+                    WHERE ev.scanned_at >= datetime(c.start_at, ?) AND ev.scanned_at < c.end_at
+                """, [v for event in chunk for v in event] + [f"-{CHECKIN_EARLY_MINUTES} minutes"]):
+                    matched.add(row["idx"])
+                    if row["booking_id"] not in first_scan or row["scanned_at"] < first_scan[row["booking_id"]]:
+                        first_scan[row["booking_id"]] = row["scanned_at"]
+
+            # Si la reserva ya estaba presente se conserva la hora original; si estaba ausente se corrige.
+            cur = conn.executemany("""
+                INSERT INTO attendance (booking_id, present, checked_at) VALUES (?, 1, ?)
+                ON CONFLICT(booking_id) DO UPDATE SET present = 1, checked_at = excluded.checked_at
+                WHERE attendance.present = 0
+            """, list(first_scan.items()))
+            recorded = cur.rowcount
+
+        return {"received": len(events), "matched": len(matched), "recorded": recorded,
+                "unmatched": [i for i, _, _ in parsed if i not in matched]}
+
     # ---------- READ ----------
     @staticmethod
+    @requires("attendance", "list_by_class", target="class_id")
     def list_by_class(class_id: int, current_user_id=None, current_user_roles=None):
         """
         Lista asistencias de una clase.
@@ -78,54 +174,28 @@ class Attendance:
         - TRAINER: solo sus clases
         - MEMBER: no autorizado
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-
-        if not (is_admin or is_trainer):
-            raise PermissionError("🚫 Solo entrenadores o administradores pueden ver asistencias por clase.")
-
         conn = get_connection()
         cur = conn.cursor()
-
-        if is_trainer:
-            cur.execute("""
-                SELECT a.id, u.full_name AS member_name, a.present, a.checked_at
-                FROM attendance a
-                JOIN booking b ON b.id = a.booking_id
-                JOIN user u ON u.id = b.member_id
-                JOIN class c ON c.id = b.class_id
-                WHERE c.id = ? AND c.trainer_id = ?
-                ORDER BY a.checked_at DESC
-            """, (class_id, current_user_id))
-        else:
-            cur.execute("""
-                SELECT a.id, u.full_name AS member_name, a.present, a.checked_at
-                FROM attendance a
-                JOIN booking b ON b.id = a.booking_id
-                JOIN user u ON u.id = b.member_id
-                JOIN class c ON c.id = b.class_id
-                WHERE c.id = ?
-                ORDER BY a.checked_at DESC
-            """, (class_id,))
+        cur.execute("""
+            SELECT a.id, u.full_name AS member_name, a.present, a.checked_at
+            FROM attendance a
+            JOIN booking b ON b.id = a.booking_id
+            JOIN user u ON u.id = b.member_id
+            WHERE b.class_id = ?
+            ORDER BY a.checked_at DESC
+        """, (class_id,))
         rows = cur.fetchall()
         conn.close()
         return rows
 
     @staticmethod
+    @requires("attendance", "list_by_member", subject="member_id")
     def list_by_member(member_id: int, current_user_id=None, current_user_roles=None):
         """
         Lista asistencias de un usuario (para ver historial).
         - ADMIN: cualquiera
         - MEMBER: solo las propias
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_member = "MEMBER" in roles
-
-        if not (is_admin or (is_member and member_id == current_user_id)):
-            raise PermissionError("🚫 No podés ver asistencias de otro usuario.")
-
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("""
@@ -142,14 +212,11 @@ class Attendance:
 
     # ---------- DELETE ----------
     @staticmethod
+    @requires("attendance", "delete")
     def delete(booking_id: int, current_user_id=None, current_user_roles=None):
         """
         Permite borrar un registro de asistencia (solo ADMIN).
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo administradores pueden eliminar registros de asistencia.")
-
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("DELETE FROM attendance WHERE booking_id = ?", (booking_id,))
@@ -0,0 +1,191 @@
+from datetime import date, datetime, time, timedelta
+
+from db.connection import get_connection, transaction
+from models.Class_session import DATETIME_FORMAT, MAX_CLASS_HOURS, ClassSession
+from utils.policy import authorize, invalidate_ownership
+
+# Abreviaturas aceptadas para los días (lunes = 0, como date.weekday()).
+WEEKDAYS = {"lun": 0, "mar": 1, "mie": 2, "mié": 2, "jue": 3, "vie": 4, "sab": 5, "sáb": 5, "dom": 6}
+DEFAULT_WEEKS = 4
+
+
+def _parse_weekdays(weekdays) -> list[int]:
+    """Acepta [0, 2, 4], "0,2,4" o "lun/mie/vie" y devuelve los días ordenados y sin repetir."""
+    if isinstance(weekdays, str):
+        weekdays = [d for d in weekdays.replace("/", ",").split(",") if d.strip()]
+    days = set()
+    for d in weekdays:
+        d = str(d).strip().lower()
+        day = WEEKDAYS.get(d[:3], d)
+        if not str(day).isdigit() or not 0 <= int(day) <= 6:
+            raise ValueError(f"⚠️ Día inválido: '{d}'. Usá lun, mar, mie, jue, vie, sab, dom (o 0-6).")
+        days.add(int(day))
+    if not days:
+        raise ValueError("⚠️ Indicá al menos un día de la semana.")
+    return sorted(days)
+
+
+class ClassTemplate:
+    """
+    Modelo para la tabla 'class_template': clases que se repiten todas las semanas.
+    generate() las materializa en filas de 'class' para las próximas N semanas, con un solo executemany.
+    Es idempotente e incremental: cada plantilla recuerda hasta qué día generó (generated_until)
+    y el índice único (template_id, start_at) impide duplicados aunque se regenere el mismo rango.
+    """
+
+    # ---------- CREATE ----------
+    @staticmethod
+    def create(gym_id: int, trainer_id: int, name: str, weekdays, start_time: str,
+               duration_minutes: int, capacity: int, room: str | None = None,
+               current_user_id=None, current_user_roles=None) -> int:
+        """Crea una plantilla (mismos permisos que crear una clase: ADMIN o el TRAINER de la clase)."""
+        days = _parse_weekdays(weekdays)
+        try:
+            start_time = datetime.strptime(start_time.strip(), "%H:%M").strftime("%H:%M")
+        except ValueError:
+            raise ValueError("⚠️ Hora inválida. Usá el formato HH:MM.") from None
+        if not 0 < duration_minutes <= MAX_CLASS_HOURS * 60:
+            raise ValueError(f"⚠️ La duración debe estar entre 1 minuto y {MAX_CLASS_HOURS} horas.")
+        if capacity <= 0:
+            raise ValueError("⚠️ La capacidad debe ser mayor a 0.")
+        if not name.strip():
+            raise ValueError("⚠️ El nombre de la clase no puede estar vacío.")
+
+        authorize("class", "create", current_user_roles, current_user_id, subject_id=trainer_id)
+
+        with get_connection() as conn:
+            cur = conn.execute("""
+                INSERT INTO class_template (gym_id, trainer_id, name, weekdays, start_time,
+                                            duration_minutes, capacity, room)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (gym_id, trainer_id, name.strip(), ",".join(map(str, days)), start_time,
+                  duration_minutes, capacity, room.strip() if room else None))
+            template_id = cur.lastrowid
+
+        print(f"✅ Plantilla '{name}' creada (ID {template_id}).")
+        return template_id
+
+    # ---------- READ ----------
+    @staticmethod
+    def list_by_gym(gym_id: int, include_inactive: bool = False):
+        """Lista las plantillas de un gimnasio."""
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT ct.*, u.full_name AS trainer_name
+            FROM class_template ct
+            JOIN user u ON u.id = ct.trainer_id
+            WHERE ct.gym_id = ? {"" if include_inactive else "AND ct.active = 1"}
+            ORDER BY ct.id
+        """, (gym_id,))
+        rows = cur.fetchall()
+        conn.close()
+        return rows
+
+    # ---------- UPDATE ----------
+    @staticmethod
+    def deactivate(template_id: int, current_user_id=None, current_user_roles=None):
+        """Deja de generar clases nuevas (las ya generadas no se tocan)."""
+        conn = get_connection()
+        row = conn.execute("SELECT trainer_id FROM class_template WHERE id = ?", (template_id,)).fetchone()
+        if not row:
+            conn.close()
+            raise ValueError("⚠️ La plantilla no existe.")
+        authorize("class", "create", current_user_roles, current_user_id, subject_id=row["trainer_id"])
+        conn.execute("UPDATE class_template SET active = 0 WHERE id = ?", (template_id,))
+        conn.commit()
+        conn.close()
+        print(f"🟡 Plantilla ID {template_id} desactivada.")
+
+    # ---------- GENERACIÓN ----------
+    @staticmethod
+    def generate(template_id: int | None = None, weeks: int = DEFAULT_WEEKS, today: date | None = None,
+                 now: datetime | None = None) -> dict:
+        """Materializa las plantillas (ver _generate) e informa el resultado."""
+        result = ClassTemplate._generate(template_id, weeks, today, now)
+        print(f"✅ Plantillas procesadas: {result['templates']} — clases nuevas: {result['created']}.")
+        if result["conflicts"]:
+            print(f"⚠️ {len(result['conflicts'])} horario(s) salteado(s) por choques con otras clases.")
+        return result
+
+    @staticmethod
+    def _generate(template_id: int | None = None, weeks: int = DEFAULT_WEEKS, today: date | None = None,
+                  now: datetime | None = None) -> dict:
+        """
+        Materializa las clases de una plantilla (o de todas las activas si template_id es None)
+        para `weeks` semanas desde hoy (hoy incluido, el mismo día de dentro de `weeks` semanas no).
+        Solo agrega los días que faltan: arranca después de generated_until, saltea los horarios
+        que ya existen y los de hoy que ya pasaron.
+        Los horarios que chocan con otra clase del entrenador o de la sala se saltean y se informan;
+        generated_until no los pasa, así la próxima corrida los vuelve a intentar.
+        Devuelve {"templates", "created", "conflicts": [{"template_id", "start_at", "message"}]}.
+        """
+        if weeks <= 0:
+            raise ValueError("⚠️ La cantidad de semanas debe ser mayor a 0.")
+        if now is None:
+            now = datetime.combine(today, time.min) if today else datetime.now()
+        today = today or now.date()
+        horizon = today + timedelta(weeks=weeks) - timedelta(days=1)   # último día a generar
+
+        result = {"templates": 0, "created": 0, "conflicts": []}
+        trainers = set()
+        with transaction() as conn:
+            templates = conn.execute(f"""
+                SELECT * FROM class_template
+                WHERE active = 1 {"AND id = ?" if template_id is not None else ""}
+                  AND (generated_until IS NULL OR generated_until < ?)
+            """, ((template_id,) if template_id is not None else ()) + (horizon.isoformat(),)).fetchall()
+
+            for t in templates:
+                result["templates"] += 1
+                start_day = today
+                if t["generated_until"]:
+                    start_day = max(today, date.fromisoformat(t["generated_until"]) + timedelta(days=1))
+                days = {int(d) for d in t["weekdays"].split(",")}
+                hour, minute = map(int, t["start_time"].split(":"))
+                duration = timedelta(minutes=t["duration_minutes"])
+
+                candidates = []
+                day = start_day
+                while day <= horizon:
+                    start = datetime(day.year, day.month, day.day, hour, minute)
+                    if day.weekday() in days and start >= now:   # un horario de hoy que ya pasó no se crea
+                        candidates.append({"trainer_id": t["trainer_id"], "room": t["room"],
+                                           "start_at": start.strftime(DATETIME_FORMAT),
+                                           "end_at": (start + duration).strftime(DATETIME_FORMAT)})
+                    day += timedelta(days=1)
+
+                # Lo que ya existe de esta plantilla en el rango (p. ej. una corrida anterior cortada) no se revisa
+                existing = {row["start_at"] for row in conn.execute("""
+                    SELECT start_at FROM class WHERE template_id = ? AND start_at >= ?
+                """, (t["id"], start_day.isoformat()))}
+                candidates = [c for c in candidates if c["start_at"] not in existing]
+
+                problems = ClassSession.validate_timetable(t["gym_id"], candidates)
+                rejected = {p["index"] for p in problems}
+                for p in problems:
+                    result["conflicts"].append({"template_id": t["id"], "start_at": candidates[p["index"]]["start_at"],
+                                                "message": p["message"]})
+
+                rows = [(t["gym_id"], t["trainer_id"], t["name"], c["start_at"], c["end_at"],
+                         t["capacity"], t["room"], t["id"])
+                        for i, c in enumerate(candidates) if i not in rejected]
+                if rows:
+                    cur = conn.executemany("""
+                        INSERT OR IGNORE INTO class (gym_id, trainer_id, name, start_at, end_at,
+                                                     capacity, room, template_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """, rows)
+                    result["created"] += cur.rowcount
+                    trainers.add(t["trainer_id"])
+                # Hasta el día anterior al primer horario rechazado: desde ahí se reintenta
+                generated_until = horizon
+                if rejected:
+                    first = min(candidates[i]["start_at"] for i in rejected)
+                    generated_until = date.fromisoformat(first[:10]) - timedelta(days=1)
+                conn.execute("UPDATE class_template SET generated_until = ? WHERE id = ?",
+                             (generated_until.isoformat(), t["id"]))
+
+        for trainer_id in trainers:
+            invalidate_ownership("class", trainer_id)
+        return result
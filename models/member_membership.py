@@ -1,4 +1,8 @@
-from db.connection import get_connection
+from db.connection import get_connection, update_in_batches
+from utils.policy import requires
+
+# Filas por lote al vencer membresías (cada lote es una transacción corta).
+EXPIRE_BATCH_SIZE = 500
 
 class MemberMembership:
     """
@@ -10,6 +14,7 @@ class MemberMembership:
 
     # ---------- CREATE ----------
     @staticmethod
+    @requires("member_membership", "create", subject="user_id")
     def create(user_id: int, membership_id: int, start_date=None, end_date=None, status: str = "ACTIVE",
                current_user_id=None, current_user_roles=None):
         """
@@ -18,13 +23,6 @@ class MemberMembership:
         - Si es MEMBER: solo puede asignarse a sí mismo.
         - Un usuario no puede tener más de una membresía activa/pausada.
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_self = current_user_id == user_id
-
-        if not (is_admin or is_self):
-            raise PermissionError("🚫 No tenés permiso para asignar membresías a otros usuarios.")
-
         status = status.upper()
         if status not in ("ACTIVE", "EXPIRED", "PAUSED"):
             raise ValueError("⚠️ Estado inválido. Use 'ACTIVE', 'EXPIRED' o 'PAUSED'.")
@@ -75,11 +73,9 @@ class MemberMembership:
 
     # ---------- UPDATE ----------
     @staticmethod
+    @requires("member_membership", "update_status")
     def update_status(member_membership_id: int, new_status: str, current_user_roles=None):
         """Actualiza el estado de una membresía (solo ADMIN)."""
-        if not current_user_roles or "ADMIN" not in [r.upper() for r in current_user_roles]:
-            raise PermissionError("🚫 Solo un usuario con rol ADMIN puede cambiar el estado de una membresía.")
-
         new_status = new_status.upper().strip()
         if new_status not in ("ACTIVE", "EXPIRED", "PAUSED"):
             raise ValueError("⚠️ Estado inválido. Use 'ACTIVE', 'EXPIRED' o 'PAUSED'.")
@@ -88,7 +84,7 @@ class MemberMembership:
         cur = conn.cursor()
         cur.execute("""
             UPDATE member_membership
-            SET status = ?, updated_at = CURRENT_TIMESTAMP
+            SET status = ?
             WHERE id = ?
         """, (new_status, member_membership_id))
         conn.commit()
@@ -97,17 +93,20 @@ class MemberMembership:
 
     # ---------- AUTO-EXPIRE ----------
     @staticmethod
-    def expire_expired_memberships():
-        """Marca como EXPIRED las membresías cuya fecha de fin ya pasó."""
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE member_membership
-            SET status = 'EXPIRED', updated_at = CURRENT_TIMESTAMP
-            WHERE end_date IS NOT NULL
-              AND end_date < CURRENT_TIMESTAMP
-              AND status = 'ACTIVE'
-        """)
-        conn.commit()
-        conn.close()
-        print("⏳ Se actualizaron las membresías vencidas.")
+    def _expire(batch_size: int = EXPIRE_BATCH_SIZE) -> int:
+        """Pasa a EXPIRED las membresías activas vencidas, en lotes (idx_member_membership_active_end)."""
+        return update_in_batches("""
+            UPDATE member_membership SET status = 'EXPIRED'
+            WHERE id IN (
+                SELECT id FROM member_membership
+                WHERE status = 'ACTIVE' AND end_date IS NOT NULL AND end_date < CURRENT_TIMESTAMP
+                LIMIT ?
+            )
+        """, batch_size=batch_size)
+
+    @staticmethod
+    def expire_expired_memberships(batch_size: int = EXPIRE_BATCH_SIZE) -> int:
+        """Marca como EXPIRED las membresías cuya fecha de fin ya pasó. Devuelve cuántas venció."""
+        expired = MemberMembership._expire(batch_size)
+        print(f"⏳ Se actualizaron las membresías vencidas ({expired}).")
+        return expired
@@ -1,4 +1,6 @@
 from db.connection import get_connection
+from utils.policy import requires
+from utils.ref_cache import cached, invalidates
 
 class Membership:
     """
@@ -10,13 +12,10 @@ class Membership:
 
     # ---------- CREATE ----------
     @staticmethod
+    @invalidates("membership")
+    @requires("membership", "create")
     def create(gym_id: int, name: str, duration_months: int, price: float, status: str = "ACTIVE", current_user_roles=None):
         """Crea una nueva membresía (solo ADMIN)."""
-        # Validar que sea ADMIN
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo administradores pueden crear membresías.")
-
         if duration_months <= 0:
             raise ValueError("⚠️ La duración debe ser mayor a 0 meses.")
         if price < 0:
@@ -38,6 +37,7 @@ class Membership:
 
     # ---------- READ ----------
     @staticmethod
+    @cached("membership")
     def all(include_inactive: bool = False):
         """Devuelve todas las membresías (los socios solo verán las activas)."""
         conn = get_connection()
@@ -52,6 +52,7 @@ class Membership:
 
     # ---------- UPDATE ----------
     @staticmethod
+    @invalidates("membership")
     def update(membership_id: int, name=None, duration_months=None, price=None, status=None, current_user_roles=None):
         """Actualiza los campos indicados de una membresía (solo ADMIN)."""        
 
@@ -96,6 +97,7 @@ class Membership:
 
     # ---------- SOFT DELETE ----------
     @staticmethod
+    @invalidates("membership")
     def deactivate(membership_id: int, current_user_roles=None):
         """Marca la membresía como INACTIVA (baja lógica) — solo ADMIN."""
         conn = get_connection()
@@ -0,0 +1,128 @@
+import os
+from datetime import datetime, timedelta
+
+from db.connection import get_connection, transaction
+from utils.clock import DATETIME_FORMAT, local_now, now_str
+from utils.policy import requires
+
+# Con NO_SHOW_LIMIT faltazos dentro de NO_SHOW_WINDOW_DAYS, el socio no puede reservar por NO_SHOW_BAN_DAYS.
+NO_SHOW_LIMIT = int(os.environ.get("SMARTFIT_NO_SHOW_LIMIT", 3))
+NO_SHOW_WINDOW_DAYS = int(os.environ.get("SMARTFIT_NO_SHOW_WINDOW_DAYS", 30))
+NO_SHOW_BAN_DAYS = int(os.environ.get("SMARTFIT_NO_SHOW_BAN_DAYS", 7))
+# Margen para que el entrenador cargue la asistencia antes de juzgar la clase.
+GRACE_MINUTES = int(os.environ.get("SMARTFIT_NO_SHOW_GRACE_MINUTES", 60))
+# Hasta cuánto hacia atrás revisa cada corrida (el job tiene que correr al menos con esta frecuencia).
+LOOKBACK_HOURS = int(os.environ.get("SMARTFIT_NO_SHOW_LOOKBACK_HOURS", 48))
+
+# La clase c tiene asistencia tomada (al menos un registro). Si nadie pasó lista no se sabe quién
+# faltó: ni los faltazos ni la analítica (services/attendance_analytics.py) cuentan esa clase.
+ATTENDANCE_TAKEN_SQL = """EXISTS (
+    SELECT 1 FROM booking b2 JOIN attendance a2 ON a2.booking_id = b2.id
+    WHERE b2.class_id = c.id
+)"""
+
+# Reservas BOOKED sin presente en clases terminadas de la ventana, solo de clases con asistencia tomada.
+_RECORD_NO_SHOWS = f"""
+    INSERT OR IGNORE INTO no_show (booking_id, member_id, class_id, class_end)
+    SELECT b.id, b.member_id, c.id, c.end_at
+    FROM class c
+    CROSS JOIN booking b ON b.class_id = c.id AND b.status = 'BOOKED'   -- CROSS JOIN fija el orden: primero la ventana de clases
+    LEFT JOIN attendance a ON a.booking_id = b.id
+    WHERE c.start_at >= ? AND c.end_at <= ?
+      AND COALESCE(a.present, 0) = 0
+      AND {ATTENDANCE_TAKEN_SQL}
+    RETURNING member_id
+"""
+
+_APPLY_BANS = """
+    INSERT INTO booking_ban (member_id, banned_until, reason)
+    SELECT member_id, ?, COUNT(*) || ' faltazos en los últimos ' || ? || ' días'
+    FROM no_show
+    WHERE member_id IN (SELECT value FROM json_each(?)) AND class_end >= ?
+    GROUP BY member_id
+    HAVING COUNT(*) >= ?
+    ON CONFLICT(member_id) DO UPDATE
+    SET banned_until = MAX(banned_until, excluded.banned_until), reason = excluded.reason
+"""
+
+
+class NoShow:
+    """
+    Faltazos y bloqueos de reserva (tablas 'no_show' y 'booking_ban').
+    - evaluate(): job que corre después de las clases; registra los faltazos en lote y aplica bloqueos.
+    - active_ban(): lo usa Booking antes de reservar (búsqueda por clave primaria).
+    """
+
+    # ---------- JOB ----------
+    @staticmethod
+    def evaluate(now: datetime | None = None) -> dict:
+        """
+        Revisa las clases terminadas hace más de GRACE_MINUTES (y que empezaron en las últimas
+        LOOKBACK_HOURS), registra como faltazo cada reserva BOOKED sin presente con un único
+        INSERT ... SELECT, y bloquea a los socios que llegaron a NO_SHOW_LIMIT en la ventana.
+        Es idempotente: una reserva ya registrada no se vuelve a contar.
+        Devuelve {"no_shows": nuevos faltazos, "members", "bans": bloqueos aplicados o extendidos}.
+        """
+        now = local_now(now)
+        lower = (now - timedelta(hours=LOOKBACK_HOURS)).strftime(DATETIME_FORMAT)
+        upper = (now - timedelta(minutes=GRACE_MINUTES)).strftime(DATETIME_FORMAT)
+        window_start = (now - timedelta(days=NO_SHOW_WINDOW_DAYS)).strftime(DATETIME_FORMAT)
+        banned_until = (now + timedelta(days=NO_SHOW_BAN_DAYS)).strftime(DATETIME_FORMAT)
+
+        with transaction() as conn:
+            members = [row["member_id"] for row in conn.execute(_RECORD_NO_SHOWS, (lower, upper)).fetchall()]
+            bans = 0
+            if members:
+                ids = "[" + ",".join(map(str, sorted(set(members)))) + "]"
+                bans = conn.execute(_APPLY_BANS, (banned_until, NO_SHOW_WINDOW_DAYS, ids,
+                                                  window_start, NO_SHOW_LIMIT)).rowcount
+
+        return {"no_shows": len(members), "members": len(set(members)), "bans": bans}
+
+    # ---------- BLOQUEOS ----------
+    @staticmethod
+    def active_ban(member_id: int, conn=None, now: datetime | None = None):
+        """Bloqueo vigente del socio (fila con banned_until y reason) o None."""
+        own = conn is None
+        conn = conn or get_connection()
+        try:
+            return conn.execute("""
+                SELECT banned_until, reason FROM booking_ban
+                WHERE member_id = ? AND banned_until > ?
+            """, (member_id, now_str(now))).fetchone()
+        finally:
+            if own:
+                conn.close()
+
+    @staticmethod
+    def check_can_book(member_id: int, conn=None):
+        """Lanza PermissionError si el socio tiene un bloqueo de reservas vigente."""
+        ban = NoShow.active_ban(member_id, conn)
+        if ban:
+            raise PermissionError(f"🚫 No podés reservar clases hasta {ban['banned_until']} ({ban['reason']}).")
+
+    @staticmethod
+    @requires("booking_ban", "lift")
+    def lift_ban(member_id: int, current_user_id=None, current_user_roles=None):
+        """Levanta el bloqueo de un socio (solo ADMIN)."""
+        with get_connection() as conn:
+            lifted = conn.execute("DELETE FROM booking_ban WHERE member_id = ?", (member_id,)).rowcount
+        print("✅ Bloqueo levantado." if lifted else "ℹ️ El socio no tenía bloqueos.")
+
+    # ---------- READ ----------
+    @staticmethod
+    @requires("attendance", "list_by_member", subject="member_id")
+    def list_by_member(member_id: int, current_user_id=None, current_user_roles=None):
+        """Faltazos de un socio, del más reciente al más viejo (ADMIN o el propio socio)."""
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT ns.booking_id, c.name AS class_name, ns.class_end, ns.recorded_at
+            FROM no_show ns
+            JOIN class c ON c.id = ns.class_id
+            WHERE ns.member_id = ?
+            ORDER BY ns.class_end DESC
+        """, (member_id,))
+        rows = cur.fetchall()
+        conn.close()
+        return rows
@@ -1,4 +1,7 @@
 from db.connection import get_connection
+from db.pagination import fetch_page, keyset, page_size
+from db.records import tuple_cursor
+from utils.policy import requires
 
 class Payment:
     """
@@ -13,6 +16,7 @@ class Payment:
 
     # ---------- CREATE ----------
     @staticmethod
+    @requires("payment", "create")
     def create(member_membership_id: int,
                amount: float,
                method: str,
@@ -23,10 +27,6 @@ class Payment:
                status: str = "APPROVED",
                current_user_roles=None):
         """Crea un pago (solo ADMIN). Fechas en formato ISO 'YYYY-MM-DD' o DATETIME válido para SQLite."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("Error: Solo un usuario con rol ADMIN puede registrar pagos.")
-
         method = method.upper().strip()
         purpose = purpose.upper().strip()
         status = status.upper().strip()
@@ -58,6 +58,7 @@ class Payment:
         print("✅ Pago registrado correctamente.")
 
     @staticmethod
+    @requires("payment", "create")
     def create_for_user(user_id: int,
                         amount: float,
                         method: str,
@@ -71,10 +72,6 @@ class Payment:
         Crea un pago buscando la member_membership ACTIVA del usuario (solo ADMIN).
         Útil cuando no conocés el ID de la relación.
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo un usuario con rol ADMIN puede registrar pagos.")
-
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("""
@@ -97,7 +94,7 @@ class Payment:
             period_start=period_start,
             period_end=period_end,
             status=status,
-            current_user_roles=roles
+            current_user_roles=current_user_roles
         )
 
     # ---------- READ ----------
@@ -142,12 +139,18 @@ class Payment:
     @staticmethod
     def list_filtered(status: str | None = None,
                       date_from: str | None = None,
-                      date_to: str | None = None):
+                      date_to: str | None = None,
+                      as_tuples: bool = False,
+                      after: tuple | None = None,
+                      limit: int | None = None):
         """
         Lista pagos con filtros opcionales:
         - status: APPROVED/PENDING/REJECTED
         - date_from / date_to: filtra por 'paid_at' (inclusive) en formato 'YYYY-MM-DD' o DATETIME válido.
+        - as_tuples: filas como tuplas planas (columnas de payment + user_id), para listados masivos.
+        - after / limit: paginación por cursor (paid_at, id); after es el next_cursor de la página anterior.
         """
+        limit = page_size(limit)
         clauses, values = [], []
         if status:
             status = status.upper().strip()
@@ -162,6 +165,11 @@ class Payment:
             clauses.append("p.paid_at <= ?")
             values.append(date_to)
 
+        after_sql, after_values = keyset(("p.paid_at", "p.id"), after, descending=True)
+        if after_sql:
+            clauses.append(after_sql)
+            values.extend(after_values)
+
         where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
         sql = f"""
             SELECT p.*, mm.user_id
@@ -169,22 +177,23 @@ class Payment:
             JOIN member_membership mm ON mm.id = p.member_membership_id
             {where}
             ORDER BY p.paid_at DESC, p.id DESC
+            LIMIT ?
         """
 
         conn = get_connection()
-        cur = conn.cursor()
-        cur.execute(sql, tuple(values))
-        rows = cur.fetchall()
+        cur = tuple_cursor(conn) if as_tuples else conn.cursor()
+        cur.execute(sql, (*values, limit + 1))
+        # Posiciones de la clave del cursor (sirven tanto para Records como para tuplas)
+        columns = [col[0] for col in cur.description]
+        paid_at, row_id = columns.index("paid_at"), columns.index("id")
+        rows = fetch_page(cur, limit, lambda row: (row[paid_at], row[row_id]))
         conn.close()
         return rows
 
     # ---------- UPDATE STATUS (ADMIN) ----------
     @staticmethod
+    @requires("payment", "update_status")
     def update_status(payment_id: int, new_status: str, current_user_roles=None):
-        roles = [r.upper() for r in (current_user_roles or [])]
-        if "ADMIN" not in roles:
-            raise PermissionError("🚫 Solo un usuario con rol ADMIN puede cambiar el estado de un pago.")
-
         new_status = new_status.upper().strip()
         if new_status not in Payment._STATUSES:
             raise ValueError(f"⚠️ Estado inválido. Use uno de: {', '.join(Payment._STATUSES)}")
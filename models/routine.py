@@ -1,4 +1,5 @@
 from db.connection import get_connection
+from utils.policy import invalidate_ownership, requires
 
 class Routine:
     """
@@ -10,6 +11,7 @@ class Routine:
 
     # ---------- CREATE ----------
     @staticmethod
+    @requires("routine", "create", target="plan_id")
     def create(plan_id: int, name: str, weekday: int, notes: str = "",
                current_user_id=None, current_user_roles=None):
         """
@@ -17,27 +19,12 @@ class Routine:
         - Solo TRAINER o ADMIN pueden crear.
         - Si es TRAINER, debe ser dueño del plan.
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-
         if not (1 <= weekday <= 7):
             raise ValueError("⚠️ El día de la semana (weekday) debe estar entre 1 y 7.")
 
         conn = get_connection()
         cur = conn.cursor()
 
-        # Validar propiedad del plan si es entrenador
-        if is_trainer:
-            cur.execute("SELECT trainer_id FROM training_plan WHERE id = ?", (plan_id,))
-            row = cur.fetchone()
-            if not row:
-                conn.close()
-                raise ValueError(f"⚠️ El plan ID {plan_id} no existe.")
-            if row["trainer_id"] != current_user_id:
-                conn.close()
-                raise PermissionError("🚫 No podés crear rutinas en planes que no te pertenecen.")
-
         # Crear rutina
         cur.execute("""
             INSERT INTO routine (plan_id, name, weekday, notes)
@@ -45,41 +32,17 @@ class Routine:
         """, (plan_id, name.strip(), weekday, notes.strip()))
         conn.commit()
         conn.close()
+        invalidate_ownership("routine")
 
         print(f"✅ Rutina '{name}' agregada al plan ID {plan_id} (día {weekday}).")
 
     # ---------- READ ----------
     @staticmethod
+    @requires("routine", "list_by_plan", target="plan_id")
     def list_by_plan(plan_id: int, current_user_id=None, current_user_roles=None):
         """Devuelve todas las rutinas de un plan (según permisos)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-        is_member = "MEMBER" in roles
-
         conn = get_connection()
         cur = conn.cursor()
-
-        # Validar acceso según rol
-        if is_trainer:
-            cur.execute("SELECT trainer_id FROM training_plan WHERE id = ?", (plan_id,))
-            plan = cur.fetchone()
-            if not plan:
-                conn.close()
-                raise ValueError("⚠️ El plan no existe.")
-            if plan["trainer_id"] != current_user_id:
-                conn.close()
-                raise PermissionError("🚫 No podés ver rutinas de planes ajenos.")
-        elif is_member:
-            cur.execute("SELECT member_id FROM training_plan WHERE id = ?", (plan_id,))
-            plan = cur.fetchone()
-            if not plan:
-                conn.close()
-                raise ValueError("⚠️ El plan no existe.")
-            if plan["member_id"] != current_user_id:
-                conn.close()
-                raise PermissionError("🚫 Solo podés ver rutinas de tus propios planes.")
-
         cur.execute("""
             SELECT id, name, weekday, notes
             FROM routine
@@ -92,35 +55,13 @@ class Routine:
 
     # ---------- UPDATE ----------
     @staticmethod
+    @requires("routine", "update", target="routine_id")
     def update(routine_id: int, name=None, weekday=None, notes=None,
                current_user_id=None, current_user_roles=None):
         """Modifica una rutina existente (solo TRAINER o ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-
-        if not (is_admin or is_trainer):
-            raise PermissionError("🚫 Solo entrenadores o administradores pueden modificar rutinas.")
-
         conn = get_connection()
         cur = conn.cursor()
 
-        # Validar propiedad si es entrenador
-        if is_trainer:
-            cur.execute("""
-                SELECT tp.trainer_id
-                FROM routine r
-                JOIN training_plan tp ON tp.id = r.plan_id
-                WHERE r.id = ?
-            """, (routine_id,))
-            row = cur.fetchone()
-            if not row:
-                conn.close()
-                raise ValueError("⚠️ Rutina no encontrada.")
-            if row["trainer_id"] != current_user_id:
-                conn.close()
-                raise PermissionError("🚫 No podés modificar rutinas de otros entrenadores.")
-
         fields, values = [], []
         if name:
             fields.append("name = ?")
@@ -147,34 +88,13 @@ class Routine:
 
     # ---------- DELETE ----------
     @staticmethod
+    @requires("routine", "delete", target="routine_id")
     def delete(routine_id: int, current_user_id=None, current_user_roles=None):
         """Elimina una rutina (solo TRAINER dueño o ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-
-        if not (is_admin or is_trainer):
-            raise PermissionError("🚫 Solo entrenadores o administradores pueden borrar rutinas.")
-
         conn = get_connection()
         cur = conn.cursor()
-
-        if is_trainer:
-            cur.execute("""
-                SELECT tp.trainer_id
-                FROM routine r
-                JOIN training_plan tp ON tp.id = r.plan_id
-                WHERE r.id = ?
-            """, (routine_id,))
-            row = cur.fetchone()
-            if not row:
-                conn.close()
-                raise ValueError("⚠️ Rutina no encontrada.")
-            if row["trainer_id"] != current_user_id:
-                conn.close()
-                raise PermissionError("🚫 No podés eliminar rutinas que no son tuyas.")
-
         cur.execute("DELETE FROM routine WHERE id = ?", (routine_id,))
         conn.commit()
         conn.close()
+        invalidate_ownership("routine")
         print(f"🗑️ Rutina ID {routine_id} eliminada correctamente.")
@@ -1,4 +1,6 @@
 from db.connection import get_connection
+from db.pagination import fetch_page, keyset, page_size
+from utils.policy import authorize, invalidate_ownership, requires
 
 class TrainingPlan:
     """
@@ -10,6 +12,7 @@ class TrainingPlan:
 
     # ---------- CREATE ----------
     @staticmethod
+    @requires("plan", "create", subject="trainer_id")
     def create(trainer_id: int, member_id: int, goal: str,
                start_date: str | None = None,
                end_date: str | None = None,
@@ -21,16 +24,6 @@ class TrainingPlan:
         - Solo TRAINER o ADMIN pueden crearlo.
         - Valida que el trainer_id coincida con el usuario logueado (si es TRAINER).
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-
-        if not (is_admin or is_trainer):
-            raise PermissionError("🚫 Solo entrenadores o administradores pueden crear planes de entrenamiento.")
-
-        if is_trainer and current_user_id != trainer_id:
-            raise PermissionError("🚫 Un entrenador solo puede crear planes asignados a su propio ID.")
-
         if status.upper() not in ("ACTIVE", "CLOSED"):
             raise ValueError("⚠️ Estado inválido. Use 'ACTIVE' o 'CLOSED'.")
 
@@ -50,64 +43,59 @@ class TrainingPlan:
         """, (trainer_id, member_id, goal.strip(), start_date, end_date, status.upper()))
         conn.commit()
         conn.close()
+        invalidate_ownership("plan", trainer_id)
+        invalidate_ownership("member_plan", member_id)
 
         print(f"✅ Plan de entrenamiento creado para el usuario ID {member_id} por el entrenador ID {trainer_id}.")
 
     # ---------- READ ----------
     @staticmethod
-    def list_all_training_plans(current_user_id=None, current_user_roles=None):
-        """Lista todos los planes visibles según el rol."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-        is_member = "MEMBER" in roles
-
-        conn = get_connection()
-        cur = conn.cursor()
-
-        if is_admin:
-            cur.execute("""
+    def list_all_training_plans(current_user_id=None, current_user_roles=None,
+                                after: int | None = None, limit: int | None = None):
+        """Lista los planes visibles según el rol, de a una página (más nuevos primero; after = next_cursor)."""
+        roles = authorize("plan", "list", current_user_roles)
+        limit = page_size(limit)
+
+        if "ADMIN" in roles:
+            select = """
                 SELECT tp.*, u.full_name AS member_name, t.full_name AS trainer_name
                 FROM training_plan tp
                 JOIN user u ON u.id = tp.member_id
                 JOIN user t ON t.id = tp.trainer_id
-                ORDER BY tp.id DESC
-            """)
-        elif is_trainer:
-            cur.execute("""
+            """
+            clauses, values = [], []
+        elif "TRAINER" in roles:
+            select = """
                 SELECT tp.*, u.full_name AS member_name
                 FROM training_plan tp
                 JOIN user u ON u.id = tp.member_id
-                WHERE tp.trainer_id = ?
-                ORDER BY tp.id DESC
-            """, (current_user_id,))
-        elif is_member:
-            cur.execute("""
+            """
+            clauses, values = ["tp.trainer_id = ?"], [current_user_id]
+        else:
+            select = """
                 SELECT tp.*, t.full_name AS trainer_name
                 FROM training_plan tp
                 JOIN user t ON t.id = tp.trainer_id
-                WHERE tp.member_id = ?
-                ORDER BY tp.id DESC
-            """, (current_user_id,))
-        else:
-            conn.close()
-            raise PermissionError("🚫 Rol no autorizado para ver planes.")
+            """
+            clauses, values = ["tp.member_id = ?"], [current_user_id]
 
-        rows = cur.fetchall()
+        after_sql, after_values = keyset("tp.id", after, descending=True)
+        if after_sql:
+            clauses.append(after_sql)
+            values.extend(after_values)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(f"{select} {where} ORDER BY tp.id DESC LIMIT ?", (*values, limit + 1))
+        rows = fetch_page(cur, limit, lambda row: row["id"])
         conn.close()
         return rows
 
     @staticmethod
+    @requires("plan", "list_by_member", subject="member_id")
     def find_by_member(member_id: int, current_user_id=None, current_user_roles=None):
         """Obtiene los planes de un usuario específico."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-        is_member = "MEMBER" in roles
-
-        if not (is_admin or is_trainer or (is_member and member_id == current_user_id)):
-            raise PermissionError("🚫 No podés ver los planes de otro usuario.")
-
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("""
@@ -123,30 +111,13 @@ class TrainingPlan:
 
     # ---------- UPDATE ----------
     @staticmethod
+    @requires("plan", "update", target="plan_id")
     def update(plan_id: int, goal=None, end_date=None, status=None,
                current_user_id=None, current_user_roles=None):
         """Actualiza un plan (solo TRAINER o ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
-        is_admin = "ADMIN" in roles
-        is_trainer = "TRAINER" in roles
-
-        if not (is_admin or is_trainer):
-            raise PermissionError("🚫 Solo entrenadores o administradores pueden modificar planes.")
-
         conn = get_connection()
         cur = conn.cursor()
 
-        # Validar propiedad del plan si es entrenador
-        if is_trainer:
-            cur.execute("SELECT trainer_id FROM training_plan WHERE id = ?", (plan_id,))
-            row = cur.fetchone()
-            if not row:
-                conn.close()
-                raise ValueError("⚠️ El plan no existe.")
-            if row["trainer_id"] != current_user_id:
-                conn.close()
-                raise PermissionError("🚫 No podés modificar un plan que no creaste.")
-
         fields, values = [], []
         if goal:
             fields.append("goal = ?")
@@ -1,8 +1,13 @@
 from db.connection import get_connection
+from db.pagination import fetch_page, page_size
+from utils.session_store import invalidate_user
 
 class User:
     """ Model class for User: en esta clase se manejan los metodos para la tabla user, ejemplo crear, listar, buscar por id para un control mejor de los usuarios """
 
+    # Las consultas devuelven Records (db/records.py); esta clase solo se usa si se arma un User a mano
+    __slots__ = ("id", "gym_id", "full_name", "phone", "status")
+
     # Inicializador de la clase User
     def __init__(self, id=None, gym_id=None, full_name=None, phone=None, status="ACTIVE"):
         self.id = id
@@ -12,8 +17,9 @@ class User:
         self.status = status
 
     @staticmethod
-    def list_all_users():
-        """ Listar todos los usuarios con sus roles """
+    def list_all_users(after: int | None = None, limit: int | None = None):
+        """ Listar usuarios con sus roles, de a una página (ordenados por id; after = next_cursor de la anterior) """
+        limit = page_size(limit)
         conn = get_connection()
         cur = conn.cursor()
         cur.execute("""
@@ -22,9 +28,12 @@ class User:
             FROM user u
             LEFT JOIN user_role ur ON u.id = ur.user_id
             LEFT JOIN role r ON ur.role_id = r.id
+            WHERE u.id > ?
             GROUP BY u.id, u.full_name, u.status
-        """)
-        users = cur.fetchall()
+            ORDER BY u.id
+            LIMIT ?
+        """, (after or 0, limit + 1))
+        users = fetch_page(cur, limit, lambda row: row["id"])
         conn.close()
         return users
 
@@ -142,6 +151,7 @@ class User:
         cur.execute(sql, values)
         conn.commit()
         conn.close()
+        invalidate_user(user_id)
         print("✅ Usuario actualizado correctamente.")
 
     # ---------- SOFT DELETE ----------
@@ -158,6 +168,7 @@ class User:
         """, (user_id,))
         conn.commit()
         conn.close()
+        invalidate_user(user_id)
         print("🟡 Usuario marcado como INACTIVO (baja lógica).")
 
 
@@ -173,4 +184,5 @@ class User:
         """, (user_id,))
         conn.commit()
         conn.close()
+        invalidate_user(user_id)
         print("🟢 Usuario marcado como ACTIVO (rehabilitado).")
@@ -1,9 +1,10 @@
 # services/class_service.py
 from models.Class_session import ClassSession
+from models.class_template import ClassTemplate
 from models.Booking import Booking
-from models.Attendance import Attendance
-from db.connection import get_connection
-import datetime
+from models.attendance import Attendance
+from db.connection import get_connection, transaction
+from utils.roles import normalize_roles
 
 class ClassService:
     """
@@ -18,16 +19,50 @@ class ClassService:
     @staticmethod
     def create_class(gym_id: int, trainer_id: int, name: str,
                      start_at: str, end_at: str, capacity: int,
-                     room: str | None = None):
-        """Crear una clase (solo ADMIN o TRAINER)."""
+                     room: str | None = None,
+                     current_user_id=None, current_user_roles=None):
+        """Crear una clase (solo ADMIN o TRAINER). Rechaza choques de entrenador o sala."""
         if not name.strip():
             raise ValueError("⚠️ El nombre de la clase no puede estar vacío.")
         if capacity <= 0:
             raise ValueError("⚠️ La capacidad debe ser mayor que 0.")
 
-        ClassSession.create(gym_id, trainer_id, name, start_at, end_at, capacity, room)
+        ClassSession.create(gym_id, trainer_id, name, start_at, end_at, capacity, room,
+                            current_user_id=current_user_id, current_user_roles=current_user_roles)
         print(f"✅ Clase '{name}' creada correctamente para el {start_at}.")
 
+    @staticmethod
+    def create_recurring_class(gym_id: int, trainer_id: int, name: str, weekdays, start_time: str,
+                               duration_minutes: int, capacity: int, room: str | None = None,
+                               weeks: int = 4, current_user_id=None, current_user_roles=None):
+        """
+        Crea una plantilla semanal (p. ej. "lun/mie/vie 07:00") y genera sus clases para las próximas `weeks` semanas.
+        Las semanas siguientes las agrega la generación nocturna (ClassTemplate.generate()).
+        """
+        template_id = ClassTemplate.create(gym_id, trainer_id, name, weekdays, start_time, duration_minutes,
+                                           capacity, room, current_user_id=current_user_id,
+                                           current_user_roles=current_user_roles)
+        return ClassTemplate.generate(template_id, weeks)
+
+    @staticmethod
+    def validate_timetable(gym_id: int, classes, current_user_roles=None):
+        """
+        Valida la grilla de una semana (o cualquier lote) antes de importarla (solo ADMIN o TRAINER).
+        Devuelve los problemas de ClassSession.validate_timetable; lista vacía = se puede cargar.
+        """
+        roles = normalize_roles(current_user_roles)
+        if not roles & {"ADMIN", "TRAINER"}:
+            raise PermissionError("🚫 Solo ADMIN o TRAINER pueden validar la grilla de clases.")
+
+        problems = ClassSession.validate_timetable(gym_id, classes)
+        if problems:
+            print(f"⚠️ La grilla tiene {len(problems)} problema(s):")
+            for p in problems:
+                print(f"   #{p['index']}: {p['message']}")
+        else:
+            print(f"✅ Grilla válida: {len(classes)} clase(s) sin choques.")
+        return problems
+
     @staticmethod
     def list_classes_for_user(gym_id: int, role: str):
         """Lista clases disponibles según el rol."""
@@ -70,60 +105,91 @@ class ClassService:
     @staticmethod
     def book_class(class_id: int, member_id: int, current_user_roles=None):
         """Reservar clase (solo MEMBER)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "MEMBER" not in roles:
             raise PermissionError("🚫 Solo los miembros pueden reservar clases.")
 
-        conn = get_connection()
-        cur = conn.cursor()
+        # Mismo camino atómico que Booking.create (cupo + INSERT en una sola transacción)
+        status = Booking._book(class_id, member_id)
 
-        # Verificar capacidad disponible
-        cur.execute("SELECT capacity FROM class WHERE id = ?", (class_id,))
-        cls = cur.fetchone()
-        if not cls:
-            conn.close()
-            raise ValueError("⚠️ La clase no existe.")
-
-        cur.execute("""
-            SELECT COUNT(*) AS total FROM booking
-            WHERE class_id = ? AND status = 'BOOKED'
-        """, (class_id,))
-        booked = cur.fetchone()["total"]
+        print(f"✅ Reserva registrada (estado: {status}).")
 
-        if booked >= cls["capacity"]:
-            status = "WAITLIST"
-        else:
-            status = "BOOKED"
+    @staticmethod
+    def find_series(class_id: int, weeks: int = 4):
+        """
+        IDs de la "misma clase" en las próximas `weeks` semanas a partir de class_id
+        (mismo gimnasio, nombre, sala, día de la semana y horario), incluida la original.
+        """
+        if weeks <= 0:
+            raise ValueError("⚠️ La cantidad de semanas debe ser mayor a 0.")
 
+        conn = get_connection()
+        cur = conn.cursor()
         cur.execute("""
-            INSERT INTO booking (class_id, member_id, booked_at, status)
-            VALUES (?, ?, ?, ?)
-        """, (class_id, member_id, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), status))
-        conn.commit()
+            SELECT s.id
+            FROM class base
+            JOIN class s ON s.gym_id = base.gym_id
+                        AND s.start_at >= base.start_at
+                        AND s.start_at < strftime('%Y-%m-%d %H:%M', base.start_at, ?)   -- mismo formato que start_at
+            WHERE base.id = ?
+              AND s.name = base.name
+              AND COALESCE(s.room, '') = COALESCE(base.room, '')
+              AND strftime('%w %H:%M', s.start_at) = strftime('%w %H:%M', base.start_at)
+            ORDER BY s.start_at ASC
+        """, (f"+{weeks * 7} days", class_id))
+        ids = [row["id"] for row in cur.fetchall()]
         conn.close()
+        if not ids:
+            raise ValueError("⚠️ La clase no existe.")
+        return ids
 
-        print(f"✅ Reserva registrada (estado: {status}).")
+    @staticmethod
+    def book_series(member_id: int, class_ids=None, from_class_id: int | None = None, weeks: int = 4,
+                    current_user_roles=None):
+        """
+        Reserva una serie de clases en una sola transacción (solo MEMBER).
+        - class_ids: lista explícita de clases, o
+        - from_class_id + weeks: la misma clase durante las próximas `weeks` semanas.
+        Devuelve el reporte por clase de Booking.create_many.
+        """
+        roles = normalize_roles(current_user_roles)
+        if "MEMBER" not in roles:
+            raise PermissionError("🚫 Solo los miembros pueden reservar clases.")
+
+        if from_class_id is not None:
+            class_ids = ClassService.find_series(from_class_id, weeks)
+        if not class_ids:
+            raise ValueError("⚠️ No se indicaron clases para reservar.")
+
+        results = Booking.create_many(member_id, class_ids, current_user_id=member_id, current_user_roles=roles)
+        booked = sum(1 for r in results if r["result"] == "BOOKED")
+        waitlist = sum(1 for r in results if r["result"] == "WAITLIST")
+        print(f"✅ Serie reservada: {booked} BOOKED, {waitlist} WAITLIST, {len(results) - booked - waitlist} sin reservar.")
+        return results
 
     @staticmethod
     def cancel_booking(booking_id: int, member_id: int, current_user_roles=None):
         """Cancelar una reserva (solo MEMBER)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "MEMBER" not in roles:
             raise PermissionError("🚫 Solo los miembros pueden cancelar reservas.")
 
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE booking
-            SET status = 'CANCELLED'
-            WHERE id = ? AND member_id = ? AND status = 'BOOKED'
-        """, (booking_id, member_id))
-        if cur.rowcount == 0:
+        with transaction() as conn:
+            cur = conn.execute("""
+                UPDATE booking
+                SET status = 'CANCELLED'
+                WHERE id = ? AND member_id = ? AND status = 'BOOKED'
+                RETURNING class_id
+            """, (booking_id, member_id))
+            cancelled = cur.fetchall()
+            if cancelled:
+                # El lugar liberado pasa al primero de la lista de espera en la misma transacción
+                Booking._promote_waitlist(cancelled[0]["class_id"])
+
+        if not cancelled:
             print("⚠️ No se encontró una reserva activa para cancelar.")
         else:
             print("🟡 Reserva cancelada correctamente.")
-        conn.commit()
-        conn.close()
 
     # ---------- ATTENDANCE ----------
     @staticmethod
@@ -132,6 +198,12 @@ class ClassService:
         """Marcar asistencia (solo TRAINER o ADMIN)."""
         Attendance.mark_attendance(booking_id, present, current_user_id, current_user_roles)
 
+    @staticmethod
+    def mark_class_attendance(class_id: int, marks: dict,
+                              current_user_id=None, current_user_roles=None):
+        """Marcar la asistencia de toda una clase de una vez: marks = {booking_id: presente}."""
+        return Attendance.mark_many(class_id, marks, current_user_id, current_user_roles)
+
     @staticmethod
     def list_attendance_by_class(class_id: int):
         """Lista asistencia por clase."""
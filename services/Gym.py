@@ -1,4 +1,5 @@
 from models.Gym import Gym
+from utils.roles import normalize_roles
 
 class GymService:
     """
@@ -10,7 +11,7 @@ class GymService:
     # ---------- CREATE ----------
     @staticmethod
     def create_gym(name: str, address: str | None = None, current_user_roles=None):
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el administrador puede crear gimnasios.")
 
@@ -31,7 +32,7 @@ class GymService:
     @staticmethod
     def update_gym(gym_id: int, name: str | None = None,
                    address: str | None = None, current_user_roles=None):
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el administrador puede actualizar gimnasios.")
 
@@ -40,7 +41,7 @@ class GymService:
     # ---------- DELETE ----------
     @staticmethod
     def delete_gym(gym_id: int, current_user_roles=None):
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el administrador puede eliminar gimnasios.")
 
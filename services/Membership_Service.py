@@ -3,6 +3,7 @@ from models.Membership import Membership
 from models.Member_membership import MemberMembership
 from db.connection import get_connection
 import datetime
+from utils.roles import normalize_roles
 
 class MembershipService:
     """
@@ -17,7 +18,7 @@ class MembershipService:
     @staticmethod
     def admin_create_membership(gym_id: int, name: str, duration_months: int, price: float,
                                 current_user_roles=None):
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el administrador puede crear membresías.")
 
@@ -39,7 +40,7 @@ class MembershipService:
         - Si ya tiene una activa → la finaliza
         - Calcula fecha de fin en base a duración.
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "MEMBER" not in roles and "ADMIN" not in roles:
             raise PermissionError("🚫 Solo miembros o administradores pueden asignar membresías.")
 
@@ -83,7 +84,7 @@ class MembershipService:
     @staticmethod
     def list_all_memberships(current_user_roles=None):
         """Devuelve todas las membresías (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el administrador puede listar todas las membresías.")
 
@@ -109,7 +110,7 @@ class MembershipService:
     @staticmethod
     def admin_renew_membership(user_id: int, current_user_roles=None):
         """Renueva la membresía de un usuario activo."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el administrador puede renovar membresías.")
 
@@ -142,7 +143,7 @@ class MembershipService:
     @staticmethod
     def admin_end_membership(user_id: int, current_user_roles=None):
         """Finaliza la membresía activa de un usuario."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el administrador puede finalizar membresías.")
 
@@ -1,7 +1,10 @@
 # services/payment_service.py
 from models.Payment import Payment
 from db.connection import get_connection
+from db.pagination import fetch_page, keyset, page_size
+from db.records import tuple_cursor
 import datetime
+from utils.roles import normalize_roles
 
 class PaymentService:
     """
@@ -21,7 +24,7 @@ class PaymentService:
         - ADMIN puede crear cualquier pago
         - MEMBER solo puede crear pagos para su propia membresía activa
         """
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles and "MEMBER" not in roles:
             raise PermissionError("🚫 Solo administradores o miembros pueden registrar pagos.")
         
@@ -85,23 +88,33 @@ class PaymentService:
 
     # ---------- LISTAR PAGOS ----------
     @staticmethod
-    def list_all_payments(current_user_roles=None):
-        """Devuelve todos los pagos (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+    def list_all_payments(current_user_roles=None, as_tuples: bool = False,
+                          after: tuple | None = None, limit: int | None = None):
+        """
+        Devuelve los pagos de a una página (solo ADMIN), del más reciente al más viejo.
+        Con as_tuples=True las filas son tuplas (id, member_name, amount, method, purpose, status, paid_at).
+        after = next_cursor de la página anterior: (paid_at, id).
+        """
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el administrador puede ver todos los pagos.")
 
+        limit = page_size(limit)
+        after_sql, after_values = keyset(("p.paid_at", "p.id"), after, descending=True)
+
         conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
+        cur = tuple_cursor(conn) if as_tuples else conn.cursor()
+        cur.execute(f"""
             SELECT p.id, u.full_name AS member_name, p.amount, p.method,
                    p.purpose, p.status, p.paid_at
             FROM payment p
             JOIN member_membership mm ON mm.id = p.member_membership_id
             JOIN user u ON u.id = mm.user_id
-            ORDER BY p.paid_at DESC
-        """)
-        rows = cur.fetchall()
+            {"WHERE " + after_sql if after_sql else ""}
+            ORDER BY p.paid_at DESC, p.id DESC
+            LIMIT ?
+        """, (*after_values, limit + 1))
+        rows = fetch_page(cur, limit, lambda row: (row[6], row[0]))  # (paid_at, id)
         conn.close()
         return rows
 
@@ -141,7 +154,7 @@ class PaymentService:
     @staticmethod
     def update_status(payment_id: int, new_status: str, current_user_roles=None):
         """Cambia el estado de un pago (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el administrador puede modificar pagos.")
 
@@ -1,155 +1,354 @@
 # services/report_service.py
-from db.connection import get_connection
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from db import connection
+from db.connection import get_connection, transaction
+from db.records import tuple_cursor
+from db.rollups import refresh_rollups
+from services import report_writer
 import datetime
 import json
-import csv
 import os
+from utils.roles import normalize_roles
+
+VALID_KINDS = ("FINANCE", "ATTENDANCE", "OCCUPANCY", "SALES", "PERFORMANCE")
+PAYMENT_METHODS = ("CASH", "CARD", "TRANSFER", "OTHER")
+PAYMENT_STATUSES = ("APPROVED", "PENDING", "REJECTED")
+
+# Filtros que acepta cada tipo de reporte (todos se resuelven en el WHERE de la consulta)
+FILTERS_BY_KIND = {
+    "FINANCE": {"date_from", "date_to", "method", "status"},
+    "SALES": {"date_from", "date_to", "method", "status"},
+    "ATTENDANCE": {"date_from", "date_to", "class_id"},
+    "OCCUPANCY": {"date_from", "date_to", "class_id"},
+    "PERFORMANCE": {"date_from", "date_to"},
+}
+
+
+def _report_worker(db_path: str, report_dir: str, kind: str, gym_id: int, filters: dict,
+                   fmt: str, compress: bool, chunk_size: int):
+    """Corre en un proceso aparte: abre la base en solo lectura y escribe un único archivo."""
+    connection.configure_database(db_path, read_only=True)
+    return ReportService._write_report_file(kind, gym_id, filters, fmt, compress, chunk_size,
+                                            progress=None, report_dir=report_dir)
+
 
 class ReportService:
     """
     Servicio de generación de reportes administrativos.
     Tipos de reporte: FINANCE, ATTENDANCE, OCCUPANCY, SALES, PERFORMANCE
     - Solo ADMIN puede generarlos.
-    - Se guarda el archivo CSV y un registro en la tabla `report`.
+    - Se guarda el archivo (CSV o JSONL, opcionalmente gzip) y un registro en la tabla `report`.
+    - Las filas se escriben en streaming (fetchmany), sin cargar el resultado completo en memoria.
+    - Los reportes leen de los rollups (db/rollups.py), que antes se actualizan solo con las filas nuevas.
+    - Filtros opcionales (date_from/date_to, method, status, class_id) aplicados en el SQL.
     """
 
-    REPORT_DIR = r"C:\\Users\\Juani\\Documents\\POO_Ifts\\smartFit\\smartFit\\db\\reports"
+    # Rollups que necesita cada tipo de reporte
+    ROLLUPS_BY_KIND = {
+        "FINANCE": ["revenue_daily"],
+        "SALES": ["revenue_daily"],
+        "ATTENDANCE": ["attendance_daily"],
+        "OCCUPANCY": ["attendance_daily"],
+        "PERFORMANCE": ["trainer_plans"],
+    }
+
+    REPORT_DIR = os.environ.get("SMARTFIT_REPORT_DIR") or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "reports"
+    )
 
     # ---------- UTILITY ----------
     @staticmethod
-    def _ensure_report_dir():
-        if not os.path.exists(ReportService.REPORT_DIR):
-            os.makedirs(ReportService.REPORT_DIR, exist_ok=True)
+    def _ensure_report_dir(report_dir: str | None = None):
+        report_dir = report_dir or ReportService.REPORT_DIR
+        if not os.path.exists(report_dir):
+            os.makedirs(report_dir, exist_ok=True)
 
-    # ---------- GENERATE ----------
     @staticmethod
-    def generate_report(gym_id: int, requested_by: int, kind: str,
-                        params: dict | None = None, current_user_roles=None):
-        """Genera un reporte según el tipo seleccionado (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+    def _print_progress(written: int):
+        print(f"   ⏳ {written} filas escritas...", end="\r", flush=True)
+
+    @staticmethod
+    def _check_admin(current_user_roles):
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el administrador puede generar reportes.")
 
-        valid_kinds = {"FINANCE", "ATTENDANCE", "OCCUPANCY", "SALES", "PERFORMANCE"}
-        if kind.upper() not in valid_kinds:
-            raise ValueError(f"⚠️ Tipo de reporte inválido. Opciones: {', '.join(valid_kinds)}")
+    @staticmethod
+    def _check_kind(kind: str) -> str:
+        if kind.upper() not in VALID_KINDS:
+            raise ValueError(f"⚠️ Tipo de reporte inválido. Opciones: {', '.join(VALID_KINDS)}")
+        return kind.upper()
+
+    @staticmethod
+    def _normalize_filters(kind: str, date_from=None, date_to=None, method=None,
+                           status=None, class_id=None) -> dict:
+        """Valida los filtros y devuelve solo los indicados (fechas como 'YYYY-MM-DD')."""
+        filters = {}
+        for name, value in (("date_from", date_from), ("date_to", date_to)):
+            if value is None:
+                continue
+            if isinstance(value, datetime.datetime):
+                value = value.date()
+            if isinstance(value, str):
+                try:
+                    value = datetime.date.fromisoformat(value)
+                except ValueError:
+                    raise ValueError(f"⚠️ Fecha inválida en {name}: '{value}' (formato YYYY-MM-DD).")
+            filters[name] = value.isoformat()
+        if "date_from" in filters and "date_to" in filters and filters["date_from"] > filters["date_to"]:
+            raise ValueError("⚠️ date_from no puede ser posterior a date_to.")
 
-        ReportService._ensure_report_dir()
+        if method is not None:
+            if method.upper() not in PAYMENT_METHODS:
+                raise ValueError(f"⚠️ Método inválido. Opciones: {', '.join(PAYMENT_METHODS)}")
+            filters["method"] = method.upper()
+        if status is not None:
+            if status.upper() not in PAYMENT_STATUSES:
+                raise ValueError(f"⚠️ Estado inválido. Opciones: {', '.join(PAYMENT_STATUSES)}")
+            filters["status"] = status.upper()
+        if class_id is not None:
+            filters["class_id"] = int(class_id)
 
-        conn = get_connection()
-        cur = conn.cursor()
+        unsupported = set(filters) - FILTERS_BY_KIND[kind]
+        if unsupported:
+            raise ValueError(f"⚠️ El reporte {kind} no admite el/los filtro(s): {', '.join(sorted(unsupported))}")
+        return filters
+
+    @staticmethod
+    def _conditions(filters: dict, columns: dict) -> tuple[str, list]:
+        """
+        Arma ' AND ...' con los filtros presentes. `columns` indica sobre qué columna va cada uno;
+        date_to se compara contra el día siguiente para que sea inclusivo también en columnas DATETIME.
+        """
+        sql, args = "", []
+        for name, value in filters.items():
+            column = columns.get(name)
+            if column is None:
+                continue
+            if name == "date_from":
+                sql += f" AND {column} >= ?"
+            elif name == "date_to":
+                sql += f" AND {column} < date(?, '+1 day')"
+            else:
+                sql += f" AND {column} = ?"
+            args.append(value)
+        return sql, args
+
+    @staticmethod
+    def _build_query(kind: str, gym_id: int, filters: dict) -> tuple[str, list]:
+        """SQL y parámetros del reporte, con los filtros ya aplicados en el WHERE."""
+        cond = ReportService._conditions
 
         # ---------- FINANCE ----------
-        if kind.upper() == "FINANCE":
-            cur.execute("""
-                SELECT p.id, u.full_name AS member_name, p.amount, p.method,
-                       p.purpose, p.status, p.paid_at
-                FROM payment p
-                JOIN member_membership mm ON mm.id = p.member_membership_id
-                JOIN user u ON u.id = mm.user_id
-                WHERE u.gym_id = ?
-                ORDER BY p.paid_at DESC
-            """, (gym_id,))
-            rows = cur.fetchall()
-            filename = f"finance_report_{datetime.date.today()}.csv"
+        if kind == "FINANCE":
+            where, args = cond(filters, {"date_from": "r.day", "date_to": "r.day",
+                                         "method": "r.method", "status": "r.status"})
+            return f"""
+                SELECT r.day, m.name AS membership_name, r.method, r.purpose, r.status,
+                       r.payments, r.amount
+                FROM rollup_revenue_daily r
+                JOIN membership m ON m.id = r.membership_id
+                WHERE r.gym_id = ?{where}
+                ORDER BY r.day DESC, m.name, r.method, r.purpose, r.status
+            """, [gym_id, *args]
 
         # ---------- ATTENDANCE ----------
-        elif kind.upper() == "ATTENDANCE":
-            cur.execute("""
-                SELECT c.name AS class_name, u.full_name AS member_name,
-                       a.present, a.checked_at
-                FROM attendance a
-                JOIN booking b ON b.id = a.booking_id
-                JOIN class c ON c.id = b.class_id
-                JOIN user u ON u.id = b.member_id
-                WHERE c.gym_id = ?
-                ORDER BY a.checked_at DESC
-            """, (gym_id,))
-            rows = cur.fetchall()
-            filename = f"attendance_report_{datetime.date.today()}.csv"
+        if kind == "ATTENDANCE":
+            where, args = cond(filters, {"date_from": "r.day", "date_to": "r.day", "class_id": "r.class_id"})
+            return f"""
+                SELECT r.day, c.name AS class_name, r.present, r.absent,
+                       (r.present*100.0/(r.present + r.absent)) AS attendance_rate
+                FROM rollup_attendance_daily r
+                JOIN class c ON c.id = r.class_id
+                WHERE r.gym_id = ?{where}
+                ORDER BY r.day DESC, c.name
+            """, [gym_id, *args]
 
         # ---------- OCCUPANCY ----------
-        elif kind.upper() == "OCCUPANCY":
-            cur.execute("""
-                SELECT c.name AS class_name, COUNT(b.id) AS total_booked,
-                       c.capacity, (COUNT(b.id)*100.0/c.capacity) AS occupancy_rate
+        if kind == "OCCUPANCY":
+            where, args = cond(filters, {"date_from": "c.start_at", "date_to": "c.start_at", "class_id": "c.id"})
+            return f"""
+                SELECT c.name AS class_name, c.booked_count AS total_booked,
+                       c.capacity, (c.booked_count*100.0/c.capacity) AS occupancy_rate,
+                       c.waitlist_count AS total_waitlist,
+                       COALESCE(a.present, 0) AS total_present
                 FROM class c
-                LEFT JOIN booking b ON b.class_id = c.id AND b.status = 'BOOKED'
-                WHERE c.gym_id = ?
-                GROUP BY c.id
-            """, (gym_id,))
-            rows = cur.fetchall()
-            filename = f"occupancy_report_{datetime.date.today()}.csv"
+                LEFT JOIN (
+                    SELECT class_id, SUM(present) AS present
+                    FROM rollup_attendance_daily
+                    WHERE gym_id = ?
+                    GROUP BY class_id
+                ) a ON a.class_id = c.id
+                WHERE c.gym_id = ?{where}
+                ORDER BY c.start_at ASC
+            """, [gym_id, gym_id, *args]
 
         # ---------- SALES ----------
-        elif kind.upper() == "SALES":
-            cur.execute("""
-                SELECT m.name AS membership_name, COUNT(mm.id) AS total_sold,
-                       SUM(p.amount) AS total_revenue
+        if kind == "SALES":
+            sold_where, sold_args = cond(filters, {"date_from": "start_date", "date_to": "start_date"})
+            rev_where, rev_args = cond(filters, {"date_from": "day", "date_to": "day",
+                                                 "method": "method", "status": "status"})
+            return f"""
+                SELECT m.name AS membership_name, COALESCE(mm.sold, 0) AS total_sold,
+                       r.revenue AS total_revenue
                 FROM membership m
-                LEFT JOIN member_membership mm ON mm.membership_id = m.id
-                LEFT JOIN payment p ON p.member_membership_id = mm.id
+                LEFT JOIN (
+                    SELECT membership_id, COUNT(*) AS sold
+                    FROM member_membership
+                    WHERE 1 = 1{sold_where}
+                    GROUP BY membership_id
+                ) mm ON mm.membership_id = m.id
+                LEFT JOIN (
+                    SELECT membership_id, SUM(amount) AS revenue
+                    FROM rollup_revenue_daily
+                    WHERE gym_id = ?{rev_where}
+                    GROUP BY membership_id
+                ) r ON r.membership_id = m.id
                 WHERE m.gym_id = ?
-                GROUP BY m.id
-            """, (gym_id,))
-            rows = cur.fetchall()
-            filename = f"sales_report_{datetime.date.today()}.csv"
+            """, [*sold_args, gym_id, *rev_args, gym_id]
 
         # ---------- PERFORMANCE ----------
-        elif kind.upper() == "PERFORMANCE":
-            cur.execute("""
+        if "date_from" in filters or "date_to" in filters:
+            # El rollup por entrenador no guarda fechas: con rango se consulta training_plan acotado.
+            where, args = cond(filters, {"date_from": "tp.start_date", "date_to": "tp.start_date"})
+            return f"""
                 SELECT u.full_name AS trainer_name,
                        COUNT(tp.id) AS total_plans,
                        SUM(CASE WHEN tp.status='CLOSED' THEN 1 ELSE 0 END) AS completed
                 FROM training_plan tp
                 JOIN user u ON u.id = tp.trainer_id
-                WHERE u.gym_id = ?
+                WHERE u.gym_id = ?{where}
                 GROUP BY u.id
-            """, (gym_id,))
-            rows = cur.fetchall()
-            filename = f"performance_report_{datetime.date.today()}.csv"
-
-        # ---------- WRITE FILE ----------
-        ReportService._ensure_report_dir()
-        filepath = os.path.join(ReportService.REPORT_DIR, filename)
-
-        # sqlite3.Row.keys() devuelve una lista, y csv.DictWriter
-        # espera un view de keys que soporte operaciones de conjunto.
-        # Además, csv.DictWriter.writerows necesita mapeos tipo dict.
-        # Convertimos los rows (sqlite3.Row) a diccionarios para
-        # asegurar compatibilidad con csv.DictWriter.
-        if rows:
-            rows = [dict(r) for r in rows]
-            with open(filepath, "w", newline="", encoding="utf-8") as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=rows[0].keys())
-                writer.writeheader()
-                writer.writerows(rows)
-        else:
-            with open(filepath, "w", encoding="utf-8") as csvfile:
-                csvfile.write("No data found.\n")
+            """, [gym_id, *args]
+        return """
+            SELECT u.full_name AS trainer_name, r.total_plans, r.completed
+            FROM rollup_trainer_plans r
+            JOIN user u ON u.id = r.trainer_id
+            WHERE u.gym_id = ? AND r.total_plans > 0
+        """, [gym_id]
 
-        # ---------- SAVE RECORD ----------
-        cur.execute("""
+    @staticmethod
+    def _filename(kind: str, gym_id: int, filters: dict, ext: str) -> str:
+        rango = ""
+        if "date_from" in filters or "date_to" in filters:
+            rango = f"_{filters.get('date_from', 'inicio')}_{filters.get('date_to', 'hoy')}"
+        return f"{kind.lower()}_report_gym{gym_id}{rango}_{datetime.date.today()}{ext}"
+
+    @staticmethod
+    def _write_report_file(kind: str, gym_id: int, filters: dict, fmt: str, compress: bool,
+                           chunk_size: int, progress=None, report_dir: str | None = None):
+        """Ejecuta la consulta y la escribe en streaming. Devuelve (ruta, filas). No escribe en la base."""
+        report_dir = report_dir or ReportService.REPORT_DIR
+        ReportService._ensure_report_dir(report_dir)
+        filepath = os.path.join(report_dir, ReportService._filename(
+            kind, gym_id, filters, report_writer.file_extension(fmt, compress)))
+        sql, args = ReportService._build_query(kind, gym_id, filters)
+
+        conn = get_connection()
+        try:
+            cur = tuple_cursor(conn)  # el writer solo necesita valores en orden: tuplas planas
+            cur.execute(sql, args)
+            rows = report_writer.write_cursor(cur, filepath, fmt=fmt, compress=compress,
+                                              chunk_size=chunk_size, progress=progress)
+        finally:
+            conn.close()
+        return filepath, rows
+
+    @staticmethod
+    def _save_record(conn, gym_id: int, requested_by: int, kind: str, params: dict, filepath: str):
+        conn.execute("""
             INSERT INTO report (gym_id, requested_by, kind, params, generated_at, file_path)
             VALUES (?, ?, ?, ?, ?, ?)
         """, (
             gym_id,
             requested_by,
-            kind.upper(),
-            json.dumps(params or {}, ensure_ascii=False),
+            kind,
+            json.dumps(params, ensure_ascii=False),
             datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             filepath
         ))
-        conn.commit()
-        conn.close()
 
-        print(f"📊 Reporte '{kind}' generado y guardado en: {filepath}")
+    # ---------- GENERATE ----------
+    @staticmethod
+    def generate_report(gym_id: int, requested_by: int, kind: str,
+                        params: dict | None = None, current_user_roles=None,
+                        fmt: str = "CSV", compress: bool = False, progress=None,
+                        chunk_size: int = report_writer.CHUNK_SIZE,
+                        date_from=None, date_to=None, method: str | None = None,
+                        status: str | None = None, class_id: int | None = None):
+        """
+        Genera un reporte según el tipo seleccionado (solo ADMIN).
+        - fmt: CSV o JSONL; compress=True escribe .gz.
+        - progress: callback progress(filas_escritas) por cada bloque (por defecto imprime el avance).
+        - date_from/date_to (inclusive), method, status, class_id: filtros según el tipo (FILTERS_BY_KIND).
+        Devuelve la ruta del archivo generado.
+        """
+        ReportService._check_admin(current_user_roles)
+        kind = ReportService._check_kind(kind)
+        filters = ReportService._normalize_filters(kind, date_from, date_to, method, status, class_id)
+        report_writer.file_extension(fmt, compress)  # valida el formato antes de tocar la base
+
+        refresh_rollups(ReportService.ROLLUPS_BY_KIND[kind])
+        filepath, rows_written = ReportService._write_report_file(
+            kind, gym_id, filters, fmt, compress, chunk_size,
+            progress=progress or ReportService._print_progress,
+        )
+
+        # ---------- SAVE RECORD ----------
+        with transaction() as conn:
+            ReportService._save_record(conn, gym_id, requested_by, kind, {**(params or {}), **filters}, filepath)
+
+        print(f"📊 Reporte '{kind}' generado ({rows_written} filas) y guardado en: {filepath}")
+        return filepath
+
+    @staticmethod
+    def generate_many(gym_ids, kinds, requested_by: int, current_user_roles=None,
+                      max_workers: int | None = None, fmt: str = "CSV", compress: bool = False,
+                      chunk_size: int = report_writer.CHUNK_SIZE, **filters) -> list[dict]:
+        """
+        Genera varios reportes a la vez (cada tipo de `kinds` para cada gimnasio de `gym_ids`).
+        - Los rollups se refrescan una sola vez acá; después cada archivo lo escribe un proceso
+          del pool con su propia conexión de solo lectura.
+        - Los registros en `report` se guardan al final, en una única transacción.
+        Con la base en memoria (no visible desde otros procesos) se generan en este mismo proceso.
+        Devuelve [{"gym_id", "kind", "file_path", "rows"}].
+        """
+        ReportService._check_admin(current_user_roles)
+        kinds = [ReportService._check_kind(k) for k in kinds]
+        jobs = []
+        for kind in kinds:
+            kind_filters = ReportService._normalize_filters(kind, **filters)
+            jobs += [(kind, gym_id, kind_filters) for gym_id in gym_ids]
+        report_writer.file_extension(fmt, compress)
+
+        refresh_rollups(sorted({name for kind in kinds for name in ReportService.ROLLUPS_BY_KIND[kind]}))
+
+        if connection.is_memory() or len(jobs) == 1:
+            outputs = [ReportService._write_report_file(kind, gym_id, f, fmt, compress, chunk_size)
+                       for kind, gym_id, f in jobs]
+        else:
+            # spawn: los procesos no heredan conexiones SQLite abiertas del padre
+            with ProcessPoolExecutor(max_workers=max_workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(_report_worker, connection.DB_PATH, ReportService.REPORT_DIR,
+                                       kind, gym_id, f, fmt, compress, chunk_size)
+                           for kind, gym_id, f in jobs]
+                outputs = [future.result() for future in futures]
+
+        results = []
+        with transaction() as conn:
+            for (kind, gym_id, f), (filepath, rows) in zip(jobs, outputs):
+                ReportService._save_record(conn, gym_id, requested_by, kind, f, filepath)
+                results.append({"gym_id": gym_id, "kind": kind, "file_path": filepath, "rows": rows})
+        print(f"📊 {len(results)} reporte(s) generados en: {ReportService.REPORT_DIR}")
+        return results
 
     # ---------- LIST ----------
     @staticmethod
     def list_reports(gym_id: int, current_user_roles=None):
         """Lista los reportes generados (solo ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el administrador puede ver reportes.")
 
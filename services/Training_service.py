@@ -3,6 +3,7 @@ from models.Training_plan import TrainingPlan
 from models.Routine import Routine
 from db.connection import get_connection
 import datetime
+from utils.roles import normalize_roles
 
 class TrainingService:
     """
@@ -19,7 +20,7 @@ class TrainingService:
     def create_plan(trainer_id: int, member_id: int, goal: str,
                     start_date=None, end_date=None, current_user_roles=None):
         """Crea un nuevo plan (solo TRAINER)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "TRAINER" not in roles:
             raise PermissionError("🚫 Solo un entrenador puede crear planes.")
 
@@ -78,7 +79,7 @@ class TrainingService:
     @staticmethod
     def close_plan(plan_id: int, current_user_roles=None):
         """Cierra un plan (solo TRAINER o ADMIN)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "TRAINER" not in roles and "ADMIN" not in roles:
             raise PermissionError("🚫 Solo entrenadores o administradores pueden cerrar planes.")
 
@@ -124,7 +125,7 @@ class TrainingService:
     def update_routine(routine_id: int, name=None, weekday=None, notes=None,
                        current_user_roles=None):
         """Actualiza una rutina (solo TRAINER)."""
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "TRAINER" not in roles:
             raise PermissionError("🚫 Solo un entrenador puede modificar rutinas.")
 
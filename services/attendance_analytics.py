@@ -0,0 +1,295 @@
+# services/attendance_analytics.py
+import os
+import threading
+import time
+from datetime import date, datetime
+
+from db.connection import get_connection
+from models.Class_session import DATETIME_FORMAT, MAX_CLASS_HOURS
+from models.no_show import ATTENDANCE_TAKEN_SQL
+from utils.policy import requires
+
+# Cada cuánto se revisa el registro de cambios al consultar (el refresco solo recalcula lo que cambió).
+ANALYTICS_TTL = float(os.environ.get("SMARTFIT_ANALYTICS_TTL", 60))
+# Cuántos días de analytics_change se conservan (prune_changes). Una cache más vieja se recalcula entera.
+CHANGE_LOG_DAYS = 7
+# Semana 0 = la que empieza el lunes 2000-01-03; las rachas cuentan semanas consecutivas con asistencia.
+_WEEK_ZERO = date(2000, 1, 3)
+
+# Reservas BOOKED de clases ya terminadas con asistencia tomada (mismo criterio que NoShow):
+# presente = asistió, si no es un faltazo (no-show).
+# La racha sale de "huecos e islas": semana - ROW_NUMBER() es constante dentro de cada tramo consecutivo.
+MEMBER_STATS_SQL = f"""
+    WITH past AS (
+        SELECT b.member_id, c.start_at, COALESCE(a.present, 0) != 0 AS present
+        FROM class c
+        JOIN booking b ON b.class_id = c.id AND b.status = 'BOOKED'
+        LEFT JOIN attendance a ON a.booking_id = b.id
+        WHERE c.gym_id = :gym_id AND c.end_at <= :cutoff AND {ATTENDANCE_TAKEN_SQL} {{member_filter}}
+    ),
+    totals AS (
+        SELECT member_id, COUNT(*) AS booked, SUM(present) AS attended
+        FROM past
+        GROUP BY member_id
+    ),
+    weeks AS (
+        SELECT DISTINCT member_id,
+               CAST((julianday(date(start_at)) - julianday('2000-01-03')) / 7 AS INTEGER) AS week
+        FROM past
+        WHERE present
+    ),
+    streaks AS (
+        SELECT member_id, COUNT(*) AS length, MAX(week) AS last_week
+        FROM (
+            SELECT member_id, week,
+                   week - ROW_NUMBER() OVER (PARTITION BY member_id ORDER BY week) AS island
+            FROM weeks
+        )
+        GROUP BY member_id, island
+    )
+    SELECT t.member_id, u.full_name, t.booked, t.attended,
+           COALESCE(MAX(s.length), 0) AS longest_streak,
+           -- La racha sigue viva si la última semana con asistencia es esta o la anterior
+           COALESCE(MAX(CASE WHEN s.last_week >= :week - 1 THEN s.length END), 0) AS current_streak
+    FROM totals t
+    JOIN user u ON u.id = t.member_id
+    LEFT JOIN streaks s ON s.member_id = t.member_id
+    GROUP BY t.member_id
+"""
+
+# Solo clases con asistencia tomada: si no, la relación asistencia / reservas sería 0 sin serlo.
+CLASS_STATS_SQL = f"""
+    SELECT c.id AS class_id, c.name, c.start_at, c.trainer_id,
+           COUNT(b.id) AS booked, COALESCE(SUM(COALESCE(a.present, 0) != 0), 0) AS attended
+    FROM class c
+    LEFT JOIN booking b ON b.class_id = c.id AND b.status = 'BOOKED'
+    LEFT JOIN attendance a ON a.booking_id = b.id
+    WHERE c.gym_id = :gym_id AND c.end_at <= :cutoff AND {ATTENDANCE_TAKEN_SQL} {{class_filter}}
+    GROUP BY c.id
+"""
+
+
+class _GymSnapshot:
+    __slots__ = ("members", "classes", "last_change", "cutoff", "checked_at")
+
+    def __init__(self):
+        self.members = {}      # member_id -> stats
+        self.classes = {}      # class_id -> stats
+        self.last_change = 0   # último analytics_change.id aplicado
+        self.cutoff = None     # las clases terminadas hasta acá ya están contadas
+        self.checked_at = 0.0
+
+    def copy(self) -> "_GymSnapshot":
+        # Copia para refrescar sin tocar la foto que otros hilos pueden estar leyendo
+        snap = _GymSnapshot()
+        snap.members, snap.classes = dict(self.members), dict(self.classes)
+        snap.last_change, snap.cutoff = self.last_change, self.cutoff
+        return snap
+
+
+_snapshots = {}   # gym_id -> _GymSnapshot
+_lock = threading.Lock()
+_counters = {"full_refreshes": 0, "incremental_refreshes": 0, "members_recomputed": 0, "classes_recomputed": 0}
+
+
+def _member_stats(row) -> dict:
+    return {
+        "member_id": row["member_id"],
+        "full_name": row["full_name"],
+        "booked": row["booked"],
+        "attended": row["attended"],
+        "no_shows": row["booked"] - row["attended"],
+        "no_show_rate": round((row["booked"] - row["attended"]) / row["booked"], 3),
+        "current_streak": row["current_streak"],
+        "longest_streak": row["longest_streak"],
+    }
+
+
+def _class_stats(row) -> dict:
+    return {
+        "class_id": row["class_id"],
+        "name": row["name"],
+        "start_at": row["start_at"],
+        "trainer_id": row["trainer_id"],
+        "booked": row["booked"],
+        "attended": row["attended"],
+        "attendance_ratio": round(row["attended"] / row["booked"], 3) if row["booked"] else None,
+    }
+
+
+def _id_filter(column: str, ids) -> tuple[str, dict]:
+    if ids is None:
+        return "", {}
+    return f"AND {column} IN (SELECT value FROM json_each(:ids))", {"ids": "[" + ",".join(map(str, ids)) + "]"}
+
+
+def _week(cutoff: str) -> int:
+    return (datetime.fromisoformat(cutoff).date() - _WEEK_ZERO).days // 7
+
+
+def _recompute(conn, gym_id: int, snap: _GymSnapshot, cutoff: str, member_ids=None, class_ids=None):
+    """Recalcula los socios / clases indicados (todos si es None) y reemplaza sus entradas en la foto."""
+    week = _week(cutoff)
+    member_filter, params = _id_filter("b.member_id", member_ids)
+    rows = conn.execute(MEMBER_STATS_SQL.format(member_filter=member_filter),
+                        {"gym_id": gym_id, "cutoff": cutoff, "week": week, **params}).fetchall()
+    for member_id in (member_ids if member_ids is not None else list(snap.members)):
+        snap.members.pop(member_id, None)
+    snap.members.update((row["member_id"], _member_stats(row)) for row in rows)
+
+    class_filter, params = _id_filter("c.id", class_ids)
+    rows = conn.execute(CLASS_STATS_SQL.format(class_filter=class_filter),
+                        {"gym_id": gym_id, "cutoff": cutoff, **params}).fetchall()
+    for class_id in (class_ids if class_ids is not None else list(snap.classes)):
+        snap.classes.pop(class_id, None)
+    snap.classes.update((row["class_id"], _class_stats(row)) for row in rows)
+
+    _counters["members_recomputed"] += len(member_ids) if member_ids is not None else len(snap.members)
+    _counters["classes_recomputed"] += len(class_ids) if class_ids is not None else len(snap.classes)
+
+
+def refresh(gym_id: int, full: bool = False) -> _GymSnapshot:
+    """
+    Pone al día la foto del gimnasio. La primera vez (o con full=True) calcula todo; después solo
+    los socios y clases del registro de cambios más las clases que terminaron desde el último refresco.
+    """
+    cutoff = datetime.now().strftime(DATETIME_FORMAT)
+    with _lock:
+        snap = _snapshots.get(gym_id)
+        conn = get_connection()
+        try:
+            # La marca se toma antes de leer: un cambio que llegue durante el cálculo se reprocesa la próxima vez
+            last_change, first_change = conn.execute(
+                "SELECT COALESCE(MAX(id), 0), MIN(id) FROM analytics_change").fetchone()
+            if snap is not None and not full:
+                # Cambios podados que esta foto no vio, o semana nueva (las rachas actuales pueden cortarse)
+                full = (first_change is not None and first_change > snap.last_change + 1) \
+                    or _week(cutoff) != _week(snap.cutoff)
+            if snap is None or full:
+                snap = _GymSnapshot()
+                _recompute(conn, gym_id, snap, cutoff)
+                _counters["full_refreshes"] += 1
+            else:
+                snap = snap.copy()
+                members, classes = set(), set()
+                for row in conn.execute("""
+                    SELECT member_id, class_id FROM analytics_change WHERE id > ? AND id <= ?
+                """, (snap.last_change, last_change)):
+                    members.add(row["member_id"])
+                    classes.add(row["class_id"])
+                # Clases que terminaron entre el refresco anterior y ahora (rango de idx_class_gym_start)
+                for row in conn.execute(f"""
+                    SELECT c.id AS class_id, b.member_id
+                    FROM class c
+                    LEFT JOIN booking b ON b.class_id = c.id AND b.status = 'BOOKED'
+                    WHERE c.gym_id = ? AND c.start_at >= datetime(?, '-{MAX_CLASS_HOURS} hours')
+                      AND c.end_at > ? AND c.end_at <= ?
+                """, (gym_id, snap.cutoff, snap.cutoff, cutoff)):
+                    classes.add(row["class_id"])
+                    if row["member_id"] is not None:
+                        members.add(row["member_id"])
+                if members or classes:
+                    counted = {class_id for class_id in classes if class_id in snap.classes}
+                    _recompute(conn, gym_id, snap, cutoff, sorted(members), sorted(classes))
+                    # La primera (o la última) asistencia de una clase la suma (o la saca) de las
+                    # estadísticas para todos sus socios, no solo para el que tiene el cambio
+                    flipped = [class_id for class_id in classes if (class_id in snap.classes) != (class_id in counted)]
+                    if flipped:
+                        others = {row["member_id"] for row in conn.execute("""
+                            SELECT DISTINCT member_id FROM booking
+                            WHERE status = 'BOOKED' AND class_id IN (SELECT value FROM json_each(?))
+                        """, ("[" + ",".join(map(str, flipped)) + "]",))} - members
+                        if others:
+                            _recompute(conn, gym_id, snap, cutoff, sorted(others), [])
+                _counters["incremental_refreshes"] += 1
+        finally:
+            conn.close()
+        snap.last_change = last_change
+        snap.cutoff = cutoff
+        snap.checked_at = time.monotonic()
+        _snapshots[gym_id] = snap
+        return snap
+
+
+def _snapshot(gym_id: int) -> _GymSnapshot:
+    snap = _snapshots.get(gym_id)
+    if snap is None or time.monotonic() - snap.checked_at >= ANALYTICS_TTL:
+        snap = refresh(gym_id)
+    return snap
+
+
+def prune_changes(days: int = CHANGE_LOG_DAYS) -> int:
+    """
+    Borra del registro los cambios de más de `days` días. Devuelve cuántos se borraron.
+    id crece en el mismo orden que changed_at: se recorre por id hasta el primer cambio reciente
+    (solo se leen las filas que se van a borrar) y se borra por rango de clave primaria.
+    """
+    with get_connection() as conn:
+        row = conn.execute("""
+            SELECT id FROM analytics_change WHERE changed_at >= datetime('now', ?) ORDER BY id LIMIT 1
+        """, (f"-{days} days",)).fetchone()
+        if row is None:
+            row = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM analytics_change").fetchone()
+        return conn.execute("DELETE FROM analytics_change WHERE id < ?", (row[0],)).rowcount
+
+
+def clear_analytics_cache():
+    with _lock:
+        _snapshots.clear()
+        for key in _counters:
+            _counters[key] = 0
+
+
+def analytics_stats() -> dict:
+    with _lock:
+        return {**_counters, "gyms": len(_snapshots)}
+
+
+class AttendanceAnalytics:
+    """
+    Analítica de asistencia por gimnasio (ADMIN / TRAINER), sobre una foto en memoria
+    que se refresca de forma incremental (ver refresh()).
+    - member_stats: reservas, asistencias, faltazos, tasa de faltazos y rachas semanales por socio.
+    - top_no_shows: los socios que más faltan.
+    - streaks: socios con una racha actual de al menos N semanas.
+    - class_stats: relación asistencia / reservas por clase, comparada con el promedio de su serie.
+    """
+
+    @staticmethod
+    @requires("analytics", "view")
+    def member_stats(gym_id: int, current_user_id=None, current_user_roles=None) -> list[dict]:
+        snap = _snapshot(gym_id)
+        return sorted((dict(m) for m in snap.members.values()), key=lambda m: m["member_id"])
+
+    @staticmethod
+    @requires("analytics", "view")
+    def top_no_shows(gym_id: int, limit: int = 10, min_booked: int = 3,
+                     current_user_id=None, current_user_roles=None) -> list[dict]:
+        """Socios con más faltazos (tasa, y a igual tasa, cantidad). Ignora a quien reservó menos de min_booked."""
+        snap = _snapshot(gym_id)
+        ranked = [m for m in snap.members.values() if m["booked"] >= min_booked and m["no_shows"]]
+        ranked.sort(key=lambda m: (-m["no_show_rate"], -m["no_shows"], m["member_id"]))
+        return [dict(m) for m in ranked[:limit]]
+
+    @staticmethod
+    @requires("analytics", "view")
+    def streaks(gym_id: int, min_weeks: int = 10, current_user_id=None, current_user_roles=None) -> list[dict]:
+        """Socios con una racha actual de al menos `min_weeks` semanas seguidas con asistencia."""
+        snap = _snapshot(gym_id)
+        found = [dict(m) for m in snap.members.values() if m["current_streak"] >= min_weeks]
+        return sorted(found, key=lambda m: (-m["current_streak"], m["member_id"]))
+
+    @staticmethod
+    @requires("analytics", "view")
+    def class_stats(gym_id: int, current_user_id=None, current_user_roles=None) -> list[dict]:
+        """Clases terminadas con su relación de asistencia y el promedio de las clases del mismo nombre."""
+        snap = _snapshot(gym_id)
+        series = {}
+        for c in snap.classes.values():
+            if c["attendance_ratio"] is not None:
+                series.setdefault(c["name"], []).append(c["attendance_ratio"])
+        result = []
+        for c in sorted(snap.classes.values(), key=lambda c: (c["start_at"], c["class_id"]), reverse=True):
+            ratios = series.get(c["name"])
+            result.append({**c, "series_ratio": round(sum(ratios) / len(ratios), 3) if ratios else None})
+        return result
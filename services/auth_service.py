@@ -1,4 +1,8 @@
 from db.connection import get_connection
+from services import passwords
+from utils.rate_limit import get_login_limiter
+from utils.roles import normalize_roles
+from utils.session_store import get_session_store, invalidate_user
 
 class AuthService:
 
@@ -16,11 +20,11 @@ class AuthService:
         """, (gym_id, full_name.strip(), dni.strip(), phone.strip()))
         user_id = cur.lastrowid
 
-        # Guardar credenciales
+        # Guardar credenciales (hash con sal, nunca el texto plano)
         cur.execute("""
             INSERT INTO user_auth (user_id, password)
             VALUES (?, ?)
-        """, (user_id, password.strip()))
+        """, (user_id, passwords.hash_password(password.strip())))
 
         # Asignar rol
         cur.execute("""
@@ -34,39 +38,88 @@ class AuthService:
 
     # ---------------- LOGIN ----------------
     @staticmethod
-    def login(dni: str, password: str):
-        """Login con DNI y contraseña."""
+    def login(dni: str, password: str, source: str = "local"):
+        """
+        Login con DNI y contraseña.
+        0) Limitador en memoria por DNI y por origen: si está bloqueado, se rechaza sin tocar la base.
+        1) Busca el hash por DNI (índice único), 2) lo verifica, 3) recién ahí trae los roles.
+        Si la contraseña estaba en texto plano (o con otro costo) se re-hashea en este login.
+        """
+        limiter = get_login_limiter()
+        limiter.check(dni, source)
+
+        password = password.strip()
         conn = get_connection()
-        cur = conn.cursor()
+        try:
+            row = conn.execute("""
+                SELECT u.id, u.full_name, u.gym_id, a.password
+                FROM user u
+                JOIN user_auth a ON a.user_id = u.id
+                WHERE u.dni = ?
+            """, (dni.strip(),)).fetchone()
 
-        cur.execute("""
-            SELECT u.id, u.full_name, u.gym_id,
-                   GROUP_CONCAT(r.code) AS roles
-            FROM user_auth a
-            JOIN user u ON a.user_id = u.id
-            JOIN user_role ur ON ur.user_id = u.id
-            JOIN role r ON ur.role_id = r.id
-            WHERE u.dni = ? AND a.password = ?
-            GROUP BY u.id
-        """, (dni.strip(), password.strip()))
-
-        row = cur.fetchone()
-        conn.close()
+            if not row:
+                passwords.dummy_verify(password)  # mismo costo que un DNI existente
+                limiter.record_failure(dni, source)
+                raise Exception("❌ DNI o contraseña incorrectos.")
+            if not passwords.verify_password(password, row["password"]):
+                limiter.record_failure(dni, source)
+                raise Exception("❌ DNI o contraseña incorrectos.")
+
+            if passwords.needs_rehash(row["password"]):
+                # Condicional sobre el valor leído: si otro login ya lo actualizó, no se pisa
+                conn.execute("""
+                    UPDATE user_auth SET password = ?
+                    WHERE user_id = ? AND password = ?
+                """, (passwords.hash_password(password), row["id"], row["password"]))
+                conn.commit()
+
+            roles = [r["code"] for r in conn.execute("""
+                SELECT r.code
+                FROM user_role ur
+                JOIN role r ON r.id = ur.role_id
+                WHERE ur.user_id = ?
+            """, (row["id"],)).fetchall()]
+        finally:
+            conn.close()
 
-        if not row:
+        if not roles:
+            limiter.record_failure(dni, source)
             raise Exception("❌ DNI o contraseña incorrectos.")
+        limiter.record_success(dni, source)
 
         return {
             "user_id": row["id"],
             "full_name": row["full_name"],
             "gym_id": row["gym_id"],
-            "roles": row["roles"].split(",") if row["roles"] else []
+            "roles": roles
         }
 
+    # ---------------- SESSIONS ----------------
+    @staticmethod
+    def start_session(dni: str, password: str, source: str = "local"):
+        """
+        Login + token de sesión opaco. Devuelve el mismo dict que login() con "token" agregado
+        y "roles" como frozenset (chequeos de permiso en O(1)).
+        """
+        data = AuthService.login(dni, password, source)
+        data["token"] = get_session_store().issue(data["user_id"])
+        data["roles"] = normalize_roles(data["roles"])
+        return data
+
+    @staticmethod
+    def resolve_session(token: str):
+        """Token -> SessionUser (user_id, gym_id, full_name, roles). Lanza PermissionError si ya no es válido."""
+        return get_session_store().resolve(token)
+
+    @staticmethod
+    def end_session(token: str):
+        get_session_store().revoke(token)
+
     # ---------------- DEACTIVATE ----------------
     @staticmethod
     def deactivate_user(user_id: int, current_user_roles):
-        roles = [r.upper() for r in (current_user_roles or [])]
+        roles = normalize_roles(current_user_roles)
         if "ADMIN" not in roles:
             raise PermissionError("🚫 Solo el admin puede desactivar usuarios.")
 
@@ -75,3 +128,4 @@ class AuthService:
         cur.execute("UPDATE user SET status = 'INACTIVE' WHERE id = ?", (user_id,))
         conn.commit()
         conn.close()
+        invalidate_user(user_id)
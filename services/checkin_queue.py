@@ -0,0 +1,207 @@
+# services/checkin_queue.py
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from models.attendance import Attendance
+from utils.policy import authorize
+
+# Fichadas en espera como máximo; con la cola llena submit() espera hasta SUBMIT_TIMEOUT (back-pressure).
+MAX_PENDING = int(os.environ.get("SMARTFIT_CHECKIN_QUEUE_SIZE", 10000))
+SUBMIT_TIMEOUT = float(os.environ.get("SMARTFIT_CHECKIN_SUBMIT_TIMEOUT", 1.0))
+# El escritor agrupa hasta BATCH_SIZE fichadas o lo que llegue en FLUSH_MS, lo que pase primero.
+BATCH_SIZE = int(os.environ.get("SMARTFIT_CHECKIN_BATCH", 500))
+FLUSH_MS = int(os.environ.get("SMARTFIT_CHECKIN_FLUSH_MS", 200))
+# Base ocupada o pool agotado: el lote entero se reintenta esperando RETRY_BACKOFF_MS, el doble, ...
+# (hasta 1 s entre intentos) durante RETRY_SECONDS como máximo.
+RETRY_BACKOFF_MS = int(os.environ.get("SMARTFIT_CHECKIN_RETRY_BACKOFF_MS", 50))
+RETRY_SECONDS = float(os.environ.get("SMARTFIT_CHECKIN_RETRY_SECONDS", 30))
+
+# Errores que no son de ninguna fichada en particular ("database is locked", get_connection() sin lugar)
+_TRANSIENT_ERRORS = (sqlite3.OperationalError, TimeoutError)
+
+
+class CheckInQueue:
+    """
+    Cola acotada de fichadas (molinete / QR) con un único hilo escritor.
+    - submit(): valida el permiso, sella la hora y encola. Es lo único que espera quien ficha.
+    - El escritor junta las fichadas en lotes y cada lote es UNA transacción
+      (Attendance._ingest_checkins): una ráfaga de 40 socios entrando es un solo commit.
+    - flush() espera a que se escriba todo lo encolado; shutdown() además detiene el hilo.
+    Si la base está ocupada (o el pool agotado) el lote entero se reintenta con espera creciente
+    (stats()["busy_retries"]). Si falla por otra cosa (p. ej. IntegrityError) se parte en mitades
+    hasta aislar las fichadas con error: solo esas se cuentan en stats()["failed"] y el resto se
+    escribe igual.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING, batch_size: int = BATCH_SIZE,
+                 flush_ms: int = FLUSH_MS, submit_timeout: float = SUBMIT_TIMEOUT,
+                 retry_backoff_ms: int = RETRY_BACKOFF_MS, retry_seconds: float = RETRY_SECONDS):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_ms / 1000
+        self.submit_timeout = submit_timeout
+        self.retry_backoff = retry_backoff_ms / 1000
+        self.retry_seconds = retry_seconds
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._unwritten = 0   # encoladas y todavía no escritas (incluye el lote en curso)
+        self._counters = {"submitted": 0, "rejected": 0, "written": 0, "recorded": 0,
+                          "unmatched": 0, "batches": 0, "failed": 0, "retried": 0, "busy_retries": 0,
+                          "max_batch": 0}
+        self.last_error = None
+
+    # ---------- PRODUCTOR ----------
+    def submit(self, member_id: int, scanned_at=None, current_user_roles=None):
+        """
+        Encola una fichada (solo ADMIN / dispositivo de acceso). scanned_at por defecto es "ahora":
+        se toma al encolar, así la demora del escritor no corre la hora de ingreso.
+        Lanza ValueError si el socio o la hora son inválidos (antes de encolar, así el error le llega
+        a quien ficha) y TimeoutError si la cola sigue llena después de submit_timeout segundos.
+        """
+        authorize("attendance", "ingest", current_user_roles)
+        event = (self._member_id(member_id), self._scanned_at(scanned_at))
+        self._ensure_writer()
+        with self._lock:
+            self._unwritten += 1
+        try:
+            self._queue.put(event, timeout=self.submit_timeout)
+        except queue.Full:
+            with self._idle:
+                self._unwritten -= 1
+                self._counters["rejected"] += 1
+                self._idle.notify_all()
+            raise TimeoutError("⚠️ Hay demasiadas fichadas en espera. Reintentá en unos segundos.") from None
+        with self._lock:
+            self._counters["submitted"] += 1
+
+    @staticmethod
+    def _member_id(member_id) -> int:
+        try:
+            return int(member_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"⚠️ ID de socio inválido: {member_id!r}.") from None
+
+    @staticmethod
+    def _scanned_at(scanned_at) -> datetime:
+        if scanned_at is None:
+            return datetime.now()
+        if isinstance(scanned_at, datetime):
+            return scanned_at
+        try:
+            return datetime.fromisoformat(str(scanned_at).strip())
+        except ValueError:
+            raise ValueError(f"⚠️ Hora de fichada inválida: {scanned_at!r}. Usá YYYY-MM-DD HH:MM.") from None
+
+    # ---------- ESCRITOR ----------
+    def _ensure_writer(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="checkin-writer", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=self.flush_seconds)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 and not self._stopping.is_set():
+                break
+            try:
+                # Al apagar no se espera: se vacía lo que quede de una vez
+                batch.append(self._queue.get_nowait() if self._stopping.is_set() else
+                             self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if self._stopping.is_set():
+                    return
+                continue
+            recorded, unmatched, failed, error = self._write(batch)
+            with self._idle:
+                self._unwritten -= len(batch)
+                self._counters["batches"] += 1
+                self._counters["max_batch"] = max(self._counters["max_batch"], len(batch))
+                self._counters["written"] += len(batch) - failed
+                self._counters["recorded"] += recorded
+                self._counters["unmatched"] += unmatched
+                self._counters["failed"] += failed
+                if error is not None:
+                    self.last_error = error
+                self._idle.notify_all()
+
+    def _write(self, batch) -> tuple:
+        """
+        Escribe un lote. Si falla por una fichada, lo reintenta partido en mitades (cada una su
+        transacción), así una fichada con error no se lleva puestas a las demás.
+        Devuelve (asistencias nuevas, sin reserva, fichadas fallidas, último error).
+        """
+        try:
+            result = self._ingest(batch)
+            return result["recorded"], len(result["unmatched"]), 0, None
+        except _TRANSIENT_ERRORS as e:   # partir el lote no ayuda: la base sigue ocupada para todos
+            return 0, 0, len(batch), e
+        except Exception as e:   # un lote con error no frena al escritor
+            if len(batch) == 1:
+                return 0, 0, 1, e
+            with self._lock:
+                self._counters["retried"] += 1
+            mid = len(batch) // 2
+            left, right = self._write(batch[:mid]), self._write(batch[mid:])
+            return (left[0] + right[0], left[1] + right[1], left[2] + right[2], right[3] or left[3])
+
+    def _ingest(self, batch) -> dict:
+        """
+        Attendance._ingest_checkins reintentando ante errores transitorios. Cada intento es una
+        transacción completa (o nada), así que repetir el lote no duplica asistencias.
+        """
+        delay, deadline = self.retry_backoff, time.monotonic() + self.retry_seconds
+        while True:
+            try:
+                return Attendance._ingest_checkins(batch)
+            except _TRANSIENT_ERRORS:
+                if time.monotonic() + delay > deadline:
+                    raise
+                with self._lock:
+                    self._counters["busy_retries"] += 1
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+
+    # ---------- CIERRE ----------
+    def flush(self, timeout: float | None = None) -> bool:
+        """Espera a que se escriban todas las fichadas encoladas. Devuelve False si venció el timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unwritten == 0, timeout)
+
+    def shutdown(self, timeout: float = 10.0) -> bool:
+        """Escribe lo pendiente y detiene el escritor (un submit() posterior lo vuelve a arrancar)."""
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.flush(0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "pending": self._unwritten}
+
+
+_queue = CheckInQueue()
+
+
+def get_checkin_queue() -> CheckInQueue:
+    return _queue
@@ -0,0 +1,137 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import statistics
+import time
+
+# Formato guardado en user_auth.password:
+#   scrypt$<n>$<r>$<p>$<salt>$<hash>          (salt y hash en base64)
+#   pbkdf2_sha256$<iteraciones>$<salt>$<hash>
+# Cualquier otro valor se considera una contraseña vieja en texto plano.
+ALGORITHM = os.environ.get("SMARTFIT_PW_ALGORITHM", "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256")
+SCRYPT_N = int(os.environ.get("SMARTFIT_SCRYPT_N", 2 ** 14))  # costo CPU/memoria (potencia de 2)
+SCRYPT_R = int(os.environ.get("SMARTFIT_SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("SMARTFIT_SCRYPT_P", 1))
+PBKDF2_ITERATIONS = int(os.environ.get("SMARTFIT_PBKDF2_ITERATIONS", 600_000))
+SALT_BYTES = 16
+HASH_BYTES = 32
+# Tiempo máximo aceptable para verificar una contraseña (ver benchmark()).
+LATENCY_BUDGET_MS = float(os.environ.get("SMARTFIT_PW_BUDGET_MS", 250))
+
+_PREFIXES = ("scrypt$", "pbkdf2_sha256$")
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # maxmem holgado: scrypt necesita ~128 * n * r bytes
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=HASH_BYTES)
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations, dklen=HASH_BYTES)
+
+
+def hash_password(password: str, algorithm: str | None = None) -> str:
+    """Devuelve el hash con sal aleatoria en el formato de este módulo, con el costo configurado."""
+    algorithm = algorithm or ALGORITHM
+    salt = os.urandom(SALT_BYTES)
+    if algorithm == "scrypt":
+        digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+    if algorithm == "pbkdf2_sha256":
+        digest = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+        return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(digest)}"
+    raise ValueError(f"⚠️ Algoritmo de contraseña desconocido: {algorithm}")
+
+
+def is_legacy(stored: str) -> bool:
+    """True si lo guardado es una contraseña en texto plano (anterior al hashing)."""
+    return not stored.startswith(_PREFIXES)
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """Compara en tiempo constante. Acepta hashes de cualquier costo y contraseñas viejas en texto plano."""
+    if is_legacy(stored):
+        return hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+    parts = stored.split("$")
+    try:
+        if parts[0] == "scrypt":
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            salt, expected = base64.b64decode(parts[4]), base64.b64decode(parts[5])
+            digest = _scrypt(password, salt, n, r, p)
+        else:
+            iterations = int(parts[1])
+            salt, expected = base64.b64decode(parts[2]), base64.b64decode(parts[3])
+            digest = _pbkdf2(password, salt, iterations)
+    except (IndexError, ValueError):
+        return False
+    return hmac.compare_digest(digest, expected)
+
+
+def needs_rehash(stored: str) -> bool:
+    """True si conviene regenerar el hash: texto plano, otro algoritmo u otro costo que el configurado."""
+    if is_legacy(stored):
+        return True
+    parts = stored.split("$")
+    if parts[0] != ALGORITHM:
+        return True
+    if ALGORITHM == "scrypt":
+        return parts[1:4] != [str(SCRYPT_N), str(SCRYPT_R), str(SCRYPT_P)]
+    return parts[1] != str(PBKDF2_ITERATIONS)
+
+
+# Hash de referencia para gastar el mismo tiempo cuando el DNI no existe (no delata qué DNIs están registrados)
+_DUMMY_HASH = None
+
+
+def dummy_verify(password: str):
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password("smartfit-dummy")
+    verify_password(password, _DUMMY_HASH)
+
+
+def benchmark(samples: int = 10, budget_ms: float | None = None) -> dict:
+    """
+    Mide cuánto tarda verificar una contraseña con el costo actual.
+    Devuelve {"algorithm", "median_ms", "p95_ms", "budget_ms", "ok", "logins_per_sec_per_core"}.
+    """
+    budget_ms = budget_ms or LATENCY_BUDGET_MS
+    stored = hash_password("benchmark-password")
+    times = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        verify_password("benchmark-password", stored)
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    median = statistics.median(times)
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    return {
+        "algorithm": stored.split("$")[0],
+        "median_ms": round(median, 2),
+        "p95_ms": round(p95, 2),
+        "budget_ms": budget_ms,
+        "ok": p95 <= budget_ms,
+        "logins_per_sec_per_core": round(1000 / median, 1) if median else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide el costo de verificar contraseñas.")
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=LATENCY_BUDGET_MS, help="Presupuesto en ms (p95).")
+    parser.add_argument("--peak", type=float, default=0, help="Logins por segundo esperados en hora pico.")
+    args = parser.parse_args()
+    result = benchmark(args.samples, args.budget)
+    print(f"🔐 {result['algorithm']}: mediana {result['median_ms']} ms, p95 {result['p95_ms']} ms "
+          f"(presupuesto {result['budget_ms']} ms) -> {'✅' if result['ok'] else '❌'}")
+    print(f"   ~{result['logins_per_sec_per_core']} logins/s por núcleo")
+    if args.peak:
+        cores = args.peak / result["logins_per_sec_per_core"]
+        print(f"   {args.peak} logins/s en hora pico ocupan ~{cores:.2f} núcleo(s) solo en verificar contraseñas")
@@ -0,0 +1,64 @@
+import csv
+import gzip
+import itertools
+import json
+
+FORMATS = {"CSV": ".csv", "JSONL": ".jsonl"}
+CHUNK_SIZE = 1000
+
+
+def iter_rows(cursor, chunk_size: int = CHUNK_SIZE):
+    """Recorre un cursor ya ejecutado en bloques de `chunk_size` (fetchmany), sin cargar todo en memoria."""
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def file_extension(fmt: str, compress: bool = False) -> str:
+    """'.csv', '.jsonl', '.csv.gz', ..."""
+    fmt = fmt.upper()
+    if fmt not in FORMATS:
+        raise ValueError(f"⚠️ Formato inválido. Opciones: {', '.join(FORMATS)}")
+    return FORMATS[fmt] + (".gz" if compress else "")
+
+
+def write_cursor(cursor, filepath: str, fmt: str = "CSV", compress: bool = False,
+                 chunk_size: int = CHUNK_SIZE, progress=None) -> int:
+    """
+    Escribe el resultado de `cursor` directo al archivo, bloque por bloque.
+    - fmt: CSV (con encabezado) o JSONL (un objeto JSON por línea).
+    - compress: escribe gzip.
+    - progress: callback opcional progress(filas_escritas) después de cada bloque.
+    La memoria usada es la de un bloque, no la del resultado completo. Devuelve la cantidad de filas.
+    """
+    fmt = fmt.upper()
+    file_extension(fmt)  # valida el formato
+    columns = [d[0] for d in cursor.description] if cursor.description else []
+    opener = gzip.open if compress else open
+
+    written = 0
+    with opener(filepath, "wt", newline="", encoding="utf-8") as f:
+        chunks = iter_rows(cursor, chunk_size)
+        first = next(chunks, None)
+        if first is None:
+            if fmt == "CSV":
+                f.write("No data found.\n")
+            return 0
+
+        if fmt == "CSV":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            write_chunk = writer.writerows
+        else:
+            def write_chunk(rows):
+                f.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + "\n"
+                             for row in rows)
+
+        for rows in itertools.chain([first], chunks):
+            write_chunk(rows)
+            written += len(rows)
+            if progress:
+                progress(written)
+    return written
@@ -0,0 +1,265 @@
+# services/scheduler.py
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.connection import get_connection, update_in_batches
+from db.rollups import refresh_rollups
+from models.class_template import ClassTemplate
+from models.member_membership import MemberMembership
+from models.no_show import NoShow
+from services.attendance_analytics import prune_changes
+from utils.clock import now_str
+
+# Filas por lote en las tareas que actualizan en masa (cada lote es una transacción corta).
+JOB_BATCH_SIZE = int(os.environ.get("SMARTFIT_JOB_BATCH", 500))
+# Cada cuánto (como máximo) se revisa si hay tareas para correr; stop() espera a lo sumo esto.
+TICK_SECONDS = 1.0
+
+# Tarea -> cada cuántos segundos corre.
+DEFAULT_INTERVALS = {
+    "complete_classes": 5 * 60,
+    "cleanup_waitlists": 5 * 60,
+    "expire_memberships": 60 * 60,
+    "no_shows": 15 * 60,
+    "refresh_rollups": 10 * 60,
+    "generate_classes": 24 * 60 * 60,
+    "prune_analytics": 24 * 60 * 60,
+}
+
+_RECORD_RUN = """
+    INSERT INTO job_stats (name, runs, failures, rows_total, duration_ms_total,
+                           last_rows, last_duration_ms, last_run_at, last_error)
+    VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(name) DO UPDATE
+    SET runs = runs + 1, failures = failures + excluded.failures,
+        rows_total = rows_total + excluded.rows_total,
+        duration_ms_total = duration_ms_total + excluded.duration_ms_total,
+        last_rows = excluded.last_rows, last_duration_ms = excluded.last_duration_ms,
+        last_run_at = excluded.last_run_at, last_error = excluded.last_error
+"""
+
+
+# ---------- TAREAS ----------
+# Cada tarea devuelve cuántas filas tocó.
+
+def complete_classes(batch_size: int = JOB_BATCH_SIZE, now: datetime | None = None) -> int:
+    """
+    Pasa a COMPLETED las clases SCHEDULED que ya terminaron (idx_class_scheduled_end).
+    "Ya terminó" se decide con la hora local de utils.clock, la misma que usa Booking.
+    """
+    return update_in_batches("""
+        UPDATE class SET status = 'COMPLETED'
+        WHERE id IN (SELECT id FROM class WHERE status = 'SCHEDULED' AND end_at <= ? LIMIT ?)
+    """, (now_str(now),), batch_size)
+
+
+def cleanup_waitlists(batch_size: int = JOB_BATCH_SIZE, now: datetime | None = None) -> int:
+    """
+    Cancela las reservas en lista de espera de clases que ya empezaron (mismo corte que Booking,
+    utils.clock): nadie las va a promover.
+    Los triggers de booking mantienen class.waitlist_count al día.
+    """
+    return update_in_batches("""
+        UPDATE booking SET status = 'CANCELLED'
+        WHERE id IN (
+            SELECT b.id FROM booking b
+            CROSS JOIN class c ON c.id = b.class_id   -- primero las listas de espera (idx_booking_waitlist)
+            WHERE b.status = 'WAITLIST' AND c.start_at <= ?
+            LIMIT ?
+        )
+    """, (now_str(now),), batch_size)
+
+
+def expire_memberships(batch_size: int = JOB_BATCH_SIZE) -> int:
+    return MemberMembership._expire(batch_size)
+
+
+def evaluate_no_shows() -> int:
+    return NoShow.evaluate()["no_shows"]
+
+
+def refresh_all_rollups() -> int:
+    return sum(refresh_rollups().values())
+
+
+def generate_classes() -> int:
+    return ClassTemplate._generate()["created"]
+
+
+def prune_analytics_changes() -> int:
+    return prune_changes()
+
+
+DEFAULT_JOBS = {
+    "complete_classes": complete_classes,
+    "cleanup_waitlists": cleanup_waitlists,
+    "expire_memberships": expire_memberships,
+    "no_shows": evaluate_no_shows,
+    "refresh_rollups": refresh_all_rollups,
+    "generate_classes": generate_classes,
+    "prune_analytics": prune_analytics_changes,
+}
+
+
+class _Job:
+    __slots__ = ("name", "func", "interval", "next_run")
+
+    def __init__(self, name, func, interval, next_run):
+        self.name, self.func, self.interval, self.next_run = name, func, interval, next_run
+
+
+class Scheduler:
+    """
+    Programador liviano dentro del proceso: un hilo que corre cada tarea cada `interval` segundos.
+    - Las tareas corren de a una, en el orden en que se registraron (nunca dos a la vez).
+    - Una tarea con error se cuenta en stats() y vuelve a intentar en su próximo turno.
+    - Cada corrida guarda duración y filas tocadas en memoria (stats()) y en la tabla job_stats.
+    run_pending() / run_job() permiten correrlas a mano (worker, tests) sin arrancar el hilo.
+    """
+
+    def __init__(self, tick: float = TICK_SECONDS):
+        self.tick = tick
+        self._jobs = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()   # una tarea por vez, aunque se llame a run_job() desde afuera
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def add(self, name: str, func, interval: float, initial_delay: float = 0.0):
+        """Registra (o reemplaza) una tarea. Con initial_delay=0 corre en la primera vuelta."""
+        if interval <= 0:
+            raise ValueError("⚠️ El intervalo de la tarea debe ser mayor a 0.")
+        with self._lock:
+            self._jobs[name] = _Job(name, func, interval, time.monotonic() + initial_delay)
+            self._stats[name] = {"runs": 0, "failures": 0, "rows": 0, "duration_ms": 0,
+                                 "last_rows": None, "last_duration_ms": None, "last_error": None}
+
+    # ---------- EJECUCIÓN ----------
+    def run_job(self, name: str) -> int | None:
+        """Corre una tarea ya mismo y reprograma la próxima. Devuelve las filas tocadas (None si falló)."""
+        with self._lock:
+            job = self._jobs.get(name)
+        if job is None:
+            raise ValueError(f"⚠️ Tarea inválida: {name}. Opciones: {', '.join(self._jobs)}")
+
+        with self._run_lock:
+            started_at = datetime.now()
+            started = time.perf_counter()
+            try:
+                rows, error = int(job.func() or 0), None
+            except Exception as e:   # una tarea con error no frena al resto
+                rows, error = None, e
+            duration_ms = round((time.perf_counter() - started) * 1000)
+            job.next_run = time.monotonic() + job.interval
+            self._record(name, started_at, duration_ms, rows, error)
+        return rows
+
+    def run_pending(self) -> dict:
+        """Corre las tareas vencidas. Devuelve {tarea: filas tocadas (None si falló)}."""
+        now = time.monotonic()
+        with self._lock:
+            due = [job.name for job in self._jobs.values() if job.next_run <= now]
+        results = {}
+        for name in due:
+            if self._stopping.is_set():
+                break   # apagando: las tareas que faltan quedan para la próxima
+            results[name] = self.run_job(name)
+        return results
+
+    def _record(self, name: str, started_at: datetime, duration_ms: int, rows: int | None, error):
+        with self._lock:
+            stats = self._stats[name]
+            stats["runs"] += 1
+            stats["duration_ms"] += duration_ms
+            stats["last_duration_ms"] = duration_ms
+            stats["last_rows"] = rows
+            stats["last_error"] = str(error) if error else None
+            if error:
+                stats["failures"] += 1
+            else:
+                stats["rows"] += rows
+        try:
+            with get_connection() as conn:
+                conn.execute(_RECORD_RUN, (name, int(error is not None), rows or 0, duration_ms, rows,
+                                           duration_ms, started_at.strftime("%Y-%m-%d %H:%M:%S"),
+                                           str(error) if error else None))
+        except Exception:
+            pass   # el registro es informativo: si la base está ocupada quedan los contadores en memoria
+
+    # ---------- HILO ----------
+    def start(self):
+        """Arranca el hilo del programador (si ya estaba corriendo no hace nada)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="maintenance-scheduler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self.run_pending()
+            with self._lock:
+                next_run = min((job.next_run for job in self._jobs.values()), default=time.monotonic() + self.tick)
+            self._stopping.wait(min(max(next_run - time.monotonic(), 0), self.tick))
+
+    def stop(self, timeout: float = 30.0) -> bool:
+        """Detiene el hilo; la tarea en curso termina su lote. Devuelve False si no terminó a tiempo."""
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                return False
+        self._stopping.clear()   # run_pending() a mano sigue funcionando después de detener el hilo
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+def build_scheduler(intervals: dict | None = None) -> Scheduler:
+    """Programador con las tareas de mantenimiento (DEFAULT_JOBS) y sus intervalos."""
+    intervals = {**DEFAULT_INTERVALS, **(intervals or {})}
+    scheduler = Scheduler()
+    for name, func in DEFAULT_JOBS.items():
+        scheduler.add(name, func, intervals[name])
+    return scheduler
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = build_scheduler()
+        return _scheduler
+
+
+if __name__ == "__main__":
+    # Worker aparte: python -m services.scheduler [--once]
+    scheduler = get_scheduler()
+    if "--once" in sys.argv:
+        scheduler.run_pending()
+    else:
+        print("🛠️ Tareas de mantenimiento en marcha (Ctrl+C para salir).")
+        scheduler.start()
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            scheduler.stop()
+    for name, stats in scheduler.stats().items():
+        status = f"❌ {stats['last_error']}" if stats["last_error"] else f"{stats['rows']} fila(s)"
+        print(f"⏱️ {name}: {stats['runs']} corrida(s), {stats['duration_ms']} ms — {status}")
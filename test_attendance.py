@@ -0,0 +1,43 @@
+import pytest
+
+from db.connection import get_connection
+from models.attendance import Attendance
+
+
+def _seed():
+    """Ana y Beto reservaron el Funcional y Caro (4) canceló; el usuario 5 es otro entrenador."""
+    with get_connection() as conn:
+        conn.executemany("INSERT INTO user (gym_id, full_name, dni) VALUES (1, ?, ?)",
+                         [("Caro", "4"), ("Otro profe", "5")])
+        conn.executemany("INSERT INTO booking (class_id, member_id, status) VALUES (1, ?, ?)",
+                         [(2, "BOOKED"), (3, "BOOKED"), (4, "CANCELLED")])
+
+
+def test_mark_many_upserts_whole_class_once(funcional):
+    _seed()
+    outcomes = Attendance.mark_many(1, {1: True, 2: False, 3: True, 99: True}, 1, ["TRAINER"])
+    assert outcomes == {1: "MARKED", 2: "MARKED", 3: "NOT_BOOKED", 99: "NOT_IN_CLASS"}
+    assert Attendance.mark_many(1, {2: True}, 1, ["TRAINER"]) == {2: "UPDATED"}
+    with pytest.raises(PermissionError):
+        Attendance.mark_many(1, {1: False}, 5, ["TRAINER"])
+    with get_connection() as conn:
+        rows = conn.execute("SELECT booking_id, present FROM attendance ORDER BY booking_id").fetchall()
+    assert [tuple(r) for r in rows] == [(1, 1), (2, 1)]
+
+
+def test_ingest_checkins_matches_bookings_and_keeps_first_scan(funcional):
+    _seed()
+    Attendance.mark_many(1, {1: True, 2: False}, 1, ["TRAINER"])
+    result = Attendance.ingest_checkins([
+        (2, "2099-01-05 09:40"),   # Ana ya estaba presente: no se pisa
+        (3, "2099-01-05 09:55"),   # Beto estaba ausente: pasa a presente con la primera fichada
+        (3, "2099-01-05 09:50"),
+        (4, "2099-01-05 10:05"),   # reserva cancelada
+        (2, "2099-01-05 12:00"),   # fuera de horario
+    ], current_user_roles=["ADMIN"])
+    assert result == {"received": 5, "matched": 3, "recorded": 1, "unmatched": [3, 4]}
+    with get_connection() as conn:
+        row = conn.execute("SELECT present, checked_at FROM attendance WHERE booking_id = 2").fetchone()
+    assert tuple(row) == (1, "2099-01-05 09:50:00")
+    with pytest.raises(PermissionError):
+        Attendance.ingest_checkins([], current_user_roles=["TRAINER"])
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+
+from db.connection import get_connection
+from services import attendance_analytics
+from services.attendance_analytics import AttendanceAnalytics
+
+ADMIN = dict(current_user_id=1, current_user_roles=["ADMIN"])
+
+
+def _seed(weeks):
+    """Una clase por semana hasta la semana pasada; Ana va siempre, Beto falta las semanas impares."""
+    monday = date.today() - timedelta(days=date.today().weekday())
+    with get_connection() as conn:
+        for w in range(weeks, 0, -1):
+            day = monday - timedelta(weeks=w)
+            class_id = conn.execute("""
+                INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity)
+                VALUES (1, 1, 'Funcional', ?, ?, 10)
+            """, (f"{day} 10:00", f"{day} 11:00")).lastrowid
+            for member_id, present in ((2, 1), (3, w % 2 == 0)):
+                booking_id = conn.execute("INSERT INTO booking (class_id, member_id, status) VALUES (?, ?, 'BOOKED')",
+                                          (class_id, member_id)).lastrowid
+                conn.execute("INSERT INTO attendance (booking_id, present) VALUES (?, ?)", (booking_id, int(present)))
+    return monday
+
+
+def test_no_shows_streaks_and_class_ratios(users):
+    _seed(12)
+    stats = {m["member_id"]: m for m in AttendanceAnalytics.member_stats(1, **ADMIN)}
+    assert (stats[2]["current_streak"], stats[2]["longest_streak"], stats[2]["no_shows"]) == (12, 12, 0)
+    assert (stats[3]["current_streak"], stats[3]["longest_streak"], stats[3]["no_show_rate"]) == (0, 1, 0.5)
+    assert [m["member_id"] for m in AttendanceAnalytics.streaks(1, min_weeks=10, **ADMIN)] == [2]
+    assert [m["member_id"] for m in AttendanceAnalytics.top_no_shows(1, **ADMIN)] == [3]
+    classes = AttendanceAnalytics.class_stats(1, **ADMIN)
+    assert len(classes) == 12 and classes[0]["series_ratio"] == 0.75
+
+
+def test_incremental_refresh_only_recomputes_changed_members(users):
+    _seed(4)
+    attendance_analytics.refresh(1)
+    before = attendance_analytics.analytics_stats()
+    with get_connection() as conn:   # Beto pasa a presente en la clase de la semana pasada
+        conn.execute("""
+            UPDATE attendance SET present = 1
+            WHERE booking_id = (SELECT MAX(id) FROM booking WHERE member_id = 3)
+        """)
+    snap = attendance_analytics.refresh(1)
+    after = attendance_analytics.analytics_stats()
+    assert after["incremental_refreshes"] == before["incremental_refreshes"] + 1
+    assert after["members_recomputed"] - before["members_recomputed"] == 1
+    assert (snap.members[3]["no_shows"], snap.members[3]["current_streak"]) == (1, 2)
+
+
+def test_classes_without_attendance_taken_do_not_count(users):
+    monday = _seed(2)
+    with get_connection() as conn:   # clase de ayer: nadie pasó lista todavía
+        class_id = conn.execute("""
+            INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity)
+            VALUES (1, 1, 'Funcional', ?, ?, 10)
+        """, (f"{monday - timedelta(days=1)} 10:00", f"{monday - timedelta(days=1)} 11:00")).lastrowid
+        ana, _ = [conn.execute("INSERT INTO booking (class_id, member_id, status) VALUES (?, ?, 'BOOKED')",
+                               (class_id, member_id)).lastrowid for member_id in (2, 3)]
+    snap = attendance_analytics.refresh(1)
+    assert (snap.members[3]["booked"], snap.members[3]["no_shows"]) == (2, 1)
+    assert class_id not in snap.classes
+
+    with get_connection() as conn:   # se toma asistencia: Ana vino, Beto faltó
+        conn.execute("INSERT INTO attendance (booking_id, present) VALUES (?, 1)", (ana,))
+    snap = attendance_analytics.refresh(1)
+    assert (snap.members[3]["booked"], snap.members[3]["no_shows"]) == (3, 2)
+    assert snap.classes[class_id]["attendance_ratio"] == 0.5
+    assert attendance_analytics.analytics_stats()["full_refreshes"] == 1
+
+
+def test_prune_changes_deletes_only_old_entries_by_id_range():
+    old = [("2000-01-01 00:00:00",), ("2000-01-02 00:00:00",)]
+    with get_connection() as conn:
+        conn.executemany("INSERT INTO analytics_change (member_id, class_id, changed_at) VALUES (1, 1, ?)", old)
+    assert attendance_analytics.prune_changes(days=7) == 2   # sin cambios recientes: se vacía el registro
+
+    with get_connection() as conn:
+        conn.executemany("INSERT INTO analytics_change (member_id, class_id, changed_at) VALUES (1, 1, ?)", old)
+        conn.execute("INSERT INTO analytics_change (member_id, class_id) VALUES (1, 1)")
+    assert attendance_analytics.prune_changes(days=7) == 2
+    assert attendance_analytics.prune_changes(days=7) == 0
+    with get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM analytics_change").fetchone()[0] == 1
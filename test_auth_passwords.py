@@ -0,0 +1,49 @@
+import pytest
+
+from db.connection import get_connection
+from services import passwords
+from services.auth_service import AuthService
+
+
+def _stored_password(dni):
+    with get_connection() as conn:
+        return conn.execute("""
+            SELECT a.password FROM user_auth a JOIN user u ON u.id = a.user_id WHERE u.dni = ?
+        """, (dni,)).fetchone()[0]
+
+
+def test_register_hashes_and_login_verifies():
+    with get_connection() as conn:
+        conn.execute("INSERT INTO gym (name) VALUES ('Centro')")
+        conn.execute("INSERT INTO role (code, name) VALUES ('ADMIN', 'Admin'), ('MEMBER', 'Socio')")
+    AuthService.register("Ana", "100", "555", " secreto ", 1)
+
+    stored = _stored_password("100")
+    assert stored.startswith(passwords.ALGORITHM + "$") and "secreto" not in stored
+    assert AuthService.login("100", "secreto")["roles"] == ["MEMBER"]
+    with pytest.raises(Exception, match="incorrectos"):
+        AuthService.login("100", "otra")
+    with pytest.raises(Exception, match="incorrectos"):
+        AuthService.login("999", "secreto")
+
+
+def test_legacy_plaintext_is_rehashed_on_login():
+    with get_connection() as conn:
+        conn.execute("INSERT INTO gym (name) VALUES ('Centro')")
+        conn.execute("INSERT INTO role (code, name) VALUES ('ADMIN', 'Admin'), ('MEMBER', 'Socio')")
+        conn.execute("INSERT INTO user (gym_id, full_name, dni) VALUES (1, 'Viejo', '200')")
+        conn.execute("INSERT INTO user_auth (user_id, password) VALUES (1, 'plano')")
+        conn.execute("INSERT INTO user_role (user_id, role_id) SELECT 1, id FROM role WHERE code = 'ADMIN'")
+
+    with pytest.raises(Exception):
+        AuthService.login("200", "mal")
+    assert _stored_password("200") == "plano"
+
+    assert AuthService.login("200", "plano")["user_id"] == 1
+    stored = _stored_password("200")
+    assert not passwords.is_legacy(stored) and not passwords.needs_rehash(stored)
+    assert AuthService.login("200", "plano")["roles"] == ["ADMIN"]
+
+
+def test_verification_fits_latency_budget():
+    assert passwords.benchmark(samples=3, budget_ms=2000)["ok"]
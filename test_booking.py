@@ -0,0 +1,193 @@
+import time
+from datetime import datetime, timedelta
+
+from db.connection import get_connection
+from db.repair_counters import repair_class_counters
+from models.Booking import Booking
+from models.Class_session import ClassSession
+from services.Class_service import ClassService
+
+MEMBER = ["MEMBER"]
+
+
+def _seed(classes):
+    """classes: [(nombre, inicio, sala, cupo)] del Profe (1); los socios son Ana, Beto, Caro y Dani (2 a 5)."""
+    with get_connection() as conn:
+        conn.executemany("INSERT INTO user (gym_id, full_name, dni) VALUES (1, ?, ?)", [("Caro", "4"), ("Dani", "5")])
+        conn.executemany("""
+            INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity, room)
+            VALUES (1, 1, ?, ?, datetime(?, '+1 hour'), ?, ?)
+        """, [(name, start, start, capacity, room) for name, start, room, capacity in classes])
+
+
+def test_create_many_reports_each_class_in_one_transaction(users):
+    _seed([
+        ("Spinning", "2099-01-05 10:00", "Sala 1", 1),   # 1: llena -> WAITLIST
+        ("Spinning", "2099-01-12 10:00", "Sala 1", 5),   # 2: libre -> BOOKED
+        ("Spinning", "2000-01-03 10:00", "Sala 1", 5),   # 3: ya empezó
+        ("Spinning", "2099-01-19 10:00", "Sala 1", 5),   # 4: ya reservada
+    ])
+    Booking.create(1, 3, current_user_id=3, current_user_roles=MEMBER)
+    Booking.create(4, 2, current_user_id=2, current_user_roles=MEMBER)
+
+    conn = get_connection()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        results = Booking.create_many(2, [1, 2, 3, 4, 999, 2], current_user_id=2, current_user_roles=MEMBER)
+    finally:
+        conn.set_trace_callback(None)
+        conn.close()
+
+    assert [(r["class_id"], r["result"]) for r in results] == [
+        (1, "WAITLIST"), (2, "BOOKED"), (3, "STARTED"), (4, "DUPLICATE"), (999, "NOT_FOUND"),
+    ]
+    assert sum(s.startswith("BEGIN") for s in statements) == 1
+    with get_connection() as conn:
+        rows = conn.execute("SELECT class_id, status FROM booking WHERE member_id = 2 ORDER BY class_id").fetchall()
+    assert [(r["class_id"], r["status"]) for r in rows] == [(1, "WAITLIST"), (2, "BOOKED"), (4, "BOOKED")]
+
+
+def test_find_series_and_book_series_follow_weekday_time_room_and_name(users):
+    _seed([
+        ("Yoga", "2099-01-05 10:00", "Sala 1", 10),      # 1: base (lunes)
+        ("Yoga", "2099-01-12 10:00", "Sala 1", 10),      # 2
+        ("Yoga", "2099-01-12 10:00", "Sala 2", 10),      # 3: otra sala
+        ("Pilates", "2099-01-19 10:00", "Sala 1", 10),   # 4: otro nombre
+        ("Yoga", "2099-01-19 11:00", "Sala 1", 10),      # 5: otro horario
+        ("Yoga", "2099-01-20 10:00", "Sala 1", 10),      # 6: otro día
+        ("Yoga", "2099-01-19 10:00", "Sala 1", 10),      # 7
+        ("Yoga", "2099-01-26 10:00", "Sala 1", 10),      # 8: fuera de las 3 semanas
+    ])
+    assert ClassService.find_series(1, weeks=3) == [1, 2, 7]
+    assert ClassService.find_series(1, weeks=4) == [1, 2, 7, 8]
+    assert ClassService.find_series(2, weeks=1) == [2]
+
+    results = ClassService.book_series(2, from_class_id=1, weeks=3, current_user_roles=MEMBER)
+    assert [(r["class_id"], r["result"]) for r in results] == [(1, "BOOKED"), (2, "BOOKED"), (7, "BOOKED")]
+
+
+def _bookings(rows):
+    """rows: [(clase, socio, estado, booked_at)]. Devuelve los ids en el mismo orden."""
+    with get_connection() as conn:
+        return [conn.execute("""
+            INSERT INTO booking (class_id, member_id, status, booked_at) VALUES (?, ?, ?, ?)
+        """, row).lastrowid for row in rows]
+
+
+def _statuses(class_id):
+    with get_connection() as conn:
+        rows = conn.execute("SELECT member_id, status FROM booking WHERE class_id = ? ORDER BY member_id",
+                            (class_id,)).fetchall()
+    return {r["member_id"]: r["status"] for r in rows}
+
+
+def test_waitlist_promotion_is_fifo_and_only_fills_free_seats(users):
+    _seed([("Spinning", "2099-01-05 10:00", "Sala 1", 1)])
+    first, *_ = _bookings([
+        (1, 2, "BOOKED", "2099-01-01 08:00"),
+        (1, 3, "WAITLIST", "2099-01-01 09:30"),
+        (1, 4, "WAITLIST", "2099-01-01 09:00"),   # se anotó antes que Beto
+        (1, 5, "WAITLIST", "2099-01-01 09:30"),   # mismo horario que Beto: desempata el id
+    ])
+    admin = dict(current_user_id=1, current_user_roles=["ADMIN"])
+
+    ClassSession.update(1, capacity=1, **admin)     # el cupo no supera a los reservados: nadie sube
+    assert _statuses(1) == {2: "BOOKED", 3: "WAITLIST", 4: "WAITLIST", 5: "WAITLIST"}
+
+    ClassSession.update(1, capacity=3, **admin)     # dos lugares nuevos, en orden de llegada
+    assert _statuses(1) == {2: "BOOKED", 3: "BOOKED", 4: "BOOKED", 5: "WAITLIST"}
+
+    ClassService.cancel_booking(first, 2, current_user_roles=MEMBER)
+    assert _statuses(1) == {2: "CANCELLED", 3: "BOOKED", 4: "BOOKED", 5: "BOOKED"}
+    with get_connection() as conn:
+        assert tuple(conn.execute("SELECT booked_count, waitlist_count FROM class WHERE id = 1").fetchone()) == (3, 0)
+
+
+def test_gym_wide_promotion_fills_each_future_class_in_order(users):
+    _seed([
+        ("Spinning", "2099-01-05 10:00", "Sala 1", 2),   # 1: un lugar libre
+        ("Yoga", "2099-01-05 12:00", "Sala 1", 3),       # 2: dos lugares libres
+        ("Yoga", "2000-01-03 12:00", "Sala 1", 3),       # 3: ya pasó
+    ])
+    with get_connection() as conn:
+        conn.execute("INSERT INTO gym (name) VALUES ('Norte')")
+        conn.execute("""
+            INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity)
+            VALUES (2, 1, 'Box', '2099-01-05 10:00', '2099-01-05 11:00', 3)
+        """)
+    _bookings([
+        (1, 2, "BOOKED", "2099-01-01 08:00"),
+        (1, 3, "WAITLIST", "2099-01-01 09:00"),
+        (1, 4, "WAITLIST", "2099-01-01 10:00"),
+        (2, 2, "BOOKED", "2099-01-01 08:00"),
+        (2, 5, "WAITLIST", "2099-01-01 11:00"),
+        (2, 3, "WAITLIST", "2099-01-01 12:00"),
+        (2, 4, "WAITLIST", "2099-01-01 13:00"),
+        (3, 5, "WAITLIST", "1999-12-31 09:00"),
+        (4, 5, "WAITLIST", "2099-01-01 09:00"),   # otro gimnasio
+    ])
+
+    assert Booking.promote_waitlists_for_gym(1) == 3
+    assert _statuses(1) == {2: "BOOKED", 3: "BOOKED", 4: "WAITLIST"}
+    assert _statuses(2) == {2: "BOOKED", 3: "BOOKED", 4: "WAITLIST", 5: "BOOKED"}
+    assert _statuses(3) == {5: "WAITLIST"}
+    assert _statuses(4) == {5: "WAITLIST"}
+    assert Booking.promote_waitlists_for_gym(1) == 0
+
+
+def _counters():
+    with get_connection() as conn:
+        return [tuple(r) for r in conn.execute("SELECT booked_count, waitlist_count FROM class ORDER BY id")]
+
+
+def test_counter_triggers_follow_cancel_status_change_move_and_delete(users):
+    _seed([("Spinning", "2099-01-05 10:00", "Sala 1", 2), ("Yoga", "2099-01-05 12:00", "Sala 1", 2)])
+    ana, beto, caro = _bookings([
+        (1, 2, "BOOKED", "2099-01-01 08:00"),
+        (1, 3, "BOOKED", "2099-01-01 09:00"),
+        (1, 4, "WAITLIST", "2099-01-01 10:00"),
+    ])
+    assert _counters() == [(2, 1), (0, 0)]
+
+    Booking.cancel(ana, current_user_id=1, current_user_roles=["ADMIN"])   # Caro sube desde la lista
+    assert _counters() == [(2, 0), (0, 0)]
+
+    with get_connection() as conn:
+        conn.execute("UPDATE booking SET status = 'WAITLIST' WHERE id = ?", (beto,))
+        assert _counters() == [(1, 1), (0, 0)]
+        conn.execute("UPDATE booking SET class_id = 2 WHERE id = ?", (caro,))   # cambio de clase
+        assert _counters() == [(0, 1), (1, 0)]
+        conn.execute("DELETE FROM booking WHERE id IN (?, ?)", (beto, caro))
+    assert _counters() == [(0, 0), (0, 0)]
+
+
+def test_repair_class_counters_fixes_only_desynchronized_classes(users):
+    _seed([("Spinning", "2099-01-05 10:00", "Sala 1", 2), ("Yoga", "2099-01-05 12:00", "Sala 1", 2),
+           ("Box", "2099-01-05 14:00", "Sala 1", 2)])
+    _bookings([(1, 2, "BOOKED", "2099-01-01 08:00"), (1, 3, "WAITLIST", "2099-01-01 09:00"),
+               (2, 2, "BOOKED", "2099-01-01 08:00")])
+    with get_connection() as conn:
+        conn.execute("UPDATE class SET booked_count = 7, waitlist_count = -1 WHERE id = 1")
+        conn.execute("UPDATE class SET booked_count = 0 WHERE id = 2")
+        conn.execute("UPDATE class SET waitlist_count = 4 WHERE id = 3")
+
+    assert repair_class_counters(class_id=3) == 1
+    assert _counters() == [(7, -1), (0, 0), (0, 0)]
+    assert repair_class_counters() == 2
+    assert _counters() == [(1, 1), (1, 0), (0, 0)]
+    assert repair_class_counters() == 0
+
+
+def test_started_cutoff_uses_local_time(users, monkeypatch):
+    # UTC-3: en UTC ya son las 13:00 cuando en el gimnasio son las 10:00
+    monkeypatch.setenv("TZ", "America/Argentina/Buenos_Aires")
+    time.tzset()
+    try:
+        soon = (datetime.now() + timedelta(hours=1)).strftime("%Y-%m-%d %H:%M")
+        _seed([("Spinning", soon, "Sala 1", 5)])
+        assert Booking.create_many(2, [1], current_user_id=2, current_user_roles=MEMBER)[0]["result"] == "BOOKED"
+        Booking.create(1, 3, current_user_id=3, current_user_roles=MEMBER)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
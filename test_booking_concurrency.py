@@ -0,0 +1,47 @@
+import threading
+
+from db.connection import configure_database, get_connection, pool_stats
+from db.init_db import init_db
+from models.Booking import Booking
+
+CAPACITY = 5
+MEMBERS = 40
+
+
+def test_concurrent_bookings_never_overbook(tmp_path):
+    # Base en archivo (WAL) para que los hilos usen conexiones distintas del pool y compitan de verdad
+    configure_database(str(tmp_path / "stress.db"))
+    init_db()
+    with get_connection() as conn:
+        conn.execute("INSERT INTO gym (name) VALUES ('Stress')")
+        conn.execute("INSERT INTO user (gym_id, full_name, dni) VALUES (1, 'Trainer', 't')")
+        conn.executemany("INSERT INTO user (gym_id, full_name, dni) VALUES (1, ?, ?)",
+                         [(f"Member {i}", f"m{i}") for i in range(MEMBERS)])
+        conn.execute("""
+            INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity)
+            VALUES (1, 1, 'Spinning', '2999-01-01 07:00', '2999-01-01 08:00', ?)
+        """, (CAPACITY,))
+
+    start = threading.Barrier(MEMBERS)
+    errors = []
+
+    def book(member_id):
+        start.wait()
+        try:
+            Booking.create(1, member_id, current_user_id=member_id, current_user_roles=["MEMBER"])
+        except Exception as e:  # pragma: no cover - se reporta abajo
+            errors.append(e)
+
+    threads = [threading.Thread(target=book, args=(member_id,)) for member_id in range(2, MEMBERS + 2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    with get_connection() as conn:
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM booking GROUP BY status").fetchall())
+        cls = conn.execute("SELECT booked_count, waitlist_count FROM class WHERE id = 1").fetchone()
+    assert counts == {"BOOKED": CAPACITY, "WAITLIST": MEMBERS - CAPACITY}
+    assert (cls["booked_count"], cls["waitlist_count"]) == (CAPACITY, MEMBERS - CAPACITY)
+    assert pool_stats()["created"] > 1
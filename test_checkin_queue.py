@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db.connection import get_connection
+from models.attendance import Attendance
+from services.checkin_queue import CheckInQueue
+
+ADMIN = ["ADMIN"]
+
+
+def _seed(members):
+    """Reservas BOOKED en el Funcional para los socios 2 .. members + 1 (Ana, Beto y los que hagan falta)."""
+    with get_connection() as conn:
+        conn.execute("UPDATE class SET capacity = 100 WHERE id = 1")
+        conn.executemany("INSERT INTO user (gym_id, full_name, dni) VALUES (1, ?, ?)",
+                         [(f"Socio {i}", str(i)) for i in range(4, members + 2)])
+        conn.executemany("INSERT INTO booking (class_id, member_id, status) VALUES (1, ?, 'BOOKED')",
+                         [(member_id,) for member_id in range(2, members + 2)])
+
+
+def test_burst_is_written_in_batches_and_flushed_on_shutdown(funcional):
+    _seed(40)
+    q = CheckInQueue(batch_size=16, flush_ms=50)
+    for member_id in range(2, 42):
+        q.submit(member_id, "2099-01-05 09:55", current_user_roles=ADMIN)
+    assert q.shutdown(timeout=5)
+    stats = q.stats()
+    assert stats["written"] == 40 and stats["recorded"] == 40 and stats["pending"] == 0
+    assert stats["batches"] < 40 and stats["max_batch"] <= 16
+    with get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM attendance WHERE present = 1").fetchone()[0] == 40
+    with pytest.raises(PermissionError):
+        q.submit(2, current_user_roles=["MEMBER"])
+
+
+def test_full_queue_applies_back_pressure(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(Attendance, "_ingest_checkins",
+                        staticmethod(lambda events: release.wait(5) and {"recorded": 0, "unmatched": []}))
+    q = CheckInQueue(max_pending=2, batch_size=1, flush_ms=10, submit_timeout=0.05)
+    q.submit(1, current_user_roles=ADMIN)   # el escritor se lo lleva y queda bloqueado
+    while q._queue.qsize():
+        time.sleep(0.001)
+    q.submit(2, current_user_roles=ADMIN)
+    q.submit(3, current_user_roles=ADMIN)
+    with pytest.raises(TimeoutError):
+        for member_id in range(4, 8):
+            q.submit(member_id, current_user_roles=ADMIN)
+    assert q.stats()["rejected"] == 1
+    release.set()
+    assert q.shutdown(timeout=5) and q.stats()["written"] == 3
+
+
+def test_bad_events_are_rejected_or_isolated_without_losing_the_batch(funcional, monkeypatch):
+    _seed(4)
+    q = CheckInQueue(batch_size=16, flush_ms=500)   # las cuatro fichadas entran en el mismo lote
+    with pytest.raises(ValueError, match="Hora de fichada inválida"):
+        q.submit(2, "ayer a la tarde", current_user_roles=ADMIN)
+    assert q.stats()["submitted"] == 0
+
+    # Una fichada que igual rompe el lote (acá, el socio 3) no se lleva puestas a las otras
+    ingest = Attendance._ingest_checkins
+
+    def fragile(events):
+        if any(member_id == 3 for member_id, _ in events):
+            raise RuntimeError("fila corrupta")
+        return ingest(events)
+    monkeypatch.setattr(Attendance, "_ingest_checkins", staticmethod(fragile))
+    for member_id in (2, 3, 4, 5):
+        q.submit(member_id, "2099-01-05 10:05", current_user_roles=ADMIN)
+    assert q.shutdown(timeout=5)
+    stats = q.stats()
+    assert stats["failed"] == 1 and stats["written"] == 3 and stats["recorded"] == 3 and stats["retried"] >= 1
+    assert "fila corrupta" in str(q.last_error)
+
+
+def test_locked_database_is_retried_without_losing_events(funcional, monkeypatch):
+    _seed(4)
+    ingest = Attendance._ingest_checkins
+    errors = [sqlite3.OperationalError("database is locked"), TimeoutError("pool agotado"),
+              sqlite3.OperationalError("database is locked")]
+    calls = []
+
+    def busy(events):
+        calls.append(len(events))
+        if errors:
+            raise errors.pop(0)
+        return ingest(events)
+    monkeypatch.setattr(Attendance, "_ingest_checkins", staticmethod(busy))
+    q = CheckInQueue(batch_size=16, flush_ms=500, retry_backoff_ms=1)
+    for member_id in (2, 3, 4, 5):
+        q.submit(member_id, "2099-01-05 10:05", current_user_roles=ADMIN)
+    assert q.shutdown(timeout=5)
+    stats = q.stats()
+    assert (stats["written"], stats["recorded"], stats["failed"]) == (4, 4, 0)
+    assert stats["busy_retries"] == 3 and stats["retried"] == 0 and calls == [4, 4, 4, 4]   # nunca se partió
@@ -0,0 +1,70 @@
+import sqlite3
+import threading
+
+import pytest
+
+from db.connection import ConnectionPool
+
+
+def _pool(tmp_path, **kwargs):
+    path = str(tmp_path / "pool.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    return ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False), **kwargs)
+
+
+def test_nested_checkout_on_same_thread_reuses_connection(tmp_path):
+    pool = _pool(tmp_path, size=1)
+    outer = pool.acquire()
+    inner = pool.acquire()   # con size=1 esperaría para siempre si no fuera reentrante
+    assert inner._checkout is outer._checkout
+    inner.close()
+    assert pool.stats()["in_use"] == 1
+    outer.close()
+    stats = pool.stats()
+    assert (stats["created"], stats["reentrant"], stats["idle"], stats["in_use"]) == (1, 1, 1, 0)
+
+
+def test_exhausted_pool_times_out(tmp_path):
+    pool = _pool(tmp_path, size=1, timeout=0.05)
+    held = pool.acquire()
+    errors = []
+
+    def other_thread():
+        try:
+            pool.acquire()
+        except TimeoutError as e:
+            errors.append(e)
+    t = threading.Thread(target=other_thread)
+    t.start()
+    t.join()
+    assert len(errors) == 1 and pool.stats()["waits"] == 1
+    held.close()
+
+
+def test_release_rolls_back_open_transaction(tmp_path):
+    pool = _pool(tmp_path, size=1)
+    conn = pool.acquire()
+    conn.execute("INSERT INTO t VALUES (1)")   # sqlite3 abre la transacción implícita
+    conn.close()                               # se devuelve sin commit
+
+    with pytest.raises(RuntimeError):
+        with pool.acquire() as conn:
+            conn.execute("INSERT INTO t VALUES (2)")
+            raise RuntimeError("falla a mitad del bloque")
+
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    conn.close()
+
+
+def test_unhealthy_idle_connection_is_discarded(tmp_path):
+    pool = _pool(tmp_path, size=1, health_check_after=0)
+    pool.acquire().close()
+    pool._idle[0][0].close()   # la conexión libre se rompe mientras espera
+
+    conn = pool.acquire()
+    assert conn.execute("SELECT 1").fetchone()[0] == 1
+    conn.close()
+    stats = pool.stats()
+    assert (stats["health_checks"], stats["discarded"], stats["created"], stats["open"]) == (1, 1, 2, 1)
@@ -0,0 +1,45 @@
+import pytest
+
+from db.connection import get_connection
+from db.migrate import migrate
+
+
+@pytest.fixture(autouse=True)
+def empty_history():
+    """Los tests usan su propio directorio de migraciones, sin el historial de db/migrations."""
+    with get_connection() as conn:
+        conn.execute("DELETE FROM schema_version")
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+
+
+def test_migrate_applies_in_order_with_batched_backfill(tmp_path):
+    _write(tmp_path / "0001_add_demo.sql", "CREATE TABLE demo (id INTEGER PRIMARY KEY, n INTEGER);\n")
+    _write(tmp_path / "0002_backfill_demo.py", (
+        "def upgrade(ctx):\n"
+        "    ctx.execute('ALTER TABLE demo ADD COLUMN doubled INTEGER')\n"
+        "    ctx.backfill('demo', 'doubled = n * 2', 'doubled IS NULL', batch_size=3)\n"
+    ))
+    migrate(directory=str(tmp_path), target=1, log=lambda *_: None)
+    with get_connection() as conn:
+        conn.executemany("INSERT INTO demo (n) VALUES (?)", [(i,) for i in range(10)])
+
+    assert migrate(directory=str(tmp_path), dry_run=True, log=lambda *_: None)[0].version == 2
+    applied = migrate(directory=str(tmp_path), log=lambda *_: None)
+
+    assert [m.version for m in applied] == [2]
+    with get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM demo WHERE doubled = n * 2").fetchone()[0] == 10
+        assert [r[0] for r in conn.execute("SELECT version FROM schema_version ORDER BY version")] == [1, 2]
+    assert migrate(directory=str(tmp_path), log=lambda *_: None) == []
+
+
+def test_migrate_rejects_modified_migration(tmp_path):
+    _write(tmp_path / "0001_add_demo.sql", "CREATE TABLE demo (id INTEGER PRIMARY KEY);\n")
+    migrate(directory=str(tmp_path), log=lambda *_: None)
+    _write(tmp_path / "0001_add_demo.sql", "CREATE TABLE demo (id INTEGER PRIMARY KEY, x TEXT);\n")
+
+    with pytest.raises(ValueError):
+        migrate(directory=str(tmp_path), log=lambda *_: None)
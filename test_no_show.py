@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+from db.connection import get_connection
+from models.Booking import Booking
+from models.no_show import NoShow
+
+NOW = datetime(2099, 1, 10, 12, 0)
+
+
+def _seed():
+    """Ana y Beto reservan cada clase menos la futura; donde se pasó lista vino Beto y Ana no."""
+    with get_connection() as conn:
+        classes = [
+            ("2099-01-09 08:00", "2099-01-09 09:00", True),
+            ("2099-01-09 18:00", "2099-01-09 19:00", True),
+            ("2099-01-10 08:00", "2099-01-10 09:00", True),
+            ("2099-01-10 09:00", "2099-01-10 10:00", False),   # nadie pasó lista: no se juzga
+            ("2099-01-10 10:30", "2099-01-10 11:30", True),    # dentro del margen: todavía no
+            ("2099-02-01 10:00", "2099-02-01 11:00", False),   # futura
+        ]
+        for start, end, taken in classes:
+            class_id = conn.execute("""
+                INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity)
+                VALUES (1, 1, 'Funcional', ?, ?, 10)
+            """, (start, end)).lastrowid
+            if start > "2099-02":
+                continue
+            conn.execute("INSERT INTO booking (class_id, member_id) VALUES (?, 2)", (class_id,))
+            beto = conn.execute("INSERT INTO booking (class_id, member_id) VALUES (?, 3)", (class_id,)).lastrowid
+            if taken:
+                conn.execute("INSERT INTO attendance (booking_id, present) VALUES (?, 1)", (beto,))
+
+
+def test_evaluate_records_no_shows_once_and_bans_member(users):
+    _seed()
+    assert NoShow.evaluate(NOW) == {"no_shows": 3, "members": 1, "bans": 1}
+    assert NoShow.evaluate(NOW) == {"no_shows": 0, "members": 0, "bans": 0}
+    assert len(NoShow.list_by_member(2, current_user_id=2, current_user_roles=["MEMBER"])) == 3
+
+    with pytest.raises(PermissionError, match="3 faltazos"):
+        Booking.create(6, 2, current_user_id=2, current_user_roles=["MEMBER"])
+    Booking.create(6, 3, current_user_id=3, current_user_roles=["MEMBER"])
+
+    NoShow.lift_ban(2, current_user_id=1, current_user_roles=["ADMIN"])
+    Booking.create(6, 2, current_user_id=2, current_user_roles=["MEMBER"])
@@ -0,0 +1,41 @@
+from db.connection import get_connection
+from db.pagination import iter_pages
+from models.Class_session import ClassSession
+from models.payment import Payment
+
+
+def _seed_payments(n):
+    with get_connection() as conn:
+        conn.execute("INSERT INTO gym (name) VALUES ('Centro')")
+        conn.execute("INSERT INTO user (gym_id, full_name, dni) VALUES (1, 'Ana', '1')")
+        conn.execute("INSERT INTO membership (gym_id, name, duration_months, price) VALUES (1, 'Mensual', 1, 100)")
+        conn.execute("INSERT INTO member_membership (user_id, membership_id) VALUES (1, 1)")
+        # Varios pagos con la misma fecha: el id desempata el cursor
+        conn.executemany("""
+            INSERT INTO payment (member_membership_id, paid_at, amount, method, purpose)
+            VALUES (1, ?, 100, 'CASH', 'RENEWAL')
+        """, [(f"2025-01-0{1 + i // 3}",) for i in range(n)])
+
+
+def test_payment_pages_cover_every_row_once():
+    _seed_payments(7)
+    pages = list(iter_pages(Payment.list_filtered, limit=3))
+    assert [len(p) for p in pages] == [3, 3, 1] and pages[-1].next_cursor is None
+    ids = [row["id"] for page in pages for row in page]
+    assert sorted(ids) == list(range(1, 8)) and ids == [r["id"] for r in Payment.list_filtered(limit=100)]
+
+    tuples = list(iter_pages(Payment.list_filtered, as_tuples=True, limit=2))
+    assert [row[0] for page in tuples for row in page] == ids
+
+
+def test_class_pages_for_trainer():
+    with get_connection() as conn:
+        conn.execute("INSERT INTO gym (name) VALUES ('Centro')")
+        conn.execute("INSERT INTO user (gym_id, full_name, dni) VALUES (1, 'Profe', '1')")
+        conn.executemany("""
+            INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity)
+            VALUES (1, 1, 'Funcional', ?, '2099-12-31', 10)
+        """, [("2099-01-01",)] * 4)
+    first = ClassSession.list_all_classes(1, ["TRAINER"], limit=3)
+    rest = ClassSession.list_all_classes(1, ["TRAINER"], after=first.next_cursor, limit=3)
+    assert [c["id"] for c in first + rest] == [1, 2, 3, 4] and rest.next_cursor is None
@@ -0,0 +1,50 @@
+import pytest
+
+from db.connection import get_connection
+from models.Booking import Booking
+from models.Class_session import ClassSession
+from models.Gym import Gym
+from utils.policy import clear_policy_cache, filter_owned, policy_stats
+
+
+def _seed():
+    """50 clases del Profe y una (la 51) a cargo del usuario 2."""
+    with get_connection() as conn:
+        conn.executemany("""
+            INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity)
+            VALUES (1, ?, 'Spinning', '2099-01-01 10:00', '2099-01-01 11:00', 10)
+        """, [(1,)] * 50 + [(2,)])
+
+
+def test_ownership_is_loaded_once_per_trainer(users):
+    _seed()
+    clear_policy_cache()
+    for class_id in range(1, 51):
+        assert Booking.list_by_class(class_id, current_user_id=1, current_user_roles=["trainer"]) == []
+    stats = policy_stats()
+    assert stats["owner_misses"] == 1 and stats["owner_hits"] == 49
+
+    with pytest.raises(PermissionError, match="no dictás"):
+        Booking.list_by_class(51, current_user_id=1, current_user_roles=["TRAINER"])
+    assert filter_owned("class", 1, [1, 2, 51]) == [1, 2]
+    assert policy_stats()["denied"] == 1
+
+    # Una clase nueva del mismo entrenador pasa el chequeo sin esperar al TTL
+    ClassSession.create(1, 1, "Yoga", "2099-01-02 10:00", "2099-01-02 11:00", 5,
+                        current_user_id=1, current_user_roles=["TRAINER"])
+    before = policy_stats()
+    ClassSession.update(52, name="Yoga II", current_user_id=1, current_user_roles=["TRAINER"])
+    after = policy_stats()
+    # create() invalidó el conjunto del entrenador: se relee una vez (miss) y ya incluye la clase 52
+    assert after["owner_misses"] == before["owner_misses"] + 1 and after["owner_hits"] == before["owner_hits"]
+    with get_connection() as conn:
+        assert conn.execute("SELECT name FROM class WHERE id = 52").fetchone()[0] == "Yoga II"
+    Booking.list_by_class(52, current_user_id=1, current_user_roles=["TRAINER"])
+    assert policy_stats()["owner_hits"] == after["owner_hits"] + 1   # después vuelve a salir de la cache
+
+
+def test_admin_only_rules_are_enforced_by_decorator():
+    with pytest.raises(PermissionError, match="administrador"):
+        Gym.create("Centro", current_user_roles=["MEMBER"])
+    Gym.create("Centro", current_user_roles=["admin"])
+    assert len(Gym.all()) == 1
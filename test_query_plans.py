@@ -0,0 +1,6 @@
+from db.query_plan import check_hot_queries
+
+
+def test_hot_queries_use_indexes():
+    failed = {r["name"]: r["plan"] for r in check_hot_queries() if not r["ok"]}
+    assert not failed, failed
@@ -0,0 +1,63 @@
+import pytest
+
+from services import auth_service
+from utils import rate_limit
+from services.auth_service import AuthService
+from utils.rate_limit import DNI_FAILURES_BEFORE_LOCK, LoginRateLimiter, get_login_limiter
+
+
+def test_locked_dni_is_rejected_before_any_sql(monkeypatch):
+    for _ in range(DNI_FAILURES_BEFORE_LOCK):
+        with pytest.raises(Exception, match="incorrectos"):
+            AuthService.login("404", "nada")
+
+    def no_sql():
+        raise AssertionError("no debería consultar la base")
+    monkeypatch.setattr(auth_service, "get_connection", no_sql)
+    with pytest.raises(PermissionError, match="Demasiados intentos"):
+        AuthService.login("404", "nada")
+    assert get_login_limiter().stats()["rejected"] == 1
+
+
+def test_bucket_refills_and_lockout_grows():
+    limiter = LoginRateLimiter(persist=False)
+    for _ in range(5):
+        limiter.check("1", "kiosco")
+    with pytest.raises(PermissionError):
+        limiter.check("1", "kiosco")
+    limiter._buckets[("dni", "1")].refilled_at -= 60   # pasan 60 s: vuelven 2 intentos
+    limiter.check("1", "kiosco")
+
+    for _ in range(DNI_FAILURES_BEFORE_LOCK + 1):
+        limiter.record_failure("2", "kiosco")
+    bucket = limiter._buckets[("dni", "2")]
+    first = bucket.locked_until
+    limiter.record_failure("2", "kiosco")
+    assert bucket.locked_until - first > 30
+    limiter.record_success("2", "kiosco")
+    assert bucket.locked_until == 0 and bucket.failures == 0
+
+
+def test_failures_decay_after_idle_window_and_bucket_is_evicted(monkeypatch):
+    limiter = LoginRateLimiter(persist=False)
+    for _ in range(DNI_FAILURES_BEFORE_LOCK - 1):
+        limiter.record_failure("3", "kiosco")
+    bucket = limiter._buckets[("dni", "3")]
+    bucket.failed_at -= rate_limit.FAILURE_WINDOW   # un rato sin fallar: el próximo error no bloquea
+    limiter.record_failure("3", "kiosco")
+    assert bucket.failures == 1 and bucket.locked_until == 0
+
+    # Un DNI distinto por intento (credential stuffing): las entradas viejas se olvidan y se descartan
+    for dni in ("10", "11", "12"):
+        limiter.record_failure(dni, "bot")
+    for b in limiter._buckets.values():
+        b.failed_at -= rate_limit.FAILURE_WINDOW
+        b.refilled_at -= 3600
+    limiter.compact()
+    assert limiter.stats()["entries"] == 0
+
+    monkeypatch.setattr(rate_limit, "MAX_ENTRIES", 4)
+    for dni in range(10):
+        limiter.check(str(dni), "bot")
+    assert limiter.stats()["entries"] <= 4
+    assert limiter._buckets[("src", "bot")].tokens < rate_limit.SOURCE_BURST - 9   # el origen no se descartó
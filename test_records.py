@@ -0,0 +1,33 @@
+import pickle
+
+from db.connection import get_connection
+from db.records import Record, tuple_cursor
+from models.payment import Payment
+
+
+def test_connection_rows_are_slotted_records():
+    with get_connection() as conn:
+        conn.execute("INSERT INTO gym (name, address) VALUES ('Centro', 'Calle 1')")
+        row = conn.execute("SELECT id, name AS gym_name, address FROM gym").fetchone()
+        plain = tuple_cursor(conn).execute("SELECT id, name FROM gym").fetchone()
+
+    assert isinstance(row, Record) and not hasattr(row, "__dict__")
+    assert row["gym_name"] == row.gym_name == row[1] == row["GYM_NAME"] == "Centro"
+    assert dict(row) == {"id": 1, "gym_name": "Centro", "address": "Calle 1"}
+    assert tuple(row) == (1, "Centro", "Calle 1") and row.keys() == ["id", "gym_name", "address"]
+    assert pickle.loads(pickle.dumps(row))["address"] == "Calle 1"
+    assert type(plain) is tuple and plain == (1, "Centro")
+
+
+def test_payment_listing_tuple_mode():
+    with get_connection() as conn:
+        conn.execute("INSERT INTO gym (name) VALUES ('Centro')")
+        conn.execute("INSERT INTO user (gym_id, full_name, dni) VALUES (1, 'Ana', '1')")
+        conn.execute("INSERT INTO membership (gym_id, name, duration_months, price) VALUES (1, 'Mensual', 1, 100)")
+        conn.execute("INSERT INTO member_membership (user_id, membership_id) VALUES (1, 1)")
+    Payment.create(1, 100.0, "cash", "signup", current_user_roles=["ADMIN"])
+
+    (record,) = Payment.list_filtered(status="APPROVED")
+    (plain,) = Payment.list_filtered(status="APPROVED", as_tuples=True)
+    assert type(plain) is tuple and plain == tuple(record)
+    assert record["user_id"] == plain[-1] == 1
@@ -0,0 +1,30 @@
+import models.Gym
+import models.membership
+from models.Gym import Gym
+from models.membership import Membership
+from utils.ref_cache import get_reference_cache
+
+
+def test_reads_hit_memory_until_a_write_bumps_the_version(monkeypatch):
+    Gym.create("Centro", current_user_roles=["ADMIN"])
+    Membership.create(1, "Mensual", 1, 100.0, current_user_roles=["ADMIN"])
+    assert [g["name"] for g in Gym.all(["MEMBER"])] == ["Centro"]
+    assert len(Membership.all()) == 1
+
+    def no_sql():
+        raise AssertionError("no debería consultar la base")
+    monkeypatch.setattr(models.Gym, "get_connection", no_sql)
+    monkeypatch.setattr(models.membership, "get_connection", no_sql)
+    assert Gym.all(["ADMIN"])[0]["name"] == "Centro"        # los roles no forman parte de la clave
+    assert len(Membership.all(include_inactive=False)) == 1
+    monkeypatch.undo()
+
+    version = get_reference_cache().version("gym")
+    Gym.update(1, name="Centro Norte", current_user_roles=["ADMIN"])
+    Membership.deactivate(1)
+    assert Gym.find_by_id(1)["name"] == "Centro Norte"
+    assert Membership.all() == []
+
+    stats = get_reference_cache().stats()
+    assert stats["gym"]["hits"] == 1 and stats["gym"]["version"] == version + 1
+    assert stats["membership"]["hit_ratio"] == round(1 / 3, 3)
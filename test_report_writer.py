@@ -0,0 +1,43 @@
+import csv
+import gzip
+import json
+
+from db.connection import get_connection
+from services import report_writer
+
+SERIES = """
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 2500)
+    SELECT i AS id, 'socio ' || i AS member_name, i * 1.5 AS amount FROM n
+"""
+
+
+def test_streams_csv_in_chunks(tmp_path):
+    conn = get_connection()
+    progress = []
+    path = tmp_path / "out.csv"
+    written = report_writer.write_cursor(conn.execute(SERIES), str(path), chunk_size=1000,
+                                         progress=progress.append)
+    conn.close()
+
+    assert written == 2500
+    assert progress == [1000, 2000, 2500]
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "member_name", "amount"]
+    assert rows[-1] == ["2500", "socio 2500", "3750.0"]
+
+
+def test_streams_gzip_jsonl_and_empty_result(tmp_path):
+    conn = get_connection()
+    path = tmp_path / "out.jsonl.gz"
+    report_writer.write_cursor(conn.execute(SERIES), str(path), fmt="jsonl", compress=True)
+    empty = tmp_path / "empty.csv"
+    assert report_writer.write_cursor(conn.execute("SELECT 1 AS x WHERE 0"), str(empty)) == 0
+    conn.close()
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 2500
+    assert lines[0] == {"id": 1, "member_name": "socio 1", "amount": 1.5}
+    assert empty.read_text(encoding="utf-8") == "No data found.\n"
+    assert report_writer.file_extension("jsonl", compress=True) == ".jsonl.gz"
@@ -0,0 +1,64 @@
+import csv
+
+import pytest
+
+from db.connection import configure_database, get_connection
+from db.init_db import init_db
+from services.Report_service import ReportService
+
+
+def _seed(conn):
+    conn.execute("INSERT INTO gym (name) VALUES ('Centro')")
+    conn.execute("INSERT INTO gym (name) VALUES ('Norte')")
+    conn.execute("INSERT INTO user (gym_id, full_name, dni) VALUES (1, 'Admin', 'a')")
+    conn.execute("INSERT INTO user (gym_id, full_name, dni) VALUES (1, 'Socio', 's')")
+    conn.execute("INSERT INTO membership (gym_id, name, duration_months, price) VALUES (1, 'Mensual', 1, 100)")
+    conn.execute("INSERT INTO member_membership (user_id, membership_id) VALUES (2, 1)")
+    conn.executemany("""
+        INSERT INTO payment (member_membership_id, paid_at, amount, method, purpose, status)
+        VALUES (1, ?, 100, ?, 'RENEWAL', ?)
+    """, [("2024-01-31 23:00", "CASH", "APPROVED"), ("2024-02-01 10:00", "CASH", "APPROVED"),
+          ("2024-02-29 21:00", "CARD", "APPROVED"), ("2024-02-15 10:00", "CASH", "REJECTED"),
+          ("2024-03-01 00:00", "CASH", "APPROVED")])
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_finance_filters_are_applied_in_sql(tmp_path, monkeypatch):
+    monkeypatch.setattr(ReportService, "REPORT_DIR", str(tmp_path))
+    with get_connection() as conn:
+        _seed(conn)
+
+    path = ReportService.generate_report(1, 1, "finance", current_user_roles=["ADMIN"],
+                                         date_from="2024-02-01", date_to="2024-02-29",
+                                         method="cash", status="approved")
+    rows = _read(path)
+    assert [(r["day"], r["method"], r["status"]) for r in rows] == [("2024-02-01", "CASH", "APPROVED")]
+    assert "2024-02-01_2024-02-29" in path
+
+    with pytest.raises(ValueError):
+        ReportService.generate_report(1, 1, "PERFORMANCE", current_user_roles=["ADMIN"], method="CASH")
+    with pytest.raises(ValueError):
+        ReportService.generate_report(1, 1, "FINANCE", current_user_roles=["ADMIN"],
+                                      date_from="2024-03-01", date_to="2024-02-01")
+
+
+def test_generate_many_uses_process_pool_on_file_db(tmp_path, monkeypatch):
+    configure_database(str(tmp_path / "reports.db"))
+    init_db()
+    monkeypatch.setattr(ReportService, "REPORT_DIR", str(tmp_path / "out"))
+    with get_connection() as conn:
+        _seed(conn)
+
+    results = ReportService.generate_many([1, 2], ["FINANCE", "SALES"], requested_by=1,
+                                          current_user_roles=["ADMIN"], max_workers=2,
+                                          date_from="2024-02-01", date_to="2024-02-29")
+    by_job = {(r["gym_id"], r["kind"]): r for r in results}
+    assert by_job[(1, "FINANCE")]["rows"] == 3
+    assert by_job[(2, "FINANCE")]["rows"] == 0
+    assert _read(by_job[(1, "SALES")]["file_path"])[0]["total_revenue"] == "300"
+    with get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM report").fetchone()[0] == 4
@@ -0,0 +1,61 @@
+from db.connection import get_connection
+from db.rollups import rebuild_rollups, refresh_rollups
+
+
+def _seed(conn):
+    conn.execute("INSERT INTO gym (name) VALUES ('Centro')")
+    conn.execute("INSERT INTO user (gym_id, full_name, dni) VALUES (1, 'Trainer', 't')")
+    conn.execute("INSERT INTO user (gym_id, full_name, dni) VALUES (1, 'Socio', 's')")
+    conn.execute("INSERT INTO membership (gym_id, name, duration_months, price) VALUES (1, 'Mensual', 1, 100)")
+    conn.execute("INSERT INTO member_membership (user_id, membership_id) VALUES (2, 1)")
+    conn.execute("""
+        INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity)
+        VALUES (1, 1, 'Yoga', '2024-01-01 07:00', '2024-01-01 08:00', 10)
+    """)
+    conn.execute("INSERT INTO booking (class_id, member_id) VALUES (1, 2)")
+
+
+def _snapshot(conn):
+    return (
+        conn.execute("SELECT * FROM rollup_revenue_daily ORDER BY 1, 2, 3, 4, 5, 6").fetchall(),
+        conn.execute("SELECT * FROM rollup_attendance_daily ORDER BY 1, 2").fetchall(),
+        conn.execute("SELECT * FROM rollup_trainer_plans WHERE total_plans > 0 ORDER BY 1").fetchall(),
+    )
+
+
+def test_incremental_refresh_matches_full_rebuild():
+    with get_connection() as conn:
+        _seed(conn)
+        conn.executemany("""
+            INSERT INTO payment (member_membership_id, paid_at, amount, method, purpose, status)
+            VALUES (1, ?, ?, ?, 'RENEWAL', 'PENDING')
+        """, [(f"2024-01-0{d} 10:00", 100, m) for d in (1, 2) for m in ("CASH", "CARD", "CASH")])
+        conn.execute("INSERT INTO attendance (booking_id, present, checked_at) VALUES (1, 0, '2024-01-01 07:05')")
+        conn.execute("INSERT INTO training_plan (trainer_id, member_id, goal) VALUES (1, 2, 'Fuerza')")
+
+    assert refresh_rollups(batch_size=4) == {"revenue_daily": 6, "attendance_daily": 1, "trainer_plans": 1}
+    assert refresh_rollups() == {"revenue_daily": 0, "attendance_daily": 0, "trainer_plans": 0}
+
+    with get_connection() as conn:
+        # Cambios sobre filas ya procesadas (triggers) y filas nuevas (próximo refresco)
+        conn.execute("UPDATE payment SET status = 'APPROVED' WHERE id IN (1, 4)")
+        conn.execute("DELETE FROM payment WHERE id = 2")
+        conn.execute("UPDATE attendance SET present = 1 WHERE id = 1")
+        conn.execute("UPDATE training_plan SET status = 'CLOSED' WHERE id = 1")
+        conn.execute("""
+            INSERT INTO payment (member_membership_id, paid_at, amount, method, purpose, status)
+            VALUES (1, '2024-01-03 10:00', 50, 'TRANSFER', 'DEBT', 'APPROVED')
+        """)
+    refresh_rollups()
+    with get_connection() as conn:
+        incremental = _snapshot(conn)
+        revenue = conn.execute("""
+            SELECT status, SUM(payments), SUM(amount) FROM rollup_revenue_daily GROUP BY status ORDER BY status
+        """).fetchall()
+
+    rebuild_rollups()
+    with get_connection() as conn:
+        assert [list(map(tuple, t)) for t in _snapshot(conn)] == [list(map(tuple, t)) for t in incremental]
+    assert [tuple(r) for r in revenue] == [("APPROVED", 3, 250), ("PENDING", 3, 300)]
+    assert [tuple(r)[3:] for r in incremental[1]] == [(1, 0)]
+    assert [tuple(r) for r in incremental[2]] == [(1, 1, 1)]
@@ -0,0 +1,80 @@
+from datetime import date, datetime
+
+import pytest
+
+from db.connection import get_connection
+from models.Class_session import ClassSession
+from models.class_template import ClassTemplate
+
+ADMIN = dict(current_user_id=99, current_user_roles=["ADMIN"])
+
+
+def _seed():
+    """Yoga del usuario 1 en la Sala 1; el usuario 2 hace de segundo entrenador."""
+    ClassSession.create(1, 1, "Yoga", "2099-01-05 10:00", "2099-01-05 11:00", 10, "Sala 1", **ADMIN)
+
+
+def test_create_rejects_trainer_and_room_overlaps(users):
+    _seed()
+    with pytest.raises(ValueError, match="entrenador"):
+        ClassSession.create(1, 1, "Spinning", "2099-01-05 10:30", "2099-01-05 11:30", 10, "Sala 2", **ADMIN)
+    with pytest.raises(ValueError, match="Sala 1"):
+        ClassSession.create(1, 2, "Pilates", "2099-01-05 09:30", "2099-01-05 10:15", 10, "Sala 1", **ADMIN)
+    # Pegada a continuación no choca
+    ClassSession.create(1, 2, "Pilates", "2099-01-05 11:00", "2099-01-05 12:00", 10, "Sala 1", **ADMIN)
+    with pytest.raises(ValueError, match="Sala 1"):
+        ClassSession.update(2, start_at="2099-01-05 10:30", **ADMIN)
+
+
+def test_validate_timetable_checks_batch_and_existing_classes(users):
+    _seed()
+    week = [
+        {"trainer_id": 2, "room": "Sala 2", "start_at": "2099-01-06 10:00", "end_at": "2099-01-06 11:00"},
+        {"trainer_id": 2, "room": "Sala 3", "start_at": "2099-01-06 10:30", "end_at": "2099-01-06 11:30"},
+        {"trainer_id": 2, "room": "Sala 1", "start_at": "2099-01-05 10:45", "end_at": "2099-01-05 11:15"},
+        {"trainer_id": 1, "room": "Sala 2", "start_at": "2099-01-07 10:00", "end_at": "2099-01-07 11:00"},
+        {"trainer_id": 1, "start_at": "2099-01-07 12:00", "end_at": "2099-01-07 11:00"},
+    ]
+    problems = ClassSession.validate_timetable(1, week)
+    assert [(p["index"], p["conflict"], p["with_index"], p["with_class_id"]) for p in problems] == [
+        (1, "TRAINER", 0, None),
+        (2, "ROOM", None, 1),
+        (4, "INVALID", None, None),
+    ]
+
+
+def test_template_generation_is_incremental_and_idempotent(users):
+    _seed()   # Yoga: lun 2099-01-05 10:00-11:00, Sala 1, entrenador 1
+    template_id = ClassTemplate.create(1, 2, "Spinning", "lun/mie/vie", "10:30", 60, 20, "Sala 1", **ADMIN)
+    monday = date(2099, 1, 5)
+
+    first = ClassTemplate.generate(template_id, weeks=1, today=monday)
+    # Semana del lun 5 al dom 11: lun 5 choca con Yoga en la Sala 1; quedan mié 7 y vie 9
+    assert first["created"] == 2 and [c["start_at"] for c in first["conflicts"]] == ["2099-01-05 10:30"]
+    again = ClassTemplate.generate(template_id, weeks=1, today=monday)
+    assert again["created"] == 0 and len(again["conflicts"]) == 1   # el rechazado se reintenta
+
+    second = ClassTemplate.generate(weeks=2, today=monday)
+    assert second["created"] == 3   # solo la semana nueva
+    with get_connection() as conn:
+        starts = [r[0] for r in conn.execute(
+            "SELECT start_at FROM class WHERE template_id = ? ORDER BY start_at", (template_id,))]
+    assert len(starts) == len(set(starts)) == 5 and starts[-1] == "2099-01-16 10:30"
+
+    # Sin el Yoga, el horario rechazado se crea en la próxima corrida
+    with get_connection() as conn:
+        conn.execute("DELETE FROM class WHERE template_id IS NULL")
+    third = ClassTemplate.generate(weeks=2, today=monday)
+    assert third["templates"] == 1 and third["created"] == 1 and not third["conflicts"]
+
+
+def test_template_generation_excludes_horizon_day_and_past_slots(users):
+    _seed()
+    early = ClassTemplate.create(1, 2, "Pilates", "lun", "07:00", 60, 10, "Sala 2", **ADMIN)
+    result = ClassTemplate.generate(early, weeks=1, now=datetime(2099, 1, 5, 6, 0))
+    with get_connection() as conn:
+        starts = [r[0] for r in conn.execute("SELECT start_at FROM class WHERE template_id = ?", (early,))]
+    assert result["created"] == 1 and starts == ["2099-01-05 07:00"]   # el lun 12 ya es otra semana
+
+    late = ClassTemplate.create(1, 1, "Stretching", "lun", "07:00", 60, 10, "Sala 3", **ADMIN)
+    assert ClassTemplate.generate(late, weeks=1, now=datetime(2099, 1, 5, 12, 0))["created"] == 0   # ya pasó
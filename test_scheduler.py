@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from db.connection import get_connection
+from services.scheduler import (DEFAULT_JOBS, Scheduler, build_scheduler, cleanup_waitlists,
+                               complete_classes, expire_memberships)
+
+NOW = datetime(2099, 1, 10, 12, 0)
+
+
+def _seed():
+    """Cuatro clases con Ana reservada y Beto en espera; membresías vencidas, pausadas y vigentes."""
+    with get_connection() as conn:
+        for start, end in [("2099-01-09 08:00", "2099-01-09 09:00"), ("2099-01-10 11:00", "2099-01-10 13:00"),
+                           ("2099-01-10 13:00", "2099-01-10 14:00"), ("2099-02-01 10:00", "2099-02-01 11:00")]:
+            class_id = conn.execute("""
+                INSERT INTO class (gym_id, trainer_id, name, start_at, end_at, capacity)
+                VALUES (1, 1, 'Funcional', ?, ?, 1)
+            """, (start, end)).lastrowid
+            conn.execute("INSERT INTO booking (class_id, member_id) VALUES (?, 2)", (class_id,))
+            conn.execute("INSERT INTO booking (class_id, member_id, status) VALUES (?, 3, 'WAITLIST')", (class_id,))
+
+        conn.execute("INSERT INTO membership (gym_id, name, duration_months, price) VALUES (1, 'Mensual', 1, 100)")
+        conn.executemany("INSERT INTO member_membership (user_id, membership_id, end_date, status) VALUES (?, 1, ?, ?)",
+                         [(2, "2000-01-01 00:00:00", "ACTIVE"), (3, "2000-01-01 00:00:00", "PAUSED"),
+                          (1, "2000-02-01 00:00:00", "ACTIVE"), (1, "2999-01-01 00:00:00", "ACTIVE")])
+
+
+def test_maintenance_jobs_update_in_batches(users):
+    _seed()
+    assert complete_classes(batch_size=1, now=NOW) == 1          # solo la que ya terminó
+    assert complete_classes(batch_size=1, now=NOW) == 0
+    assert cleanup_waitlists(batch_size=1, now=NOW) == 2          # las dos que ya empezaron
+    assert expire_memberships(batch_size=1) == 2
+
+    with get_connection() as conn:
+        statuses = [r["status"] for r in conn.execute("SELECT status FROM class ORDER BY id")]
+        waitlists = [r["waitlist_count"] for r in conn.execute("SELECT waitlist_count FROM class ORDER BY id")]
+        active = conn.execute("SELECT COUNT(*) FROM member_membership WHERE status = 'ACTIVE'").fetchone()[0]
+    assert statuses == ["COMPLETED", "SCHEDULED", "SCHEDULED", "SCHEDULED"]
+    assert waitlists == [0, 0, 1, 1]
+    assert active == 1
+
+
+def test_scheduler_records_duration_rows_and_failures():
+    scheduler = Scheduler()
+    scheduler.add("ok", lambda: 3, interval=3600)
+    scheduler.add("broken", lambda: 1 / 0, interval=3600)
+    scheduler.add("later", lambda: 1, interval=3600, initial_delay=3600)
+
+    assert scheduler.run_pending() == {"ok": 3, "broken": None}
+    assert scheduler.run_pending() == {}                          # nada vencido hasta el próximo intervalo
+
+    stats = scheduler.stats()
+    assert stats["ok"]["runs"] == 1 and stats["ok"]["rows"] == 3 and stats["ok"]["last_duration_ms"] is not None
+    assert stats["broken"]["failures"] == 1 and "division" in stats["broken"]["last_error"]
+    assert stats["later"]["runs"] == 0
+
+    with get_connection() as conn:
+        rows = {r["name"]: r for r in conn.execute("SELECT * FROM job_stats")}
+    assert rows["ok"]["runs"] == 1 and rows["ok"]["rows_total"] == 3
+    assert rows["broken"]["failures"] == 1 and rows["broken"]["last_rows"] is None
+
+
+def test_default_jobs_run_on_empty_database():
+    results = build_scheduler().run_pending()
+    assert set(results) == set(DEFAULT_JOBS)
+    assert all(rows == 0 for rows in results.values())
@@ -0,0 +1,45 @@
+import pytest
+
+from db.connection import get_connection
+from models.User_role import UserRole
+from models.user import User
+from services.auth_service import AuthService
+from utils.session_store import get_session_store
+
+
+def test_session_cache_is_invalidated_on_role_and_status_changes():
+    with get_connection() as conn:
+        conn.execute("INSERT INTO gym (name) VALUES ('Centro')")
+        conn.execute("INSERT INTO role (code, name) VALUES ('MEMBER', 'Socio'), ('TRAINER', 'Profe')")
+    AuthService.register("Ana", "100", "555", "secreto", 1)
+
+    session = AuthService.start_session("100", "secreto")
+    assert session["roles"] == frozenset({"MEMBER"})
+    store = get_session_store()
+    hits = store.stats()["hits"]
+
+    first = AuthService.resolve_session(session["token"])
+    assert AuthService.resolve_session(session["token"]) is first
+    assert store.stats()["hits"] == hits + 1
+
+    UserRole.assign_user_role(first.user_id, "TRAINER")
+    assert AuthService.resolve_session(session["token"]).roles == frozenset({"MEMBER", "TRAINER"})
+
+    User.deactivate(first.user_id)
+    with pytest.raises(PermissionError):
+        AuthService.resolve_session(session["token"])
+    with pytest.raises(PermissionError):
+        AuthService.resolve_session(session["token"])  # el token quedó revocado
+
+
+def test_expired_and_unknown_tokens_are_rejected():
+    with get_connection() as conn:
+        conn.execute("INSERT INTO gym (name) VALUES ('Centro')")
+        conn.execute("INSERT INTO user (gym_id, full_name, dni) VALUES (1, 'Ana', '1')")
+    store = get_session_store()
+    token = store.issue(1)
+    store._tokens[token] = (1, 0)  # vencido
+    with pytest.raises(PermissionError, match="venció"):
+        store.resolve(token)
+    with pytest.raises(PermissionError):
+        store.resolve("no-existe")
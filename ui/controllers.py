@@ -3,10 +3,12 @@ from services.Class_service import ClassService
 from services.Training_service import TrainingService
 from services.Payment_service import PaymentService
 from services.Report_service import ReportService
+from services.attendance_analytics import AttendanceAnalytics
 from services.Gym import Gym
 from models.User import User
 from models.Booking import Booking
 from models.Trainer_assigment import TrainerAssignment
+import datetime
 
 class Controllers:
     """
@@ -170,9 +172,10 @@ class Controllers:
                 print("1. Listar mis clases")
                 print("2. Ver todas las clases")
                 print("3. Crear nueva clase")
-                print("4. Volver al menú principal")
+                print("4. Crear clase recurrente (todas las semanas)")
+                print("5. Volver al menú principal")
                 
-                class_opt = input("\nElegí una opción (1-4): ")
+                class_opt = input("\nElegí una opción (1-5): ")
                 
                 if class_opt == "1":
                     print("\n📋 Mis clases:")
@@ -232,13 +235,37 @@ class Controllers:
                             ClassService.create_class(
                                 self.session["gym_id"], 
                                 self.session["user_id"], 
-                                name, start, end, capacity, room
+                                name, start, end, capacity, room,
+                                current_user_id=self.session["user_id"],
+                                current_user_roles=self.session["roles"]
                             )
                             print("✅ Clase creada exitosamente!")
                     except Exception as e:
                         print(f"❗ Error: {str(e)}")
                 
                 elif class_opt == "4":
+                    print("\n🔁 Crear clase recurrente:")
+                    try:
+                        name = input("Nombre: ").strip()
+                        weekdays = input("Días (ej: lun/mie/vie): ").strip()
+                        start_time = input("Hora de inicio (HH:MM): ").strip()
+                        duration = int(input("Duración (minutos): "))
+                        capacity = int(input("Capacidad (número de alumnos): "))
+                        room = input("Sala: ").strip()
+                        weeks = int(input("Semanas a generar: ") or 4)
+                        result = ClassService.create_recurring_class(
+                            self.session["gym_id"],
+                            self.session["user_id"],
+                            name, weekdays, start_time, duration, capacity, room, weeks,
+                            current_user_id=self.session["user_id"],
+                            current_user_roles=self.session["roles"]
+                        )
+                        for c in result["conflicts"]:
+                            print(f"   ⏭️ {c['start_at']}: {c['message']}")
+                    except ValueError as e:
+                        print(f"❗ Error: {str(e)}")
+
+                elif class_opt == "5":
                     break
                 
                 else:
@@ -353,7 +380,8 @@ class Controllers:
                             status_icon = "✅" if b['status'] == "BOOKED" else "⏳" if b['status'] == "WAITLIST" else "❌"
                             print(f"{b['member_id']}. {status_icon} {b['member_name']} - {b['status']}")
                             
-                        # Marcar asistencia
+                        # Marcar asistencia: se juntan las marcas y se guardan todas juntas al terminar
+                        marks = {}
                         while True:
                             member_id = input("\nID del miembro (Enter para terminar): ")
                             if not member_id:
@@ -372,17 +400,22 @@ class Controllers:
                                 # Obtener el booking_id correcto de la lista de reservas
                                 booking = next((b for b in bookings if b['member_id'] == mid), None)
                                 if booking:
-                                    ClassService.mark_attendance(
-                                        booking_id=booking['id'],
-                                        present=present,
-                                        current_user_id=self.session["user_id"],
-                                        current_user_roles=self.session["roles"]
-                                    )
+                                    marks[booking['id']] = present
                                 else:
                                     print("❌ Error: No se encontró la reserva")
                                 
                             except ValueError:
                                 print("❗ El ID debe ser un número")
+
+                        if marks:
+                            outcomes = ClassService.mark_class_attendance(
+                                cid, marks,
+                                current_user_id=self.session["user_id"],
+                                current_user_roles=self.session["roles"]
+                            )
+                            for b in bookings:
+                                if outcomes.get(b['id']) == "NOT_BOOKED":
+                                    print(f"⚠️ {b['member_name']}: solo se marca asistencia de reservas BOOKED.")
                                 
                     except ValueError:
                         print("❗ El ID de la clase debe ser un número")
@@ -554,6 +587,28 @@ class Controllers:
         else:
             print("⚠️ Opción no reconocida.")
 
+    # ========== HELPERS ==========
+    @staticmethod
+    def _page_through(fetch, show, empty_message="❗ No hay resultados."):
+        """
+        Muestra un listado paginado por cursor: fetch(after) devuelve una Page (db/pagination.py)
+        y show(fila) imprime una fila. Enter trae la página siguiente, 'q' corta.
+        """
+        after, shown = None, 0
+        while True:
+            page = fetch(after)
+            if not page and shown == 0:
+                print(empty_message)
+                return
+            for row in page:
+                show(row)
+            shown += len(page)
+            if page.next_cursor is None:
+                return
+            if input(f"\n-- {shown} mostrados. Enter para ver más, 'q' para salir: ").strip().lower() == "q":
+                return
+            after = page.next_cursor
+
     # ========== ADMIN ==========
     def admin_actions(self, opt: str):
         if opt == "1":
@@ -625,8 +680,8 @@ class Controllers:
                 
                 if user_opt == "1":
                     print("\n📋 Lista de todos los usuarios:")
-                    users = User.list_all_users()
-                    for u in users:
+
+                    def show_user(u):
                         status = "✅ Activo" if u['status'] == "ACTIVE" else "❌ Inactivo"
                         roles = u['roles'].split(',') if u['roles'] else ["NO-ROLE"]
                         role_icons = []
@@ -641,6 +696,9 @@ class Controllers:
                                 role_icons.append("❓")
                         role_display = " ".join([f"{icon} {role}" for icon, role in zip(role_icons, roles)])
                         print(f"{u['id']}. {u['full_name']} - {role_display} - {status}")
+
+                    self._page_through(lambda after: User.list_all_users(after=after), show_user,
+                                       "❗ No hay usuarios registrados.")
                         
                 elif user_opt == "2":
                     print("\n📋 Usuarios activos:")
@@ -802,13 +860,14 @@ class Controllers:
                 
                 if assign_opt == "1":
                     print("\n📋 Asignaciones actuales:")
-                    assignments = TrainerAssignment.list_all_assignments(self.session["user_id"], self.session["roles"])
-                    if not assignments:
-                        print("❗ No hay asignaciones registradas.")
-                    else:
-                        for a in assignments:
-                            status = "✅ Activa" if a['status'] == "ACTIVE" else "❌ Inactiva"
-                            print(f"{a['id']}. 🏋️‍♂️ {a['trainer']} → 👤 {a['member']} - {status}")
+                    def show_assignment(a):
+                        status = "✅ Activa" if a['status'] == "ACTIVE" else "❌ Inactiva"
+                        print(f"{a['id']}. 🏋️‍♂️ {a['trainer']} → 👤 {a['member']} - {status}")
+
+                    self._page_through(
+                        lambda after: TrainerAssignment.list_all_assignments(
+                            self.session["user_id"], self.session["roles"], after=after),
+                        show_assignment, "❗ No hay asignaciones registradas.")
                 
                 elif assign_opt == "2":
                     print("\n✨ Nueva asignación:")
@@ -873,13 +932,12 @@ class Controllers:
                 
                 if payment_opt == "1":
                     print("\n📋 Lista de todos los pagos:")
-                    payments = PaymentService.list_all_payments(self.session["roles"])
-                    if not payments:
-                        print("❗ No hay pagos registrados.")
-                    else:
-                        for p in payments:
-                            status_icon = "✅" if p['status'] == "APPROVED" else "⏳" if p['status'] == "PENDING" else "❌"
-                            print(f"{p['id']}. {p['member_name']} - ${p['amount']} - {p['method']} - {status_icon} {p['status']}")
+                    def show_payment(p):
+                        status_icon = "✅" if p['status'] == "APPROVED" else "⏳" if p['status'] == "PENDING" else "❌"
+                        print(f"{p['id']}. {p['member_name']} - ${p['amount']} - {p['method']} - {status_icon} {p['status']}")
+
+                    self._page_through(lambda after: PaymentService.list_all_payments(self.session["roles"], after=after),
+                                       show_payment, "❗ No hay pagos registrados.")
                 
                 elif payment_opt == "2":
                     print("\n✨ Registrar nuevo pago:")
@@ -1009,13 +1067,22 @@ class Controllers:
                     
                     period = input("\nElegí el período (1-4): ")
                     params = {}
+                    today = datetime.date.today()
+                    start, end = None, today
                     
-                    if period == "4":
+                    if period == "1":
+                        start = today - datetime.timedelta(days=30)
+                    elif period == "2":
+                        start = today - datetime.timedelta(days=90)
+                    elif period == "3":
+                        start = today - datetime.timedelta(days=365)
+                    elif period == "4":
                         start = input("Fecha inicio (YYYY-MM-DD): ")
                         end = input("Fecha fin (YYYY-MM-DD): ")
                         params = {"start_date": start, "end_date": end}
                     
-                    ReportService.generate_report(self.session["gym_id"], self.session["user_id"], "FINANCE", params, self.session["roles"])
+                    ReportService.generate_report(self.session["gym_id"], self.session["user_id"], "FINANCE", params, self.session["roles"],
+                                                  date_from=start, date_to=end)
                 
                 elif report_opt == "2":
                     print("\n👥 Generando Reporte de Asistencias")
@@ -1040,7 +1107,8 @@ class Controllers:
                         member_id = input("\nID del miembro: ")
                         params["member_id"] = member_id
                     
-                    ReportService.generate_report(self.session["gym_id"], self.session["user_id"], "ATTENDANCE", params, self.session["roles"])
+                    ReportService.generate_report(self.session["gym_id"], self.session["user_id"], "ATTENDANCE", params, self.session["roles"],
+                                                  class_id=params.get("class_id"))
                 
                 elif report_opt == "3":
                     print("\n📈 Generando Reporte de Ocupación")
@@ -1085,6 +1153,23 @@ class Controllers:
                     print("⚠️ Opción no válida")
                 
                 input("\nPresiona Enter para continuar...")
+
+        elif opt == "8":
+            gym_id, uid, roles = self.session["gym_id"], self.session["user_id"], self.session["roles"]
+            print("\n📈 Socios con más faltazos:")
+            for m in AttendanceAnalytics.top_no_shows(gym_id, current_user_id=uid, current_user_roles=roles):
+                print(f"{m['member_id']}. {m['full_name']} - {m['no_shows']} de {m['booked']} "
+                      f"({m['no_show_rate']:.0%})")
+            print("\n🔥 Rachas de 10 semanas o más:")
+            for m in AttendanceAnalytics.streaks(gym_id, current_user_id=uid, current_user_roles=roles):
+                print(f"{m['member_id']}. {m['full_name']} - {m['current_streak']} semanas "
+                      f"(máxima: {m['longest_streak']})")
+            print("\n🏷️ Asistencia por clase (últimas 10):")
+            for c in AttendanceAnalytics.class_stats(gym_id, current_user_id=uid, current_user_roles=roles)[:10]:
+                ratio = "-" if c["attendance_ratio"] is None else f"{c['attendance_ratio']:.0%}"
+                series = "-" if c["series_ratio"] is None else f"{c['series_ratio']:.0%}"
+                print(f"{c['class_id']}. {c['name']} ({c['start_at']}) - {c['attended']}/{c['booked']} "
+                      f"= {ratio} (promedio de la serie: {series})")
                 
         else:
             print("⚠️ Opción no reconocida.")
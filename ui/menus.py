@@ -1,5 +1,6 @@
 import os
 import sys
+from utils.roles import normalize_roles
 
 # ---------- Helpers de UI ----------
 def clear():
@@ -86,9 +87,10 @@ def show_admin_menu(user_name: str) -> str:
     print("5) Pagos (registrar / listar)")
     print("6) Clases (listar)")
     print("7) Reportes (generar / listar)")
+    print("8) Analítica de asistencia (faltazos / rachas)")
     print("9) Cerrar sesión")
     print("0) Salir del sistema")
-    return ask_option({"1", "2", "3", "4", "5", "6", "7", "9", "0"})
+    return ask_option({"1", "2", "3", "4", "5", "6", "7", "8", "9", "0"})
 
 # ---------- Router por rol ----------
 def show_menu_for_roles(session: dict) -> tuple[str, str]:
@@ -97,7 +99,7 @@ def show_menu_for_roles(session: dict) -> tuple[str, str]:
     Prioriza ADMIN > TRAINER > MEMBER.
     session esperado: {"full_name": str, "roles": [..]}
     """
-    roles = {r.upper() for r in (session.get("roles") or [])}
+    roles = normalize_roles(session.get("roles"))
     name = session.get("full_name", "Usuario")
 
     if "ADMIN" in roles:
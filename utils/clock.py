@@ -0,0 +1,19 @@
+# utils/clock.py
+from datetime import datetime
+
+# Formato de class.start_at / end_at: hora local del gimnasio, tal como se carga en la UI.
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def local_now(now: datetime | None = None) -> datetime:
+    """
+    "Ahora" en hora local. Todo lo que compara contra start_at / end_at (reservas, faltazos,
+    tareas programadas, migraciones) usa esto y no CURRENT_TIMESTAMP de SQLite, que es UTC.
+    `now` permite fijar la hora en tests y jobs.
+    """
+    return now or datetime.now()
+
+
+def now_str(now: datetime | None = None) -> str:
+    """local_now() en el formato de class.start_at, listo para pasar como parámetro SQL."""
+    return local_now(now).strftime(DATETIME_FORMAT)
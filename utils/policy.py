@@ -0,0 +1,269 @@
+# utils/policy.py
+import functools
+import inspect
+import os
+import threading
+import time
+
+from db.connection import get_connection
+from utils.roles import normalize_roles
+
+# Cuánto se confía en el conjunto de ids "propios" de un usuario antes de releerlo.
+OWNERSHIP_TTL = float(os.environ.get("SMARTFIT_OWNERSHIP_TTL", 60))
+
+ALLOW = "ALLOW"   # el rol alcanza
+SELF = "SELF"     # el rol alcanza si la acción es sobre el propio usuario (subject_id == current_user_id)
+
+
+def owner(kind: str):
+    """El rol alcanza si target_id pertenece al usuario (ver _OWNERSHIP_QUERIES)."""
+    return ("OWNER", kind)
+
+
+# (recurso, acción) -> ({rol: ALLOW | SELF | owner(kind)}, mensaje si se niega)
+RULES = {
+    # --- Reservas ---
+    ("booking", "create"): ({"ADMIN": ALLOW, "MEMBER": SELF},
+                           "🚫 No tenés permiso para reservar para otro usuario."),
+    ("booking", "cancel"): ({"ADMIN": ALLOW, "MEMBER": SELF, "TRAINER": owner("class")},
+                           "🚫 No tenés permiso para cancelar esta reserva."),
+    ("booking", "list_by_class"): ({"ADMIN": ALLOW, "TRAINER": owner("class"), "ENTRENADOR": owner("class"),
+                                   "MEMBER": ALLOW},
+                                  "🚫 No podés ver reservas de clases que no dictás."),
+    ("booking", "list_by_user"): ({"ADMIN": ALLOW, "MEMBER": SELF},
+                                 "🚫 No podés ver reservas de otro usuario."),
+    ("booking_ban", "lift"): ({"ADMIN": ALLOW}, "🚫 Solo los administradores pueden levantar bloqueos de reserva."),
+
+    # --- Clases ---
+    ("class", "create"): ({"ADMIN": ALLOW, "TRAINER": SELF},
+                         "🚫 Un entrenador solo puede crear clases asignadas a su propio ID."),
+    ("class", "list"): ({"ADMIN": ALLOW, "TRAINER": ALLOW, "MEMBER": ALLOW},
+                       "🚫 Rol no autorizado para ver clases."),
+    ("class", "update"): ({"ADMIN": ALLOW, "TRAINER": owner("class")},
+                         "🚫 No podés modificar clases que no te pertenecen."),
+    ("class", "delete"): ({"ADMIN": ALLOW, "TRAINER": owner("class")},
+                         "🚫 No podés eliminar clases que no son tuyas."),
+
+    # --- Asistencia ---
+    ("attendance", "mark"): ({"ADMIN": ALLOW, "TRAINER": owner("class")},
+                            "🚫 No podés marcar asistencia en clases ajenas."),
+    ("attendance", "list_by_class"): ({"ADMIN": ALLOW, "TRAINER": owner("class")},
+                                     "🚫 Solo entrenadores o administradores pueden ver asistencias por clase."),
+    ("attendance", "list_by_member"): ({"ADMIN": ALLOW, "MEMBER": SELF},
+                                      "🚫 No podés ver asistencias de otro usuario."),
+    ("attendance", "delete"): ({"ADMIN": ALLOW},
+                              "🚫 Solo administradores pueden eliminar registros de asistencia."),
+    ("attendance", "ingest"): ({"ADMIN": ALLOW},
+                              "🚫 Solo administradores pueden cargar fichadas de molinete o QR."),
+
+    # --- Planes y rutinas ---
+    ("plan", "create"): ({"ADMIN": ALLOW, "TRAINER": SELF},
+                        "🚫 Un entrenador solo puede crear planes asignados a su propio ID."),
+    ("plan", "list"): ({"ADMIN": ALLOW, "TRAINER": ALLOW, "MEMBER": ALLOW},
+                      "🚫 Rol no autorizado para ver planes."),
+    ("plan", "list_by_member"): ({"ADMIN": ALLOW, "TRAINER": ALLOW, "MEMBER": SELF},
+                                "🚫 No podés ver los planes de otro usuario."),
+    ("plan", "update"): ({"ADMIN": ALLOW, "TRAINER": owner("plan")},
+                        "🚫 No podés modificar un plan que no creaste."),
+    ("routine", "create"): ({"ADMIN": ALLOW, "TRAINER": owner("plan")},
+                           "🚫 No podés crear rutinas en planes que no te pertenecen."),
+    ("routine", "list_by_plan"): ({"ADMIN": ALLOW, "TRAINER": owner("plan"), "MEMBER": owner("member_plan")},
+                                 "🚫 No podés ver rutinas de planes ajenos."),
+    ("routine", "update"): ({"ADMIN": ALLOW, "TRAINER": owner("routine")},
+                           "🚫 No podés modificar rutinas de otros entrenadores."),
+    ("routine", "delete"): ({"ADMIN": ALLOW, "TRAINER": owner("routine")},
+                           "🚫 No podés eliminar rutinas que no son tuyas."),
+
+    # --- Administración ---
+    ("gym", "create"): ({"ADMIN": ALLOW}, "🚫 Solo el administrador puede crear gimnasios."),
+    ("gym", "update"): ({"ADMIN": ALLOW}, "🚫 Solo el administrador puede modificar gimnasios."),
+    ("gym", "delete"): ({"ADMIN": ALLOW}, "🚫 Solo el administrador puede eliminar gimnasios."),
+    ("payment", "create"): ({"ADMIN": ALLOW}, "🚫 Solo un usuario con rol ADMIN puede registrar pagos."),
+    ("payment", "update_status"): ({"ADMIN": ALLOW},
+                                  "🚫 Solo un usuario con rol ADMIN puede cambiar el estado de un pago."),
+    ("membership", "create"): ({"ADMIN": ALLOW}, "🚫 Solo administradores pueden crear membresías."),
+    ("member_membership", "create"): ({"ADMIN": ALLOW, "MEMBER": SELF, "TRAINER": SELF},
+                                     "🚫 No tenés permiso para asignar membresías a otros usuarios."),
+    ("member_membership", "update_status"): ({"ADMIN": ALLOW},
+                                            "🚫 Solo un usuario con rol ADMIN puede cambiar el estado de una membresía."),
+    ("report", "create"): ({"ADMIN": ALLOW}, "🚫 Solo los administradores pueden generar reportes."),
+    ("report", "list"): ({"ADMIN": ALLOW, "TRAINER": ALLOW}, "🚫 No tenés permiso para ver reportes."),
+    ("report", "view"): ({"ADMIN": ALLOW, "TRAINER": SELF}, "🚫 No podés ver este reporte."),
+    ("report", "update"): ({"ADMIN": ALLOW}, "🚫 Solo los administradores pueden modificar reportes."),
+    ("report", "delete"): ({"ADMIN": ALLOW}, "🚫 Solo los administradores pueden eliminar reportes."),
+    ("analytics", "view"): ({"ADMIN": ALLOW, "TRAINER": ALLOW},
+                           "🚫 Solo entrenadores o administradores pueden ver la analítica de asistencia."),
+    ("assignment", "list"): ({"ADMIN": ALLOW, "TRAINER": ALLOW, "MEMBER": ALLOW}, "🚫 Rol no autorizado."),
+    ("assignment", "update"): ({"ADMIN": ALLOW}, "🚫 Solo el administrador puede modificar asignaciones."),
+    ("assignment", "delete"): ({"ADMIN": ALLOW}, "🚫 Solo el administrador puede eliminar asignaciones."),
+}
+
+# Una consulta por (tipo, usuario): devuelve TODOS los ids propios, que después se cachean.
+_OWNERSHIP_QUERIES = {
+    "class": "SELECT id FROM class WHERE trainer_id = ?",
+    "plan": "SELECT id FROM training_plan WHERE trainer_id = ?",
+    "member_plan": "SELECT id FROM training_plan WHERE member_id = ?",
+    "routine": """
+        SELECT r.id FROM routine r
+        JOIN training_plan tp ON tp.id = r.plan_id
+        WHERE tp.trainer_id = ?
+    """,
+}
+
+
+class _Rule:
+    """Regla compilada: conjuntos de roles por tipo de chequeo, resueltos una sola vez al importar."""
+    __slots__ = ("allow", "self_roles", "owners", "message")
+
+    def __init__(self, grants: dict, message: str):
+        for role, grant in grants.items():
+            if grant not in (ALLOW, SELF) and not (isinstance(grant, tuple) and grant[1] in _OWNERSHIP_QUERIES):
+                raise ValueError(f"Regla inválida para {role}: {grant!r}")
+        self.allow = frozenset(r for r, g in grants.items() if g == ALLOW)
+        self.self_roles = frozenset(r for r, g in grants.items() if g == SELF)
+        self.owners = tuple((r, g[1]) for r, g in grants.items() if isinstance(g, tuple))
+        self.message = message
+
+
+_COMPILED = {key: _Rule(grants, message) for key, (grants, message) in RULES.items()}
+
+_lock = threading.Lock()
+_owned = {}   # (kind, user_id) -> (frozenset de ids, cargado_en)
+_stats = {"checks": 0, "denied": 0, "owner_hits": 0, "owner_misses": 0}
+
+
+# ---------- OWNERSHIP ----------
+def _load_owned(kind: str, user_id: int) -> frozenset:
+    conn = get_connection()
+    try:
+        ids = frozenset(row[0] for row in conn.execute(_OWNERSHIP_QUERIES[kind], (user_id,)))
+    finally:
+        conn.close()
+    with _lock:
+        _owned[(kind, user_id)] = (ids, time.monotonic())
+        _stats["owner_misses"] += 1
+    return ids
+
+
+def owned_ids(kind: str, user_id: int) -> frozenset:
+    """Ids que pertenecen al usuario (clases/planes/rutinas que dicta, planes propios)."""
+    with _lock:
+        entry = _owned.get((kind, user_id))
+        if entry and time.monotonic() - entry[1] < OWNERSHIP_TTL:
+            _stats["owner_hits"] += 1
+            return entry[0]
+    return _load_owned(kind, user_id)
+
+
+def is_owner(kind: str, user_id: int, target_id) -> bool:
+    if user_id is None or target_id is None:
+        return False
+    if target_id in owned_ids(kind, user_id):
+        return True
+    # Un "no" cacheado puede ser viejo (p. ej. clase creada desde otro proceso): se confirma releyendo.
+    return target_id in _load_owned(kind, user_id)
+
+
+def filter_owned(kind: str, user_id: int, ids) -> list:
+    """Chequeo en lote: de `ids`, los que pertenecen al usuario (una sola consulta como máximo)."""
+    ids = list(ids)
+    owned = owned_ids(kind, user_id)
+    if any(i not in owned for i in ids):
+        owned = _load_owned(kind, user_id)
+    return [i for i in ids if i in owned]
+
+
+def invalidate_ownership(kind: str | None = None, user_id: int | None = None):
+    """Descarta ids propios cacheados (por tipo y/o usuario). Llamar después de crear/borrar clases, planes o rutinas."""
+    with _lock:
+        for key in [k for k in _owned
+                    if (kind is None or k[0] == kind) and (user_id is None or k[1] == user_id)]:
+            del _owned[key]
+
+
+def clear_policy_cache():
+    """Vacía la cache de pertenencia y los contadores."""
+    with _lock:
+        _owned.clear()
+        for key in _stats:
+            _stats[key] = 0
+
+
+def policy_stats() -> dict:
+    """Contadores de chequeos y de la cache de pertenencia (hit_ratio entre 0 y 1)."""
+    with _lock:
+        stats = dict(_stats)
+        stats["cached_sets"] = len(_owned)
+    lookups = stats["owner_hits"] + stats["owner_misses"]
+    stats["hit_ratio"] = stats["owner_hits"] / lookups if lookups else 0.0
+    return stats
+
+
+# ---------- CHEQUEOS ----------
+def authorize(resource: str, action: str, current_user_roles=None,
+              current_user_id=None, subject_id=None, target_id=None) -> frozenset:
+    """
+    Aplica la regla (resource, action). Devuelve los roles del usuario que la habilitan
+    (para que el llamador elija qué consulta hacer) o lanza PermissionError con el mensaje de la regla.
+    - subject_id: usuario sobre el que se actúa (reglas SELF).
+    - target_id: clase/plan/rutina sobre la que se actúa (reglas owner()).
+    """
+    rule = _COMPILED[(resource, action)]
+    roles = normalize_roles(current_user_roles)
+    granted = roles & rule.allow
+    if current_user_id is not None and subject_id == current_user_id:
+        granted |= roles & rule.self_roles
+    for role, kind in rule.owners:
+        if role in roles and role not in granted and is_owner(kind, current_user_id, target_id):
+            granted |= {role}
+
+    with _lock:
+        _stats["checks"] += 1
+        if not granted:
+            _stats["denied"] += 1
+    if not granted:
+        raise PermissionError(rule.message)
+    return granted
+
+
+def requires(resource: str, action: str, subject: str | None = None, target: str | None = None):
+    """
+    Decorador: chequea la regla (resource, action) antes de ejecutar la función.
+    Toma current_user_roles / current_user_id y los parámetros `subject` / `target` por nombre;
+    sus posiciones se resuelven al decorar, no en cada llamada. Va debajo de @staticmethod.
+    """
+    if (resource, action) not in _COMPILED:
+        raise KeyError(f"No hay regla para ({resource}, {action}).")
+
+    def decorator(func):
+        params = inspect.signature(func).parameters
+        names = list(params)
+
+        def locate(name, required=True):
+            if name is None or (name not in params and not required):
+                return None
+            if name not in params:
+                raise TypeError(f"{func.__qualname__} no tiene el parámetro '{name}'.")
+            return name, names.index(name), params[name].default
+
+        spots = [locate(n, required=False) for n in ("current_user_roles", "current_user_id")] + [locate(subject), locate(target)]
+
+        def pick(spot, args, kwargs):
+            if spot is None:
+                return None
+            name, index, default = spot
+            if name in kwargs:
+                return kwargs[name]
+            if index < len(args):
+                return args[index]
+            return None if default is inspect.Parameter.empty else default
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            roles, user_id, subject_id, target_id = (pick(s, args, kwargs) for s in spots)
+            authorize(resource, action, roles, user_id, subject_id, target_id)
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
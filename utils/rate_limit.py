@@ -0,0 +1,219 @@
+# utils/rate_limit.py
+import math
+import os
+import threading
+import time
+
+from db.connection import get_connection
+
+# Token bucket por DNI (pocos intentos, recarga lenta) y por origen (más holgado: varios usuarios
+# pueden compartir terminal/IP). Valores en intentos y segundos.
+DNI_BURST = int(os.environ.get("SMARTFIT_LOGIN_DNI_BURST", 5))
+DNI_REFILL_SECONDS = float(os.environ.get("SMARTFIT_LOGIN_DNI_REFILL", 30))
+SOURCE_BURST = int(os.environ.get("SMARTFIT_LOGIN_SOURCE_BURST", 30))
+SOURCE_REFILL_SECONDS = float(os.environ.get("SMARTFIT_LOGIN_SOURCE_REFILL", 2))
+
+# Bloqueo exponencial: a partir de N fallos seguidos, LOCKOUT_BASE * 2^(fallos - N), con tope.
+DNI_FAILURES_BEFORE_LOCK = int(os.environ.get("SMARTFIT_LOGIN_DNI_MAX_FAILURES", 5))
+SOURCE_FAILURES_BEFORE_LOCK = int(os.environ.get("SMARTFIT_LOGIN_SOURCE_MAX_FAILURES", 50))
+LOCKOUT_BASE = float(os.environ.get("SMARTFIT_LOGIN_LOCKOUT", 30))
+LOCKOUT_MAX = float(os.environ.get("SMARTFIT_LOGIN_LOCKOUT_MAX", 3600))
+# Los fallos se olvidan tras FAILURE_WINDOW segundos sin fallar (y con el bloqueo ya vencido):
+# un error de tipeo cada tanto no se acumula hacia un bloqueo, y la entrada se puede descartar.
+FAILURE_WINDOW = float(os.environ.get("SMARTFIT_LOGIN_FAILURE_WINDOW", 900))
+# Tope de entradas en memoria (p. ej. un ataque con miles de DNI distintos).
+MAX_ENTRIES = int(os.environ.get("SMARTFIT_LOGIN_MAX_ENTRIES", 100000))
+
+# Guardar los bloqueos en la tabla login_throttle (sobreviven a un reinicio del proceso).
+PERSIST = os.environ.get("SMARTFIT_LOGIN_PERSIST", "0") == "1"
+COMPACT_EVERY = 512
+
+
+class _Bucket:
+    __slots__ = ("tokens", "refilled_at", "failures", "failed_at", "locked_until")
+
+    def __init__(self, capacity: int, now: float):
+        self.tokens = float(capacity)
+        self.refilled_at = now
+        self.failures = 0
+        self.failed_at = 0.0      # time.time() del último fallo
+        self.locked_until = 0.0   # time.time(): se puede persistir
+
+    def decay(self, wall: float) -> bool:
+        """Olvida los fallos si pasó FAILURE_WINDOW desde el último fallo y desde el fin del bloqueo."""
+        if self.failures and wall - max(self.failed_at, self.locked_until) >= FAILURE_WINDOW:
+            self.failures = 0
+            self.locked_until = 0.0
+        return self.failures == 0
+
+
+class LoginRateLimiter:
+    """
+    Limita los intentos de login sin tocar la base:
+    - check(): se llama ANTES de cualquier SQL; consume un intento de los buckets del DNI y del origen
+      o lanza PermissionError si alguno está vacío o bloqueado.
+    - record_failure() / record_success(): actualizan los fallos seguidos y el bloqueo exponencial.
+    Los fallos se olvidan después de FAILURE_WINDOW segundos sin fallar. Las entradas que volvieron
+    a estar llenas y sin fallos se descartan cada COMPACT_EVERY chequeos (o al llegar a MAX_ENTRIES).
+    """
+
+    def __init__(self, persist: bool = PERSIST):
+        self.persist = persist
+        self._buckets = {}   # ("dni" | "src", valor) -> _Bucket
+        self._lock = threading.Lock()
+        self._loaded = not persist
+        self._counters = {"allowed": 0, "rejected": 0, "failures": 0, "lockouts": 0, "compactions": 0}
+
+    @staticmethod
+    def _limits(kind: str):
+        if kind == "dni":
+            return DNI_BURST, DNI_REFILL_SECONDS, DNI_FAILURES_BEFORE_LOCK
+        return SOURCE_BURST, SOURCE_REFILL_SECONDS, SOURCE_FAILURES_BEFORE_LOCK
+
+    def _bucket(self, key, now: float, wall: float) -> _Bucket:
+        bucket = self._buckets.get(key)
+        capacity, refill, _ = self._limits(key[0])
+        if bucket is None:
+            if len(self._buckets) >= MAX_ENTRIES:
+                self._evict(now, wall)
+            bucket = self._buckets[key] = _Bucket(capacity, now)
+        else:
+            bucket.tokens = min(capacity, bucket.tokens + (now - bucket.refilled_at) / refill)
+            bucket.refilled_at = now
+            bucket.decay(wall)
+        return bucket
+
+    @staticmethod
+    def _keys(dni: str, source: str):
+        return (("dni", dni.strip()), ("src", source or "local"))
+
+    # ---------- CHEQUEO ----------
+    def check(self, dni: str, source: str = "local"):
+        if not self._loaded:
+            self.load()
+        now, wall = time.monotonic(), time.time()
+        with self._lock:
+            buckets = [(key, self._bucket(key, now, wall)) for key in self._keys(dni, source)]
+            wait = 0.0
+            for key, b in buckets:
+                wait = max(wait, b.locked_until - wall)
+                if b.tokens < 1:
+                    wait = max(wait, (1 - b.tokens) * self._limits(key[0])[1])
+            if wait > 0:
+                self._counters["rejected"] += 1
+                raise PermissionError(f"🚫 Demasiados intentos de ingreso. Probá de nuevo en {math.ceil(wait)} s.")
+            for _, b in buckets:
+                b.tokens -= 1
+            self._counters["allowed"] += 1
+            if self._counters["allowed"] % COMPACT_EVERY == 0:
+                self._compact(now, wall)
+
+    def record_failure(self, dni: str, source: str = "local"):
+        now, wall = time.monotonic(), time.time()
+        locked = []
+        with self._lock:
+            self._counters["failures"] += 1
+            for key in self._keys(dni, source):
+                b = self._bucket(key, now, wall)
+                b.failures += 1
+                b.failed_at = wall
+                threshold = self._limits(key[0])[2]
+                if b.failures >= threshold:
+                    b.locked_until = wall + min(LOCKOUT_MAX, LOCKOUT_BASE * 2 ** (b.failures - threshold))
+                    self._counters["lockouts"] += 1
+                    locked.append((f"{key[0]}:{key[1]}", b.failures, b.locked_until))
+        if locked and self.persist:
+            self._save(locked)
+
+    def record_success(self, dni: str, source: str = "local"):
+        """Libera el DNI y reinicia el conteo de fallos del origen (un bloqueo de origen vigente se respeta)."""
+        dni_key, source_key = self._keys(dni, source)
+        with self._lock:
+            b = self._buckets.get(dni_key)
+            had_lock = b is not None and b.locked_until > 0
+            if b is not None:
+                b.failures = 0
+                b.locked_until = 0.0
+            src = self._buckets.get(source_key)
+            if src is not None:
+                src.failures = 0
+        if had_lock and self.persist:
+            self._forget([f"{dni_key[0]}:{dni_key[1]}"])
+
+    # ---------- MANTENIMIENTO ----------
+    def _compact(self, now: float, wall: float):
+        stale = []
+        for key, b in self._buckets.items():
+            capacity, refill, _ = self._limits(key[0])
+            full = b.tokens + (now - b.refilled_at) / refill >= capacity
+            if full and b.decay(wall) and b.locked_until <= wall:
+                stale.append(key)
+        for key in stale:
+            del self._buckets[key]
+        self._counters["compactions"] += 1
+
+    def _evict(self, now: float, wall: float):
+        """
+        Lleno: compacta y, si no alcanza, descarta las entradas más viejas sin bloqueo vigente,
+        primero las de DNI (el bucket del origen es el que frena un ataque con DNI distintos).
+        """
+        self._compact(now, wall)
+        excess = len(self._buckets) - MAX_ENTRIES + 1
+        if excess > 0:
+            unlocked = [key for key, b in self._buckets.items() if b.locked_until <= wall]
+            oldest = sorted(unlocked, key=lambda key: key[0] != "dni")[:excess]   # sort estable: respeta la antigüedad
+            for key in oldest:
+                del self._buckets[key]
+
+    def compact(self):
+        with self._lock:
+            self._compact(time.monotonic(), time.time())
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            for key in self._counters:
+                self._counters[key] = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "entries": len(self._buckets)}
+
+    # ---------- PERSISTENCIA (opcional) ----------
+    def load(self):
+        """Trae los bloqueos vigentes de login_throttle (una sola vez, al primer chequeo)."""
+        self._loaded = True
+        conn = get_connection()
+        try:
+            rows = conn.execute("""
+                SELECT key, failures, locked_until FROM login_throttle WHERE locked_until > ?
+            """, (time.time(),)).fetchall()
+        finally:
+            conn.close()
+        now = time.monotonic()
+        with self._lock:
+            for row in rows:
+                kind, _, value = row["key"].partition(":")
+                b = self._bucket((kind, value), now, time.time())
+                b.failures = row["failures"]
+                b.locked_until = row["locked_until"]
+
+    @staticmethod
+    def _save(rows):
+        with get_connection() as conn:
+            conn.executemany("""
+                INSERT INTO login_throttle (key, failures, locked_until) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET failures = excluded.failures, locked_until = excluded.locked_until
+            """, rows)
+
+    @staticmethod
+    def _forget(keys):
+        with get_connection() as conn:
+            conn.executemany("DELETE FROM login_throttle WHERE key = ?", [(k,) for k in keys])
+
+
+_limiter = LoginRateLimiter()
+
+
+def get_login_limiter() -> LoginRateLimiter:
+    return _limiter
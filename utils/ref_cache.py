@@ -0,0 +1,119 @@
+# utils/ref_cache.py
+import functools
+import inspect
+import os
+import threading
+import time
+
+# Red de seguridad para cambios hechos desde otro proceso (los de este proceso invalidan al instante).
+REF_CACHE_TTL = float(os.environ.get("SMARTFIT_REF_CACHE_TTL", 300))
+
+
+class ReferenceCache:
+    """
+    Cache de lectura para datos de referencia (roles, membresías, gimnasios) con invalidación por versión.
+    - Cada espacio ("role", "membership", "gym") tiene un número de versión.
+    - Cada entrada guarda la versión con la que se leyó; si la versión cambió, es un miss y se relee.
+    - bump(espacio) después de cada escritura invalida de una vez todas sus entradas.
+    La versión se toma ANTES de leer: si otra escritura ocurre durante la lectura, esa entrada nace vieja.
+    """
+
+    def __init__(self, ttl: float = REF_CACHE_TTL):
+        self.ttl = ttl
+        self._versions = {}   # espacio -> versión
+        self._entries = {}    # (espacio, clave) -> (versión, cargado_en, valor)
+        self._counters = {}   # espacio -> {"hits", "misses", "bumps"}
+        self._lock = threading.Lock()
+
+    def _count(self, namespace: str, counter: str):
+        self._counters.setdefault(namespace, {"hits": 0, "misses": 0, "bumps": 0})[counter] += 1
+
+    def get(self, namespace: str, key, loader):
+        with self._lock:
+            version = self._versions.get(namespace, 0)
+            entry = self._entries.get((namespace, key))
+            if entry and entry[0] == version and time.monotonic() - entry[1] < self.ttl:
+                self._count(namespace, "hits")
+                return entry[2]
+            self._count(namespace, "misses")
+
+        value = loader()
+        with self._lock:
+            if self._versions.get(namespace, 0) == version:
+                self._entries[(namespace, key)] = (version, time.monotonic(), value)
+        return value
+
+    def bump(self, namespace: str):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            for k in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[k]
+            self._count(namespace, "bumps")
+
+    def version(self, namespace: str) -> int:
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def stats(self) -> dict:
+        """Por espacio: hits, misses, bumps, versión, entradas y hit_ratio."""
+        with self._lock:
+            result = {}
+            for namespace, counters in self._counters.items():
+                lookups = counters["hits"] + counters["misses"]
+                result[namespace] = {
+                    **counters,
+                    "version": self._versions.get(namespace, 0),
+                    "entries": sum(1 for k in self._entries if k[0] == namespace),
+                    "hit_ratio": round(counters["hits"] / lookups, 3) if lookups else None,
+                }
+            return result
+
+
+_cache = ReferenceCache()
+
+
+def get_reference_cache() -> ReferenceCache:
+    return _cache
+
+
+def cached(namespace: str, ignore=()):
+    """
+    Decorador de lectura: la clave es (función, argumentos) sin los de `ignore` (p. ej. current_user_roles).
+    Las listas se devuelven como copia para que el llamador no modifique la entrada cacheada.
+    Va debajo de @staticmethod.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (name,) + tuple(v for k, v in bound.arguments.items() if k not in ignore)
+            value = _cache.get(namespace, key, lambda: func(*args, **kwargs))
+            return list(value) if isinstance(value, list) else value
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates(namespace: str):
+    """Decorador de escritura: sube la versión del espacio al terminar (aunque la escritura falle a medias)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _cache.bump(namespace)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,11 @@
+# utils/roles.py
+
+
+def normalize_roles(roles) -> frozenset:
+    """
+    Roles del usuario como frozenset en mayúsculas, para chequeos `"ADMIN" in roles` en O(1).
+    Las sesiones (utils/session_store.py) ya guardan un frozenset normalizado: ese caso no se recalcula.
+    """
+    if isinstance(roles, frozenset):
+        return roles
+    return frozenset(r.upper() for r in (roles or []))
@@ -0,0 +1,150 @@
+# utils/session_store.py
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from db.connection import get_connection
+
+# Duración de una sesión (token) y cuánto se confía en la identidad cacheada antes de releerla.
+SESSION_TTL = float(os.environ.get("SMARTFIT_SESSION_TTL", 8 * 3600))
+IDENTITY_TTL = float(os.environ.get("SMARTFIT_IDENTITY_TTL", 300))
+MAX_CACHED_USERS = int(os.environ.get("SMARTFIT_SESSION_CACHE_SIZE", 1024))
+
+
+class SessionUser:
+    """Identidad resuelta de un usuario logueado. `roles` es un frozenset en mayúsculas."""
+    __slots__ = ("user_id", "gym_id", "full_name", "roles")
+
+    def __init__(self, user_id: int, gym_id: int, full_name: str, roles: frozenset):
+        self.user_id = user_id
+        self.gym_id = gym_id
+        self.full_name = full_name
+        self.roles = roles
+
+    def has_role(self, role: str) -> bool:
+        return role in self.roles
+
+    def __repr__(self):
+        return f"SessionUser({self.user_id}, gym={self.gym_id}, roles={sorted(self.roles)})"
+
+
+class SessionStore:
+    """
+    Tokens de sesión opacos + cache LRU con TTL de la identidad de cada usuario.
+    - issue(): crea un token para un usuario ya autenticado.
+    - resolve(): token -> SessionUser, sin ir a la base mientras la identidad esté cacheada.
+    - invalidate_user(): descarta la identidad cacheada (cambio de roles, baja); el próximo
+      resolve() la relee y, si el usuario quedó INACTIVE, revoca sus tokens.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, identity_ttl: float = IDENTITY_TTL,
+                 max_users: int = MAX_CACHED_USERS):
+        self.ttl = ttl
+        self.identity_ttl = identity_ttl
+        self.max_users = max_users
+        self._tokens = {}             # token -> (user_id, vence)
+        self._users = OrderedDict()   # user_id -> (SessionUser, cargado_en)
+        self._lock = threading.Lock()
+        self._counters = {"issued": 0, "hits": 0, "misses": 0, "invalidations": 0, "expired": 0}
+
+    # ---------- TOKENS ----------
+    def issue(self, user_id: int) -> str:
+        token = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self._lock:
+            self._tokens[token] = (user_id, now + self.ttl)
+            self._counters["issued"] += 1
+            if self._counters["issued"] % 256 == 0:
+                # Compactación periódica: los tokens vencidos que nadie volvió a usar
+                for t in [t for t, (_, expires) in self._tokens.items() if expires <= now]:
+                    del self._tokens[t]
+        return token
+
+    def revoke(self, token: str):
+        with self._lock:
+            self._tokens.pop(token, None)
+
+    def resolve(self, token: str) -> SessionUser:
+        """Devuelve la identidad del token o lanza PermissionError si no existe, venció o el usuario está inactivo."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is None:
+                raise PermissionError("🚫 Sesión inválida. Iniciá sesión nuevamente.")
+            user_id, expires = entry
+            if expires <= now:
+                del self._tokens[token]
+                self._counters["expired"] += 1
+                raise PermissionError("🚫 La sesión venció. Iniciá sesión nuevamente.")
+            cached = self._users.get(user_id)
+            if cached is not None and now - cached[1] < self.identity_ttl:
+                self._users.move_to_end(user_id)
+                self._counters["hits"] += 1
+                return cached[0]
+            self._counters["misses"] += 1
+
+        user = self._load(user_id)
+        with self._lock:
+            if user is None:
+                for t in [t for t, (uid, _) in self._tokens.items() if uid == user_id]:
+                    del self._tokens[t]
+                self._users.pop(user_id, None)
+            else:
+                self._users[user_id] = (user, now)
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        if user is None:
+            raise PermissionError("🚫 El usuario está inactivo o no existe.")
+        return user
+
+    # ---------- CACHE ----------
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "sessions": len(self._tokens),
+                "cached_users": len(self._users),
+                "hit_ratio": round(self._counters["hits"] / lookups, 3) if lookups else None,
+            }
+
+    @staticmethod
+    def _load(user_id: int) -> SessionUser | None:
+        conn = get_connection()
+        try:
+            row = conn.execute("""
+                SELECT id, gym_id, full_name FROM user WHERE id = ? AND status = 'ACTIVE'
+            """, (user_id,)).fetchone()
+            if row is None:
+                return None
+            roles = frozenset(r["code"].upper() for r in conn.execute("""
+                SELECT r.code FROM user_role ur JOIN role r ON r.id = ur.role_id WHERE ur.user_id = ?
+            """, (user_id,)).fetchall())
+        finally:
+            conn.close()
+        return SessionUser(row["id"], row["gym_id"], row["full_name"], roles)
+
+
+_store = SessionStore()
+
+
+def get_session_store() -> SessionStore:
+    return _store
+
+
+def invalidate_user(user_id: int):
+    """Atajo para los modelos: descarta la identidad cacheada de `user_id`."""
+    _store.invalidate_user(user_id)